@@ -271,4 +271,7 @@ API.interceptors.response.use(
   }
 );
 
+// Paginated lists return `next` as a full URL; only its cursor is sent back
+export const nextCursor = (next) => (next ? new URL(next).searchParams.get('cursor') : null);
+
 export default API;
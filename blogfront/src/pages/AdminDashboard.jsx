@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import API from '../api/axios';
+import API, { nextCursor } from '../api/axios';
 import { useAuth } from '../context/AuthContext';
 import {
   LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, BarChart, Bar
@@ -16,7 +16,6 @@ const AdminDashboard = () => {
     total_categories: 0,
     total_users: 0,
     categories: [],
-    users: [],
     blogs: [],
     daily_blogs: [],
     monthly_blogs: [],
@@ -29,6 +28,12 @@ const AdminDashboard = () => {
   const [editCategoryName, setEditCategoryName] = useState('');
   const [chartType, setChartType] = useState('total'); 
 
+  // Users table: loaded on demand, a page at a time
+  const [users, setUsers] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [usersLoaded, setUsersLoaded] = useState(false);
+  const [loadingUsers, setLoadingUsers] = useState(false);
+
   const token = localStorage.getItem('tokens')
     ? JSON.parse(localStorage.getItem('tokens')).access
     : null;
@@ -43,10 +48,8 @@ const AdminDashboard = () => {
         total_likes: res.data.total_likes,
         total_comments: res.data.total_comments,
         total_categories: res.data.total_categories,
-        total_users: res.data.users.length,
+        total_users: res.data.total_users,
         categories: res.data.categories,
-        users: res.data.users.filter((u) => !u.is_admin),
-        blogs: res.data.blogs,
         daily_blogs: res.data.daily_blogs,
         monthly_blogs: res.data.monthly_blogs,
         daily_users: res.data.daily_users,
@@ -58,6 +61,22 @@ const AdminDashboard = () => {
     }
   };
 
+  // ---------- FETCH USERS ----------
+  const fetchUsers = async (cursor = null) => {
+    setLoadingUsers(true);
+    try {
+      const res = await API.get('stats/users/', { headers: authHeaders, params: cursor ? { cursor } : {} });
+      setUsers((prev) => (cursor ? [...prev, ...res.data.results] : res.data.results));
+      setUsersCursor(nextCursor(res.data.next));
+      setUsersLoaded(true);
+    } catch (err) {
+      console.error('Error fetching users:', err.response?.data || err);
+      alert('Failed to fetch users ');
+    } finally {
+      setLoadingUsers(false);
+    }
+  };
+
   useEffect(() => {
     fetchStats();
   }, []);
@@ -254,22 +273,37 @@ const AdminDashboard = () => {
 
       {/* ---------- USER  ---------- */}
       <h4>Manage Users</h4>
-      <table className="table table-bordered">
-        <thead>
-          <tr>
-            <th>Username</th>
-            <th>Email</th>
-          </tr>
-        </thead>
-        <tbody>
-          {stats.users.map((u) => (
-            <tr key={u.id}>
-              <td>{u.username}</td>
-              <td>{u.email}</td>
-            </tr>
-          ))}
-        </tbody>
-      </table>
+      {!usersLoaded ? (
+        <button className="btn btn-outline-primary mb-4" disabled={loadingUsers} onClick={() => fetchUsers()}>
+          {loadingUsers ? 'Loading...' : 'Show users'}
+        </button>
+      ) : (
+        <>
+          <table className="table table-bordered">
+            <thead>
+              <tr>
+                <th>Username</th>
+                <th>Email</th>
+              </tr>
+            </thead>
+            <tbody>
+              {users.map((u) => (
+                <tr key={u.id}>
+                  <td>{u.username}</td>
+                  <td>{u.email}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+          {usersCursor && (
+            <div className="text-center mb-4">
+              <button className="btn btn-outline-primary" disabled={loadingUsers} onClick={() => fetchUsers(usersCursor)}>
+                {loadingUsers ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
+        </>
+      )}
     </div>
   );
 };
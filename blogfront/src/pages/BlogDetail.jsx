@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import API from '../api/axios';
+import API, { nextCursor } from '../api/axios';
 import { useAuth } from '../context/AuthContext';
 import { toast } from 'react-toastify'; 
 
@@ -10,6 +10,9 @@ const BlogDetail = () => {
   const navigate = useNavigate();
   const [blog, setBlog] = useState(null);
   const [comments, setComments] = useState([]);
+  const [commentsCursor, setCommentsCursor] = useState(null);
+  // comment id -> { items, cursor } of the replies opened so far
+  const [replies, setReplies] = useState({});
   const [commentText, setCommentText] = useState('');
 
 
@@ -19,7 +22,6 @@ const BlogDetail = () => {
     try {
       const { data } = await API.get(`blogs/${id}/`);
       setBlog(data);
-      setComments(data.comments || []);
     } catch (err) {
       toast.error('Error fetching blog ');
       console.error(err);
@@ -29,12 +31,48 @@ const BlogDetail = () => {
   useEffect(() => { fetchBlog(); }, [id]);
 
 
+// ------------------Comment thread (paged by cursor)--------------
+  const fetchComments = async (cursor = null) => {
+    if (id === 'new') return;
+    try {
+      const { data } = await API.get(`blogs/${id}/comments/`, { params: cursor ? { cursor } : {} });
+      setComments(prev => (cursor ? [...prev, ...data.results] : data.results));
+      setCommentsCursor(nextCursor(data.next));
+    } catch (err) {
+      toast.error('Error fetching comments ');
+      console.error(err);
+    }
+  };
+
+  useEffect(() => {
+    setReplies({});
+    fetchComments();
+  }, [id]);
+
+  const fetchReplies = async (parentId, cursor = null) => {
+    try {
+      const params = cursor ? { parent: parentId, cursor } : { parent: parentId };
+      const { data } = await API.get(`blogs/${id}/comments/`, { params });
+      setReplies(prev => ({
+        ...prev,
+        [parentId]: {
+          items: [...(cursor ? prev[parentId].items : []), ...data.results],
+          cursor: nextCursor(data.next),
+        },
+      }));
+    } catch (err) {
+      toast.error('Error fetching replies ');
+      console.error(err);
+    }
+  };
+
+
 // ------------------Comments--------------
   const handleComment = async () => {
     if (!commentText) return toast.warn('Please write a comment first ✍️');
     try {
       const { data } = await API.post(`blogs/${id}/comments/`, { comment: commentText });
-      setComments([...comments, data]);
+      setComments([data, ...comments]);
       setCommentText('');
       toast.success('Comment added ');
     } catch (err) {
@@ -86,7 +124,7 @@ const BlogDetail = () => {
       <p>By {blog.author.username}</p>
       {blog.image && (
         <img
-          src={`http://127.0.0.1:8000${blog.image}`}
+          src={`http://127.0.0.1:8000${blog.image_srcset?.full || blog.image}`}
           className="img-fluid mb-1"
           alt={blog.title}
         />
@@ -121,8 +159,32 @@ const BlogDetail = () => {
       {comments.map((c) => (
         <div key={c.id}>
           <b>{c.author.username}</b>: {c.comment}
+          {c.reply_count > 0 && !replies[c.id] && (
+            <button className="btn btn-link btn-sm" onClick={() => fetchReplies(c.id)}>
+              View {c.reply_count} {c.reply_count === 1 ? 'reply' : 'replies'}
+            </button>
+          )}
+          {replies[c.id] && (
+            <div className="ms-4">
+              {replies[c.id].items.map((r) => (
+                <div key={r.id}>
+                  <b>{r.author.username}</b>: {r.comment}
+                </div>
+              ))}
+              {replies[c.id].cursor && (
+                <button className="btn btn-link btn-sm" onClick={() => fetchReplies(c.id, replies[c.id].cursor)}>
+                  More replies
+                </button>
+              )}
+            </div>
+          )}
         </div>
       ))}
+      {commentsCursor && (
+        <button className="btn btn-outline-secondary btn-sm mt-2" onClick={() => fetchComments(commentsCursor)}>
+          Load more comments
+        </button>
+      )}
 
       <div className="mt-2">
         <input
@@ -1,7 +1,7 @@
 
 
-import React, { useEffect, useState } from 'react';
-import API from '../api/axios';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
+import API, { nextCursor } from '../api/axios';
 import Sidebar from '../components/Sidebar';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
@@ -15,16 +15,14 @@ const Home = () => {
   const [selectedCategory, setSelectedCategory] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [debouncedQuery, setDebouncedQuery] = useState('');
-  const [page, setPage] = useState(1);
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [sortOrder, setSortOrder] = useState('newest'); 
 
-  const blogsPerPage = 9;
-
   // Debounce search
   useEffect(() => {
     const handler = setTimeout(() => {
-      setDebouncedQuery(searchQuery);
-      setPage(1);
+      setDebouncedQuery(searchQuery.trim());
     }, 600);
     return () => clearTimeout(handler);
   }, [searchQuery]);
@@ -39,32 +37,54 @@ const Home = () => {
     }
   };
 
-  // Fetch blogs
-  const fetchBlogs = async () => {
+  // Category and search are filtered by the API; pages are followed by cursor
+  const feedParams = useCallback(() => {
+    const params = {};
+    if (selectedCategory) params.category = selectedCategory;
+    if (debouncedQuery) params.search = debouncedQuery;
+    return params;
+  }, [selectedCategory, debouncedQuery]);
+  const currentParams = useRef(feedParams);
+  currentParams.current = feedParams;
+
+  useEffect(() => {
+    fetchCategories();
+  }, []);
+
+  // First page again whenever the filters change
+  useEffect(() => {
+    let ignore = false;
+    const fetchBlogs = async () => {
+      try {
+        const { data } = await API.get('blogs/', { params: feedParams() });
+        if (ignore) return;
+        setBlogs(data.results);
+        setCursor(nextCursor(data.next));
+      } catch (err) {
+        console.error('Error fetching blogs:', err);
+      }
+    };
+    fetchBlogs();
+    return () => { ignore = true; };
+  }, [feedParams]);
+
+  const loadMore = async () => {
+    setLoadingMore(true);
     try {
-      const { data } = await API.get('blogs/');
-      setBlogs(data);
+      const { data } = await API.get('blogs/', { params: { ...feedParams(), cursor } });
+      // Filters changed meanwhile: this page belongs to the old list
+      if (currentParams.current !== feedParams) return;
+      setBlogs(prev => [...prev, ...data.results]);
+      setCursor(nextCursor(data.next));
     } catch (err) {
       console.error('Error fetching blogs:', err);
+    } finally {
+      setLoadingMore(false);
     }
   };
 
-  useEffect(() => {
-    fetchCategories();
-    fetchBlogs();
-  }, []);
-
-  // Filtered blogs by category & search
-  const filteredBlogs = blogs.filter(blog => {
-    const matchesCategory = selectedCategory
-      ? blog.category && blog.category.id === selectedCategory
-      : true;
-    const matchesSearch = blog.title.toLowerCase().includes(debouncedQuery.toLowerCase());
-    return matchesCategory && matchesSearch;
-  });
-
-  // Sorted blogs
-  let sortedBlogs = [...filteredBlogs];
+  // Sorted blogs (the loaded ones; the API sends newest first, or best match when searching)
+  let sortedBlogs = [...blogs];
   switch(sortOrder) {
     case 'newest':
       sortedBlogs.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
@@ -82,12 +102,6 @@ const Home = () => {
       break;
   }
 
-  // Pagination
-  const totalPages = Math.ceil(sortedBlogs.length / blogsPerPage);
-  const startIndex = (page - 1) * blogsPerPage;
-  const endIndex = startIndex + blogsPerPage;
-  const displayedBlogs = sortedBlogs.slice(startIndex, endIndex);
-
   // Navigate to blog detail
   const handleReadMore = (blogId) => {
     if (user) {
@@ -120,7 +134,7 @@ const Home = () => {
           <div className="mb-3">
             <input
               type="text"
-              placeholder="Search blogs by title..."
+              placeholder="Search blogs..."
               className="form-control"
               value={searchQuery}
               onChange={(e) => setSearchQuery(e.target.value)}
@@ -141,10 +155,10 @@ const Home = () => {
             </select>
           </div>
 
-          {displayedBlogs.length === 0 ? (
+          {sortedBlogs.length === 0 ? (
             <p>No blogs found.</p>
           ) : (
-            displayedBlogs.map(blog => (
+            sortedBlogs.map(blog => (
               <div key={blog.id} className="card mb-3">
                 <div className="card-body">
                   <h5 className="card-title">{blog.title}</h5>
@@ -178,22 +192,14 @@ const Home = () => {
             ))
           )}
 
-          {totalPages > 1 && (
-            <div className="d-flex justify-content-between align-items-center mt-4">
-              <button
-                className="btn btn-outline-primary btn-sm"
-                disabled={page <= 1}
-                onClick={() => setPage(page - 1)}
-              >
-                ← Previous
-              </button>
-              <span>Page {page} of {totalPages}</span>
+          {cursor && (
+            <div className="text-center mt-4">
               <button
                 className="btn btn-outline-primary btn-sm"
-                disabled={page >= totalPages}
-                onClick={() => setPage(page + 1)}
+                disabled={loadingMore}
+                onClick={loadMore}
               >
-                Next →
+                {loadingMore ? 'Loading...' : 'Load more'}
               </button>
             </div>
           )}
@@ -2,12 +2,14 @@
 
 import React, { useEffect, useState } from 'react';
 import { useAuth } from '../context/AuthContext';
-import API from '../api/axios';
+import API, { nextCursor } from '../api/axios';
 import { useNavigate } from 'react-router-dom';
 
 const MyBlogs = () => {
   const { user, tokens } = useAuth();
   const [blogs, setBlogs] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const navigate = useNavigate();
 
   // --------------User Blogs (Published + Unpublished)----------------
@@ -17,7 +19,8 @@ const MyBlogs = () => {
       try {
         const config = { headers: { Authorization: `Bearer ${tokens.access}` } };
         const { data } = await API.get('blogs/my-blogs/', config); 
-        setBlogs(data);
+        setBlogs(data.results);
+        setCursor(nextCursor(data.next));
       } catch (err) {
         console.error('Error fetching blogs:', err);
       }
@@ -25,6 +28,21 @@ const MyBlogs = () => {
     fetchBlogs();
   }, [user, tokens]);
 
+  // -------------------Next page (by cursor)-------------------
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const config = { headers: { Authorization: `Bearer ${tokens.access}` }, params: { cursor } };
+      const { data } = await API.get('blogs/my-blogs/', config);
+      setBlogs(prev => [...prev, ...data.results]);
+      setCursor(nextCursor(data.next));
+    } catch (err) {
+      console.error('Error fetching blogs:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // -------------------Edit Blog-------------------
   const handleEdit = (id) => navigate(`/blogs/edit/${id}`);
 
@@ -54,7 +72,7 @@ const MyBlogs = () => {
           <div key={blog.id} className="card mb-3">
             {blog.image && (
               <img
-                src={`http://127.0.0.1:8000${blog.image}`}
+                src={`http://127.0.0.1:8000${blog.image_srcset?.card || blog.image}`}
                 className="card-img-top"
                 alt={blog.title}
               />
@@ -73,12 +91,12 @@ const MyBlogs = () => {
               </p>
 
               <p className="card-text">
-                {blog.content.length > 150
-                  ? `${blog.content.slice(0, 150)}...`
-                  : blog.content}
+                {blog.excerpt.length > 150
+                  ? `${blog.excerpt.slice(0, 150)}...`
+                  : blog.excerpt}
               </p>
 
-              {blog.content.length > 150 && (
+              {blog.excerpt.length > 150 && (
                 <button className="btn btn-link p-0" onClick={() => handleReadMore(blog.id)}>
                   Read More
                 </button>
@@ -101,6 +119,13 @@ const MyBlogs = () => {
           </div>
         ))
       )}
+      {cursor && (
+        <div className="text-center mb-4">
+          <button className="btn btn-outline-primary" disabled={loadingMore} onClick={loadMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from django.core import checks
+        from . import responsecache, signals  # noqa: F401
+        checks.register(responsecache.check_backend, checks.Tags.caches)
@@ -0,0 +1,202 @@
+import asyncio
+from functools import partial, wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from .authentication import CachedJWTAuthentication
+from .conditional import Validators
+from .models import Category, Blog, Comment, Like
+from .pagination import KeysetPagination
+from .serializers import CategorySerializer, BlogSerializer, CommentSerializer
+from .viewcounter import view_counter
+from . import responsecache, timing, views
+
+
+# ------------------- Async read path -------------------
+# Under ASGI (settings.BLOG_ASYNC_VIEWS) the feed, detail, category and comment
+# GETs run as coroutines, so a worker is not tied up while a request waits on
+# the database; independent lookups are awaited together. Writes and every
+# other method still go to the DRF views in blog.views. The payloads, caching,
+# ETags and status codes are the same as there: both paths share the query
+# builders, serializers and response cache. The response cache only runs on a
+# shared backend (memcached, redis), whose calls block on the network, so its
+# lookups and stores run in a worker thread rather than on the event loop.
+authenticator = CachedJWTAuthentication()
+renderer = JSONRenderer()
+cache_io = partial(sync_to_async, thread_sensitive=False)
+
+
+def lookup(request, endpoint, scopes, vary_user=False, key_params=None, host='', cached=True, checked=False):
+    """(validators, cache key, cached entry) in one trip off the event loop.
+
+    The entry is not read for an uncached endpoint, nor for a 304 unless the
+    view has to check it before answering one (checked).
+    """
+    validators = Validators(request, endpoint, scopes, vary_user=vary_user)
+    if not cached or (not checked and validators.not_modified(request)):
+        return validators, None, None
+    params = request.query_params if key_params is None else key_params
+    key = responsecache.make_key(endpoint, params, scopes, host)
+    return validators, key, responsecache.fetch(key, endpoint)
+
+
+async def authenticate(request):
+    request = Request(request)
+    user = AnonymousUser()
+    # Resolving the user may fall back to the database (blog.authentication)
+    if request.headers.get('Authorization'):
+        result = await sync_to_async(authenticator.authenticate)(request)
+        if result is not None:
+            user, request.auth = result
+    request.user = user
+    return request
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise NotAuthenticated()
+
+
+def error_response(exc, request):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = Response(data, status=exc.status_code)
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        # Same as DRF: 401 with a challenge for the authentication scheme in use
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+    return response
+
+
+def finish(response):
+    if isinstance(response, Response):
+        response.accepted_renderer = renderer
+        response.accepted_media_type = renderer.media_type
+        response.renderer_context = {}
+        with timing.span('render'):
+            response.render()
+    return response
+
+
+def async_read(sync_view):
+    """Serve GET with the decorated coroutine and any other method with the DRF view."""
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                response = await sync_to_async(sync_view)(request, *args, **kwargs)
+                with timing.span('render'):
+                    return response.render()
+            try:
+                request = await authenticate(request)
+                response = await view(request, *args, **kwargs)
+            except APIException as exc:
+                response = error_response(exc, request)
+            return finish(response)
+        return wrapper
+    return decorator
+
+
+# -------------------- CATEGORY --------------------
+@async_read(views.category_list_create)
+async def category_list_create(request):
+    validators, key, data = await cache_io(lookup)(request, 'category-list-create', ['categories'])
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    if data is None:
+        data = CategorySerializer([category async for category in Category.objects.all()], many=True).data
+        await cache_io(responsecache.store)(key, data)
+    return validators.apply(Response(data))
+
+
+# -------------------- BLOG --------------------
+async def blog_feed(request):
+    blogs, serializer_class, paginator, context = views.feed_query(request)
+    page = await paginator.apaginate_queryset(blogs, request)
+    if views.wants_liked(context):
+        context['liked_ids'] = await Like.aliked_blog_ids(request.user, [blog.pk for blog in page])
+    return views.feed_data(page, serializer_class, paginator, context)
+
+
+@async_read(views.blog_list_create)
+async def blog_list_create(request):
+    # liked_by_me is per user, so only anonymous feeds are shared
+    shared = not request.user.is_authenticated
+    validators, key, entry = await cache_io(lookup)(
+        request, 'blog-list-create', views.FEED_SCOPES, vary_user=True, host=request.get_host(), cached=shared)
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    if not shared:
+        return validators.apply(Response(await blog_feed(request)))
+    if entry is None:
+        data = await blog_feed(request)
+        entry = views.cache_entry(data, data['results'])
+        await cache_io(responsecache.store)(key, entry)
+    return validators.apply(Response(views.live_data(entry, lambda data: data['results'])))
+
+
+@async_read(views.blog_detail)
+async def blog_detail(request, pk):
+    require_user(request)
+    scopes = [f'blog:{pk}', 'categories', 'users']
+    # As views.read_blog: a cache hit is a published blog, anything else is checked first
+    validators, cache_key, entry = await cache_io(lookup)(request, 'blog-detail', scopes, vary_user=True,
+                                                          key_params={}, checked=True)
+    if entry is None:
+        blog, liked_ids = await asyncio.gather(
+            Blog.objects.for_detail().filter(pk=pk).afirst(),
+            Like.aliked_blog_ids(request.user, [pk]),
+        )
+        if blog is None:
+            return Response({"detail": "Blog not found"}, status=404)
+        if not views.can_view(request.user, blog):
+            return Response({"detail": "You are not authorized to view this unpublished blog."}, status=403)
+
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    await view_counter.aincrement(pk)
+    if entry is not None:
+        data = views.live_data(entry)
+        liked_ids = await Like.aliked_blog_ids(request.user, [pk])
+    else:
+        data = BlogSerializer(blog).data
+        if blog.is_published:
+            await cache_io(responsecache.store)(cache_key, views.cache_entry(data, [data]))
+    data['liked_by_me'] = bool(liked_ids)
+    return validators.apply(Response(data))
+
+
+# -------------------- COMMENTS --------------------
+@async_read(views.comment_list_create)
+async def comment_list_create(request, blog_id):
+    require_user(request)
+    if not await Blog.objects.filter(pk=blog_id).aexists():
+        return Response({"detail": "Blog not found"}, status=status.HTTP_404_NOT_FOUND)
+    validators = await cache_io(Validators)(request, 'comment-list-create', [f'blog:{blog_id}', 'users'])
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+
+    # Top-level thread by default; ?parent=<id> lazily loads one comment's replies
+    comments = Comment.objects.filter(blog_id=blog_id, deleted_at__isnull=True).select_related('author')
+    parent = request.query_params.get('parent')
+    if parent:
+        try:
+            comments = comments.filter(parent_id=int(parent))
+        except ValueError:
+            return Response({"detail": "Invalid parent"}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        comments = comments.filter(parent__isnull=True)
+
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(comments, request)
+    serializer = CommentSerializer(page, many=True)
+    return validators.apply(paginator.get_paginated_response(serializer.data))
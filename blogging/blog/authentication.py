@@ -0,0 +1,132 @@
+import threading
+from collections import Counter, OrderedDict
+from django.conf import settings
+from django.db import router
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+from . import responsecache
+
+DEFAULTS = {
+    'TIMEOUT': 300,        # seconds an entry lives in the shared cache
+    'MAX_ENTRIES': 1024,   # per-process LRU in front of the shared cache
+    'PREFIX': 'bloguser',
+}
+
+# Claims put in the token by MyTokenObtainPairSerializer.get_token
+CLAIM_FIELDS = ('id', 'username', 'email', 'is_admin', 'is_staff', 'is_superuser', 'is_active')
+# What the user cache holds; every other column stays deferred and loads on first access
+CACHED_FIELDS = CLAIM_FIELDS + ('profile_picture', 'profile_picture_variants')
+
+
+# ------------------- Cached JWT authentication -------------------
+# request.user is built without a query when possible. Each user has a
+# generation (blog.responsecache scope 'user:<id>') that every write to the
+# row bumps (blog.signals). A token issued after the last write carries
+# current claims and is used as is; otherwise the user comes from a per-process
+# LRU or the shared cache, both keyed by (id, generation), and only then from
+# the database. The result is a User instance with the remaining columns
+# deferred, so code that needs full state (e.g. the password) still gets it.
+# Generations only order writes across processes when the cache is shared
+# (responsecache.enabled); otherwise neither the claims nor a cached copy can
+# show another worker's write (a demotion, a deactivation), so every request
+# reads the row.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_USER_CACHE', {})}
+
+
+class UserCache:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._counters = Counter()
+
+    def get(self, user_id, generation):
+        if not responsecache.enabled():
+            self.record('database')
+            return self.load(user_id)
+        key = (user_id, generation)
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self._counters['local'] += 1
+                return values
+
+        options = config()
+        shared_key = f"{options['PREFIX']}:{user_id}:{generation}"
+        values = responsecache.backend().get(shared_key)
+        if values is None:
+            self.record('database')
+            values = self.load(user_id)
+            if values is None:
+                return None
+            responsecache.backend().set(shared_key, values, options['TIMEOUT'])
+        else:
+            self.record('shared')
+        self.put(key, values)
+        return values
+
+    def load(self, user_id):
+        return User.objects.filter(pk=user_id, is_active=True).values(*CACHED_FIELDS).first()
+
+    def record(self, outcome):
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def counters(self):
+        """{'local'|'shared'|'database': n}: where this process answered lookups from."""
+        with self._lock:
+            return dict(self._counters)
+
+    def put(self, key, values):
+        with self._lock:
+            self._entries[key] = values
+            self._entries.move_to_end(key)
+            while len(self._entries) > config()['MAX_ENTRIES']:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def build_user(values):
+    # from_db() expects values in concrete field order
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    return User.from_db(router.db_for_read(User), names, [values[name] for name in names])
+
+
+def full_user(user):
+    """request.user with every cached field loaded (token claims only carry a few)."""
+    values = user_cache.get(user.pk, responsecache.generations([f'user:{user.pk}'])[0])
+    return build_user(values) if values is not None else user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        generation = responsecache.generations([f'user:{user_id}'])[0]
+        issued_at = validated_token.get('iat')
+        if responsecache.enabled() and issued_at and issued_at * 10 ** 9 > generation and all(f in validated_token for f in CLAIM_FIELDS):
+            # Nothing about the user changed since the token was issued
+            values = {name: validated_token[name] for name in CLAIM_FIELDS}
+        else:
+            values = user_cache.get(user_id, generation)
+            if values is None:
+                raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if not values['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return build_user(values)
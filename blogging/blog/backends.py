@@ -0,0 +1,33 @@
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from .models import User
+
+
+# ------------------- Username-or-email authentication -------------------
+# The login identifier may be a username or an email. Both columns are unique
+# and indexed, so one query resolves it and the password is hashed once,
+# whichever was given. A missing user still costs one hash, so response time
+# does not reveal which identifiers exist. A caller that already resolved the
+# identifier (the login serializer, for the lockout) passes the result as
+# `user` and no second query is made.
+def find_user(identifier):
+    candidates = list(User.objects.filter(Q(username=identifier) | Q(email=identifier))[:2])
+    # Someone's username can look like someone else's email: the username wins
+    return next((u for u in candidates if u.username == identifier), candidates[0] if candidates else None)
+
+
+class UsernameOrEmailBackend(ModelBackend):
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = kwargs['user'] if 'user' in kwargs else find_user(username)
+        if user is None:
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,181 @@
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone as dt_timezone
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from .authentication import user_cache
+from .blacklist import blacklist_filter
+from .models import Blog, Category, User
+from .viewcounter import view_counter
+from . import responsecache, seeding
+
+# Seed presets (see blog.seeding); 'current' benchmarks the configured database as it is
+SIZES = {
+    'small': {'users': 200, 'categories': 10, 'blogs': 1000, 'comments': 5000, 'likes': 10000},
+    'medium': {'users': 2000, 'categories': 20, 'blogs': 20000, 'comments': 100000, 'likes': 200000},
+    'large': {'users': 20000, 'categories': 50, 'blogs': 200000, 'comments': 1000000, 'likes': 2000000},
+}
+SEED_DEFAULTS = {'skew': 1.1, 'published': 0.9, 'replies': 0.25, 'deleted': 0.02, 'days': 365, 'seed': 1,
+                 'prefix': 'bench', 'password': 'bench-pass-123', 'chunk_size': 5000}
+
+READER, PASSWORD = 'bench-reader', 'Bench-pass-123'
+SEARCH_QUERY = 'python cache'
+
+
+# ------------------- Endpoint benchmarks -------------------
+# Each endpoint is requested through the full middleware stack with the test
+# client. Every sample records wall time, the number and total time of its SQL
+# queries and the response size. The response cache is cleared before each
+# request unless warm=True, so by default the numbers are for the query path.
+# name -> (method, path template, body); paths are filled from fixtures()
+ENDPOINTS = {
+    'feed': ('get', '/api/blogs/', None),
+    'feed_category': ('get', '/api/blogs/?category={category}', None),
+    'feed_sparse': ('get', '/api/blogs/?fields=id,title,likes_count,comments_count', None),
+    'detail': ('get', '/api/blogs/{popular}/', None),
+    'search': ('get', '/api/blogs/?search=' + SEARCH_QUERY.replace(' ', '+'), None),
+    'like_toggle': ('post', '/api/blogs/{popular}/like-toggle/', None),
+    'comments': ('get', '/api/blogs/{popular}/comments/', None),
+    'stats': ('get', '/api/stats/', None),
+    'login': ('post', '/api/auth/login/', {'username': READER, 'password': PASSWORD}),
+}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of sorted samples; shared by the benchmark and load test commands."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def fixtures():
+    """An admin reader and the ids the endpoint paths refer to."""
+    reader = User.objects.filter(username=READER).first() or User.objects.create_user(
+        username=READER, email='bench-reader@example.com', password=PASSWORD, is_admin=True, is_staff=True)
+    popular = (Blog.objects.filter(is_published=True).exclude(author=reader)
+               .order_by('-comment_count', '-likes_count').values_list('pk', flat=True).first())
+    category = Category.objects.order_by('pk').values_list('pk', flat=True).first()
+    if popular is None:
+        raise ValueError("No published blogs to benchmark; seed the database first.")
+    return reader, {'popular': popular, 'category': category or ''}
+
+
+def measure(client, method, path, body, iterations, warm):
+    def send():
+        request = getattr(client, method)
+        return request(path, body, content_type='application/json') if body else request(path)
+
+    send()  # warm up
+    timings, sql_times, queries, sizes, statuses = [], [], [], [], set()
+    for _ in range(iterations):
+        if not warm:
+            responsecache.backend().clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = send()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        sql_times.append(sum(float(query['time']) for query in captured.captured_queries) * 1000)
+        sizes.append(len(response.content))
+        statuses.add(response.status_code)
+    timings.sort()
+    return {
+        'p50_ms': percentile(timings, 0.5),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'queries': max(queries),
+        'sql_ms': sum(sql_times) / len(sql_times),
+        'bytes': max(sizes),
+        'status': sorted(statuses),
+    }
+
+
+def run_endpoints(iterations=20, warm=False, endpoints=None):
+    _, ids = fixtures()
+    host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'testserver')
+    client = Client(SERVER_NAME=host)
+    response = client.post('/api/auth/login/', {'username': READER, 'password': PASSWORD})
+    if response.status_code != 200:
+        raise ValueError(f"Benchmark login failed with {response.status_code}")
+    client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {response.json()['access']}"
+    results = {}
+    for name in endpoints or ENDPOINTS:
+        method, template, body = ENDPOINTS[name]
+        results[name] = measure(client, method, template.format(**ids), body, iterations, warm)
+    return results
+
+
+def run_size(size, iterations=20, warm=False, endpoints=None):
+    """Benchmark one dataset size; every size but 'current' gets its own throwaway database."""
+    if size == 'current':
+        # Rolled back, so the reader account and like toggles leave nothing behind
+        with transaction.atomic():
+            rows = {'blogs': Blog.objects.count(), 'users': User.objects.count()}
+            results = run_endpoints(iterations, warm, endpoints)
+            transaction.set_rollback(True)
+        return {'rows': rows, 'endpoints': results}
+
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        # An in-memory SQLite database survives close(), so each size gets a file
+        test_settings['NAME'] = os.path.join(tempfile.gettempdir(), f'blog-benchmark-{size}.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        end = datetime.now(dt_timezone.utc).replace(microsecond=0)
+        rows = seeding.run({**SEED_DEFAULTS, **SIZES[size]}, end)
+        return {'rows': rows, 'endpoints': run_endpoints(iterations, warm, endpoints)}
+    finally:
+        # Buffered views belong to the throwaway database
+        view_counter.flush()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = test_name
+        reset_process_state()
+
+
+def reset_process_state():
+    # Generations, cached users and the blacklist filter all describe the database just dropped
+    responsecache.backend().clear()
+    user_cache.clear()
+    blacklist_filter.reset()
+
+
+def metadata(iterations, warm):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'created_at': datetime.now(dt_timezone.utc).isoformat(),
+        'commit': commit,
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'iterations': iterations,
+        'warm_cache': warm,
+    }
+
+
+# ---------------- Comparing runs ----------------
+def compare(baseline, current, threshold=0.2, min_ms=1.0):
+    """Endpoints whose p95 grew by more than threshold (and min_ms), or that run more queries."""
+    regressions = []
+    for size, result in current['sizes'].items():
+        before_endpoints = baseline.get('sizes', {}).get(size, {}).get('endpoints', {})
+        for name, now in result['endpoints'].items():
+            before = before_endpoints.get(name)
+            if before is None:
+                continue
+            if now['p95_ms'] > before['p95_ms'] * (1 + threshold) and now['p95_ms'] - before['p95_ms'] > min_ms:
+                regressions.append({'size': size, 'endpoint': name, 'metric': 'p95_ms',
+                                    'baseline': before['p95_ms'], 'current': now['p95_ms']})
+            if now['queries'] > before['queries']:
+                regressions.append({'size': size, 'endpoint': name, 'metric': 'queries',
+                                    'baseline': before['queries'], 'current': now['queries']})
+    return regressions
@@ -0,0 +1,206 @@
+import hashlib
+import math
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from . import responsecache
+
+DEFAULTS = {
+    'ERROR_RATE': 0.01,        # false-positive rate of the pre-filter
+    'MIN_CAPACITY': 1024,
+    'REBUILD_INTERVAL': 3600,  # seconds between full rebuilds (drops expired tokens, resizes)
+    'SYNC_WINDOW': 30,         # seconds an id skipped by a sync is re-read, for rows that commit out of order
+    'MAX_GAPS': 100,           # skipped ids tracked at once (the newest are kept)
+    'CHUNK_SIZE': 1000,        # rows per compaction DELETE
+}
+
+SCOPE = 'token_blacklist'
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_TOKEN_BLACKLIST', {})}
+
+
+# ------------------- Bloom filter -------------------
+class BloomFilter:
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.capacity = capacity
+        self.count = 0
+
+    def positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.sha256(item.encode()).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:16], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+# ------------------- Blacklist pre-filter -------------------
+# A Bloom filter of the jtis of blacklisted, unexpired refresh tokens sits in
+# front of the blacklist query: "not in the filter" means not blacklisted, so
+# the query only runs for blacklisted tokens and false positives. Every new
+# blacklist row bumps the shared 'token_blacklist' generation (blog.signals);
+# a filter built at an older generation first reads the rows added since, so a
+# token blacklisted by another process is never missed. A sync reads only ids
+# past the newest one it has seen, plus ids it skipped in the last SYNC_WINDOW
+# seconds: those belong to inserts that had not committed yet (or rolled back),
+# and their commit bumps the generation again. That needs a generation every
+# process sees (responsecache.enabled); with a per-process cache every check
+# goes to the database instead.
+#
+# Expired tokens leave the filter on its hourly rebuild, but their rows stay
+# until they are compacted: the long-running publish_scheduled worker does it
+# daily, or run `manage.py compact_tokens` from cron when using --once.
+class BlacklistFilter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._latency = 0.0
+        self.bloom = None
+        self.generation = None
+        self.max_id = 0
+        self.gaps = {}
+        self.built_at = 0.0
+
+    def rebuild(self, generation=None):
+        options = config()
+        generation = generation or responsecache.generations([SCOPE])[0]
+        rows = (BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+                .values_list('id', 'token__jti'))
+        live = list(rows.iterator())
+        bloom = BloomFilter(max(options['MIN_CAPACITY'], 2 * len(live)), options['ERROR_RATE'])
+        for _, jti in live:
+            bloom.add(jti)
+        max_id = max((pk for pk, _ in live), default=0)
+        with self._lock:
+            self.bloom = bloom
+            self.generation = generation
+            self.max_id = max_id
+            self.gaps = self.skipped(0, max_id, {pk for pk, _ in live}, time.monotonic())
+            self.built_at = time.monotonic()
+            self._counters['rebuilds'] += 1
+
+    def sync(self):
+        generation = responsecache.generations([SCOPE])[0]
+        if self.bloom is None or time.monotonic() - self.built_at > config()['REBUILD_INTERVAL'] \
+                or self.bloom.count > self.bloom.capacity:
+            self.rebuild(generation)
+        elif generation != self.generation:
+            now = time.monotonic()
+            with self._lock:
+                max_id = self.max_id
+                gaps = {pk: at for pk, at in self.gaps.items() if now - at < config()['SYNC_WINDOW']}
+            added = list(BlacklistedToken.objects.filter(Q(id__gt=max_id) | Q(id__in=list(gaps)))
+                         .values_list('id', 'token__jti'))
+            found = {pk for pk, _ in added}
+            with self._lock:
+                for _, jti in added:
+                    self.bloom.add(jti)
+                top = max(found, default=max_id)
+                gaps = {pk: at for pk, at in gaps.items() if pk not in found}
+                gaps.update(self.skipped(max_id, top, found, now))
+                self.gaps = dict(sorted(gaps.items())[-config()['MAX_GAPS']:])
+                self.max_id = max(self.max_id, top)
+                self.generation = generation
+                self._counters['syncs'] += 1
+
+    @staticmethod
+    def skipped(after, upto, found, now):
+        """Ids between after and upto that were not read, newest MAX_GAPS only."""
+        start = max(after, upto - config()['MAX_GAPS'])
+        return {pk: now for pk in range(start + 1, upto) if pk not in found}
+
+    def add(self, jti):
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+    def is_blacklisted(self, jti):
+        start = time.perf_counter()
+        filtered = responsecache.enabled()
+        if filtered:
+            self.sync()
+        if filtered and jti not in self.bloom:
+            blacklisted, outcome = False, 'filtered'
+        else:
+            blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            outcome = 'blacklisted' if blacklisted else 'false_positives' if filtered else 'unfiltered'
+        with self._lock:
+            self._counters['checks'] += 1
+            self._counters[outcome] += 1
+            self._latency += time.perf_counter() - start
+        return blacklisted
+
+    def metrics(self):
+        """Check counters for this process plus the filter's shape."""
+        with self._lock:
+            counters = dict(self._counters)
+            checks = counters.get('checks', 0)
+            return {
+                **counters,
+                'avg_check_ms': self._latency / checks * 1000 if checks else 0.0,
+                'filter_entries': self.bloom.count if self.bloom else 0,
+                'filter_bytes': len(self.bloom.bits) if self.bloom else 0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.bloom = None
+            self.gaps = {}
+            self._counters.clear()
+            self._latency = 0.0
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class FilteredRefreshToken(RefreshToken):
+
+    def check_blacklist(self):
+        if blacklist_filter.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+
+# ------------------- Compaction -------------------
+def table_sizes():
+    return {
+        'outstanding_tokens': OutstandingToken.objects.count(),
+        'blacklisted_tokens': BlacklistedToken.objects.count(),
+    }
+
+
+def purge_expired(now=None, chunk_size=None):
+    """Delete expired outstanding tokens and their blacklist rows in chunks; returns rows deleted."""
+    now = now or timezone.now()
+    chunk_size = chunk_size or config()['CHUNK_SIZE']
+    purged = {'outstanding_tokens': 0, 'blacklisted_tokens': 0}
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lte=now).order_by('id')
+                   .values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            break
+        purged['blacklisted_tokens'] += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+        purged['outstanding_tokens'] += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        if len(ids) < chunk_size:
+            break
+    return purged
@@ -0,0 +1,142 @@
+import logging
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers
+from .models import Blog, Comment
+from . import responsecache, rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CHUNK_SIZE': 500,    # rows per transaction
+    'MAX_ITEMS': 5000,    # ids per request, or rows a filter may match
+}
+
+BLOG_ACTIONS = ('publish', 'unpublish', 'recategorize', 'delete')
+COMMENT_ACTIONS = ('delete',)
+
+# filter name -> lookup
+BLOG_FILTERS = {
+    'author': 'author_id',
+    'category': 'category_id',
+    'is_published': 'is_published',
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lt',
+}
+COMMENT_FILTERS = {
+    'blog': 'blog_id',
+    'author': 'author_id',
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lt',
+}
+
+UPDATED, DELETED, UNCHANGED, NOT_FOUND, FAILED = 'updated', 'deleted', 'unchanged', 'not_found', 'failed'
+
+
+# ------------------- Bulk moderation -------------------
+# Targets (an id list or a filter) are resolved to ids up front and processed
+# CHUNK_SIZE at a time, each chunk in its own transaction: the rows are locked
+# and read once, then changed with one UPDATE or DELETE. Response cache scopes,
+# comment counters and stats rollups are adjusted once per chunk instead of
+# once per row. A chunk that fails is reported as failed and the rest go on.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_BULK', {})}
+
+
+def target_ids(queryset, lookups, ids=None, filters=None):
+    """The ids to act on: the given ones (deduplicated, in order) or every row the filter matches."""
+    if ids is not None:
+        return list(dict.fromkeys(ids))
+    limit = config()['MAX_ITEMS']
+    queryset = queryset.filter(**{lookups[name]: value for name, value in filters.items()})
+    matched = list(queryset.order_by('pk').values_list('pk', flat=True)[:limit + 1])
+    if len(matched) > limit:
+        raise serializers.ValidationError({'filter': f'Matches more than {limit} items; narrow it down.'})
+    return matched
+
+
+def run(action, ids, apply):
+    outcomes = {}
+    chunk_size = config()['CHUNK_SIZE']
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        try:
+            with transaction.atomic(), responsecache.batched(), rollups.batched():
+                outcomes.update(apply(chunk))
+        except DatabaseError:
+            logger.exception("Bulk %s failed for %d items", action, len(chunk))
+            outcomes.update(dict.fromkeys(chunk, FAILED))
+    results = [{'id': pk, 'status': outcomes.get(pk, NOT_FOUND)} for pk in ids]
+    return {
+        'action': action,
+        'summary': dict(Counter(result['status'] for result in results)),
+        'results': results,
+    }
+
+
+def locked(queryset, chunk, *fields):
+    return list(queryset.select_for_update().filter(pk__in=chunk).order_by('pk').values_list('pk', *fields))
+
+
+def decrement(model, field, counts):
+    # One UPDATE per distinct amount rather than one per row
+    by_count = defaultdict(list)
+    for pk, count in counts.items():
+        by_count[count].append(pk)
+    for count, pks in by_count.items():
+        model.objects.filter(pk__in=pks).update(**{field: F(field) - count})
+
+
+# ---------------- Blogs ----------------
+def set_blog_field(field, value, extra=None):
+    def apply(chunk):
+        rows = dict(locked(Blog.objects, chunk, field))
+        changed = [pk for pk, current in rows.items() if current != value]
+        if changed:
+            Blog.objects.filter(pk__in=changed).update(**{field: value, 'updated_at': timezone.now(), **(extra or {})})
+            responsecache.bump('blogs', *[f'blog:{pk}' for pk in changed])
+        return {pk: UPDATED if pk in changed else UNCHANGED for pk in rows}
+    return apply
+
+
+def delete_blogs(chunk):
+    found = [pk for pk, in locked(Blog.objects, chunk)]
+    # Cascaded likes/comments roll up per day and invalidate per chunk (both batched by run())
+    Blog.objects.filter(pk__in=found).delete()
+    return dict.fromkeys(found, DELETED)
+
+
+def blogs(action, ids=None, filters=None, category=None):
+    if action == 'publish':
+        apply = set_blog_field('is_published', True)
+    elif action == 'unpublish':
+        # A past publish_at would have the scheduler publish the post again
+        apply = set_blog_field('is_published', False, {'publish_at': None})
+    elif action == 'recategorize':
+        apply = set_blog_field('category_id', category.pk if category else None)
+    else:
+        apply = delete_blogs
+    return run(action, target_ids(Blog.objects.all(), BLOG_FILTERS, ids, filters), apply)
+
+
+# ---------------- Comments ----------------
+def soft_delete_comments(chunk):
+    rows = locked(Comment.objects, chunk, 'blog_id', 'parent_id', 'deleted_at')
+    live = [(pk, blog_id, parent_id) for pk, blog_id, parent_id, deleted_at in rows if deleted_at is None]
+    if live:
+        Comment.objects.filter(pk__in=[pk for pk, _, _ in live]).update(deleted_at=timezone.now())
+        # Same bookkeeping as Comment.soft_delete(), grouped per blog and per parent
+        decrement(Blog, 'comment_count', Counter(blog_id for _, blog_id, _ in live))
+        decrement(Comment, 'reply_count', Counter(parent_id for _, _, parent_id in live if parent_id))
+        responsecache.bump('blogs', *{f'blog:{blog_id}' for _, blog_id, _ in live})
+    live_ids = {pk for pk, _, _ in live}
+    return {pk: DELETED if pk in live_ids else UNCHANGED for pk, *_ in rows}
+
+
+def comments(action, ids=None, filters=None):
+    # A filter only matches comments that are still live
+    queryset = Comment.objects.filter(deleted_at__isnull=True) if ids is None else Comment.objects.all()
+    return run(action, target_ids(queryset, COMMENT_FILTERS, ids, filters), soft_delete_comments)
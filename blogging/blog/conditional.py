@@ -0,0 +1,40 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from . import responsecache
+
+
+# ------------------- Conditional GET -------------------
+# ETag and Last-Modified come from the response cache generations of the scopes
+# a payload depends on, so validating a request costs one cache round trip and
+# no query or serialization. ETags are weak: buffered view counts can move
+# between generations without changing the ETag. Without a coherent cache
+# (responsecache.enabled) no validators are sent and every request gets a 200.
+class Validators:
+
+    def __init__(self, request, endpoint, scopes, vary_user=False):
+        self.vary_user = vary_user
+        self.enabled = responsecache.enabled()
+        generations = responsecache.generations(scopes)
+        parts = [endpoint, responsecache.normalize_params(request.query_params), generations]
+        if vary_user:
+            parts.append(request.user.pk)
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+        self.etag = f'W/"{digest}"'
+        self.last_modified = max(generations) // 10 ** 9
+
+    def not_modified(self, request):
+        """304 response when the client's copy is current, otherwise None."""
+        if not self.enabled:
+            return None
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        return self.apply(response) if response is not None else None
+
+    def apply(self, response):
+        if not self.enabled:
+            return response
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        if self.vary_user:
+            patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,61 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Blog, User
+
+# ------------------- Streaming exports -------------------
+# dataset -> (queryset, columns). Rows are read in primary-key batches, so memory
+# stays flat whatever the table size (MySQL's driver buffers a whole
+# iterator() result client-side, which defeats server-side cursors there).
+DATASETS = {
+    'users': (User.objects.all(), ['id', 'username', 'email', 'is_admin', 'date_joined']),
+    'blogs': (Blog.objects.all(), ['id', 'title', 'author_id', 'category_id', 'is_published',
+                                   'created_at', 'likes_count', 'views']),
+}
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CHUNK_SIZE = 2000
+
+
+def iter_rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        rows = list(batch.values_list('pk', *columns)[:chunk_size])
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def stream_ndjson(rows, columns):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream(dataset, output):
+    queryset, columns = DATASETS[dataset]
+    rows = iter_rows(queryset, columns)
+    if output == 'csv':
+        return stream_csv(rows, columns)
+    return stream_ndjson(rows, columns)
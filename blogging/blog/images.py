@@ -0,0 +1,227 @@
+import atexit
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, JpegImagePlugin
+from . import responsecache
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKERS': 2,             # background threads; 0 processes inline (tests, scripts)
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+    'PREFIX': 'derivatives',
+}
+
+# variant name -> longest edge in pixels (never upscaled)
+VARIANTS = {'thumb': 160, 'card': 640, 'full': 1600}
+
+# (app label, model) -> (image field, variants field, cache scope of a row)
+SOURCES = {
+    ('blog', 'Blog'): ('image', 'image_variants', lambda pk: ['blogs', f'blog:{pk}']),
+    ('blog', 'User'): ('profile_picture', 'profile_picture_variants', lambda pk: ['users', f'user:{pk}']),
+}
+
+
+# ------------------- Image derivatives -------------------
+# Uploaded images are re-encoded into a few sizes off the request path. The
+# variants map stored next to the image records which upload it was built
+# from ('source'), so a save only schedules work when the image changed.
+# Files are named after a hash of their bytes: identical renders share a file
+# and a URL can be cached forever.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_IMAGE_PIPELINE', {})}
+
+
+def render(source):
+    """Encode every variant of an image file; returns {name: (bytes, width, height)}."""
+    options = config()
+    with Image.open(source) as original:
+        # Apply the EXIF orientation before dropping the metadata
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    rendered = {}
+    for name, edge in VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail((edge, edge), Image.LANCZOS)
+        buffer = io.BytesIO()
+        # Nothing from the source (EXIF, ICC, XMP) is passed to the encoder
+        variant.save(buffer, format=options['FORMAT'], quality=options['QUALITY'])
+        rendered[name] = (buffer.getvalue(), variant.width, variant.height)
+    return rendered
+
+
+def strip_metadata(source):
+    """Re-encode an uploaded original in its own format without EXIF/XMP (GPS position, camera)."""
+    with Image.open(source) as original:
+        image_format = original.format
+        # Re-encoded with the source's own tables, so quality and size stay about the same
+        options = ({'qtables': original.quantization, 'subsampling': JpegImagePlugin.get_sampling(original)}
+                   if image_format == 'JPEG' else {})
+        image = ImageOps.exif_transpose(original)
+    # Keep only what changes how the pixels look
+    image.info = {key: value for key, value in image.info.items() if key in ('transparency', 'icc_profile')}
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def strip_upload(instance, label):
+    """Strip a newly assigned image before the model saves it to storage."""
+    file = getattr(instance, SOURCES[label][0])
+    if not file or file._committed:
+        return
+    try:
+        file.seek(0)
+        data = strip_metadata(file)
+    except Exception:
+        logger.warning("Could not strip metadata from %s", file.name, exc_info=True)
+        return
+    setattr(instance, SOURCES[label][0], ContentFile(data, name=file.name))
+
+
+def strip_stored(label, pk):
+    """Rewrite one row's stored original without its metadata; returns whether it had any."""
+    model = apps.get_model(*label)
+    field, variants_field, scopes = SOURCES[label]
+    row = model.objects.filter(pk=pk).values(field, variants_field).first()
+    if not row or not row[field]:
+        return False
+    with default_storage.open(row[field], 'rb') as handle, Image.open(handle) as image:
+        if not (image.getexif() or 'xmp' in image.info or 'XML:com.adobe.xmp' in image.info):
+            return False
+        handle.seek(0)
+        data = strip_metadata(handle)
+    name = default_storage.save(row[field], ContentFile(data))
+    variants = row[variants_field] or {}
+    if variants.get('source') == row[field]:
+        variants['source'] = name
+    # Only swap files if the image was not replaced meanwhile
+    if not model.objects.filter(pk=pk, **{field: row[field]}).update(**{field: name, variants_field: variants}):
+        default_storage.delete(name)
+        return False
+    default_storage.delete(row[field])
+    responsecache.bump(*scopes(pk))
+    return True
+
+
+def store(data):
+    options = config()
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    name = f"{options['PREFIX']}/{digest[:2]}/{digest}.{options['FORMAT'].lower()}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+def process(label, pk):
+    """Build and record the variants of one row's image."""
+    model = apps.get_model(*label)
+    field, variants_field, scopes = SOURCES[label]
+    source = model.objects.filter(pk=pk).values_list(field, flat=True).first()
+    if not source:
+        return None
+    with default_storage.open(source, 'rb') as handle:
+        rendered = render(handle)
+    variants = {'source': source}
+    for name, (data, width, height) in rendered.items():
+        variants[name] = {'name': store(data), 'width': width, 'height': height}
+    # Only record the result if the image was not replaced meanwhile
+    if model.objects.filter(pk=pk, **{field: source}).update(**{variants_field: variants}):
+        responsecache.bump(*scopes(pk))
+    return variants
+
+
+def needs_processing(instance, label):
+    field, variants_field, _ = SOURCES[label]
+    image = getattr(instance, field)
+    variants = getattr(instance, variants_field) or {}
+    return bool(image) and variants.get('source') != image.name
+
+
+# ---------------- Worker pool ----------------
+_executor = None
+_executor_lock = threading.Lock()
+_queued = 0
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config()['WORKERS'], thread_name_prefix='blog-images')
+        return _executor
+
+
+def build(label, pk):
+    try:
+        process(label, pk)
+    except Exception:
+        logger.exception("Could not build image variants for %s.%s %s", *label, pk)
+
+
+def run_in_pool(label, pk):
+    global _queued
+    # Worker threads hold their own database connection
+    close_old_connections()
+    try:
+        build(label, pk)
+    finally:
+        close_old_connections()
+        with _executor_lock:
+            _queued -= 1
+
+
+def submit(label, pk):
+    """Queue a build on the pool, counted in pending() until it finishes."""
+    global _queued
+    with _executor_lock:
+        _queued += 1
+    return executor().submit(run_in_pool, label, pk)
+
+
+def schedule(label, pk):
+    """Queue variant generation once the current transaction commits."""
+    def queue():
+        if config()['WORKERS'] <= 0:
+            build(label, pk)
+        else:
+            submit(label, pk)
+    transaction.on_commit(queue)
+
+
+def pending():
+    """Jobs submitted to this process's pool and not finished yet."""
+    return _queued
+
+
+@atexit.register
+def shutdown():
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+
+
+# ---------------- Serialization ----------------
+def srcset(variants, request=None):
+    """{'thumb': url, 'card': url, 'full': url, 'srcset': 'url 160w, ...'}, or None before processing."""
+    if not variants or 'source' not in variants:
+        return None
+    result, candidates = {}, []
+    for name in VARIANTS:
+        if name not in variants:
+            continue
+        url = default_storage.url(variants[name]['name'])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        result[name] = url
+        candidates.append(f"{url} {variants[name]['width']}w")
+    result['srcset'] = ', '.join(candidates)
+    return result
@@ -0,0 +1,348 @@
+import io
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from itertools import accumulate
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.urls import Resolver404, resolve
+from .benchmarks import percentile
+from .models import Blog, Category, User
+from .seeding import words, zipf_weights
+from .viewcounter import view_counter
+
+# Weighted request mix; every name is a key of ACTIONS
+DEFAULT_MIX = {'feed': 50, 'detail': 25, 'like': 10, 'comment': 5, 'login': 10}
+# Latency histogram bucket upper bounds, in milliseconds
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Blogs the mix picks from, most popular first
+HOT_BLOGS = 1000
+
+# Replayed GETs of these are sent without a token, like the anonymous feed
+ANONYMOUS_READS = ('blog-list-create', 'category-list-create')
+
+
+class Request:
+    __slots__ = ('endpoint', 'method', 'path', 'body', 'account', 'due')
+
+    def __init__(self, endpoint, method, path, body=None, account=None, due=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.body = body
+        self.account = account  # index into Targets.accounts, sent as a Bearer token
+        self.due = due          # seconds after the start; None sends as soon as a worker is free
+
+
+# ------------------- Transports -------------------
+# Both return (status, body bytes); status 0 means the request never got a
+# response. In-process requests go straight into Django's WSGI handler, so
+# the numbers cover the application and database, not a web server.
+class InProcess:
+
+    def __init__(self):
+        self.handler = WSGIHandler()
+        self.host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+
+    def send(self, method, path, body, headers):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': self.host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(body or b'')), 'wsgi.input': io.BytesIO(body or b''),
+            'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0),
+            'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            'HTTP_HOST': self.host,
+            **{f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()},
+        }
+        if 'Content-Type' in headers:
+            environ['CONTENT_TYPE'] = headers['Content-Type']
+        statuses = []
+        response = self.handler(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+        try:
+            content = b''.join(response)
+        finally:
+            response.close()
+        return int(statuses[0].split()[0]), content
+
+    def close(self):
+        # Each worker thread opened its own database connection
+        connections.close_all()
+
+
+class Remote:
+    """A keep-alive connection per worker thread to a running server."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.local = threading.local()
+
+    def send(self, method, path, body, headers):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self.connection_class(self.netloc, timeout=30)
+        try:
+            connection.request(method, self.prefix + path, body, headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, HTTPException):
+            connection.close()
+            self.local.connection = None
+            return 0, b''
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+
+
+# ------------------- Targets -------------------
+class Targets:
+    """Seeded accounts (logged in up front) and the blogs and categories the mix requests."""
+
+    def __init__(self, client, prefix, password, accounts=20, skew=1.1):
+        self.password = password
+        self.usernames = list(User.objects.filter(username__startswith=f'{prefix}_user')
+                              .order_by('pk').values_list('username', flat=True)[:accounts])
+        blogs = list(Blog.objects.filter(is_published=True).order_by('-likes_count', '-comment_count', 'pk')
+                     .values_list('pk', flat=True)[:HOT_BLOGS])
+        if not self.usernames or not blogs:
+            raise ValueError(f"No '{prefix}_user' accounts or published blogs; run manage.py seed first.")
+        # Popular posts take most of the traffic, as they would in production
+        self.blogs = blogs
+        self.blog_weights = list(accumulate(zipf_weights(len(blogs), skew)))
+        self.categories = list(Category.objects.order_by('pk').values_list('pk', flat=True))
+        self.accounts = [self.login(client, username) for username in self.usernames]
+
+    def login(self, client, username):
+        status, content = client.send('POST', '/api/auth/login/', self.credentials(username),
+                                      {'Content-Type': 'application/json'})
+        if status != 200:
+            raise ValueError(f"Login as {username} failed with {status}")
+        return json.loads(content)['access']
+
+    def credentials(self, username):
+        return json.dumps({'username': username, 'password': self.password}).encode()
+
+    def blog(self, rng):
+        return rng.choices(self.blogs, cum_weights=self.blog_weights)[0]
+
+    def account(self, rng):
+        return rng.randrange(len(self.accounts))
+
+
+# ------------------- Request mix -------------------
+def feed(rng, targets):
+    if targets.categories and rng.random() < 0.3:
+        return Request('feed', 'GET', f'/api/blogs/?category={rng.choice(targets.categories)}')
+    return Request('feed', 'GET', '/api/blogs/')
+
+
+def detail(rng, targets):
+    return Request('detail', 'GET', f'/api/blogs/{targets.blog(rng)}/', account=targets.account(rng))
+
+
+def like(rng, targets):
+    return Request('like', 'POST', f'/api/blogs/{targets.blog(rng)}/like-toggle/', account=targets.account(rng))
+
+
+def comment(rng, targets):
+    body = json.dumps({'comment': words(rng, 3, 20).capitalize()}).encode()
+    return Request('comment', 'POST', f'/api/blogs/{targets.blog(rng)}/comments/', body, targets.account(rng))
+
+
+def login(rng, targets):
+    return Request('login', 'POST', '/api/auth/login/', targets.credentials(rng.choice(targets.usernames)))
+
+
+ACTIONS = {'feed': feed, 'detail': detail, 'like': like, 'comment': comment, 'login': login}
+
+
+def parse_mix(text):
+    """'feed=60,detail=40' -> {'feed': 60.0, 'detail': 40.0}"""
+    mix = {}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in ACTIONS:
+            raise ValueError(f"Unknown request type '{name}'; choose from {', '.join(ACTIONS)}.")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Weight for '{name}' must be a number.")
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The mix needs at least one positive weight.")
+    return mix
+
+
+def generate(targets, mix, count, seed=None):
+    rng = random.Random(seed)
+    names = list(mix)
+    cum_weights = list(accumulate(mix.values()))
+    for _ in range(count):
+        yield ACTIONS[rng.choices(names, cum_weights=cum_weights)[0]](rng, targets)
+
+
+# ------------------- Access log replay -------------------
+# Reads combined/common log format (nginx, gunicorn) and Django's runserver
+# lines. Logs hold no bodies or tokens: GETs are replayed as they are, with a
+# seeded account's token unless the endpoint serves anonymous readers; like
+# toggles, comments and logins are rebuilt as in the mix; other writes are
+# skipped. Timestamps keep the original spacing, divided by `speed`.
+LOG_LINE = re.compile(r'\[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3})')
+TIME_FORMATS = ('%d/%b/%Y:%H:%M:%S %z', '%d/%b/%Y %H:%M:%S')
+
+
+def parse_time(text):
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, time_format).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def endpoint_name(path):
+    try:
+        return resolve(path.partition('?')[0]).url_name or 'other'
+    except Resolver404:
+        return 'other'
+
+
+def replayed(rng, targets, method, path):
+    endpoint = endpoint_name(path)
+    if method in ('GET', 'HEAD'):
+        account = None if endpoint in ANONYMOUS_READS else targets.account(rng)
+        return Request(endpoint, method, path, account=account)
+    if method != 'POST':
+        return None
+    if endpoint == 'blog-like-toggle':
+        return Request(endpoint, method, path, account=targets.account(rng))
+    if endpoint == 'comment-list-create':
+        body = json.dumps({'comment': words(rng, 3, 20).capitalize()}).encode()
+        return Request(endpoint, method, path, body, targets.account(rng))
+    if endpoint == 'auth-login':
+        return Request(endpoint, method, path, targets.credentials(rng.choice(targets.usernames)))
+    return None
+
+
+def replay(lines, targets, speed=1.0, seed=None, skipped=None):
+    """Requests for each usable log line; unusable lines are counted in `skipped` by reason."""
+    rng = random.Random(seed)
+    skipped = skipped if skipped is not None else Counter()
+    first = None
+    for line in lines:
+        match = LOG_LINE.search(line)
+        if match is None:
+            skipped['unparsed'] += 1
+            continue
+        request = replayed(rng, targets, match['method'], match['path'])
+        if request is None:
+            skipped[f"{match['method']} {endpoint_name(match['path'])}"] += 1
+            continue
+        timestamp = parse_time(match['time'])
+        if speed and timestamp is not None:
+            first = timestamp if first is None else first
+            request.due = max(0.0, timestamp - first) / speed
+        yield request
+
+
+# ------------------- Driving load -------------------
+# `concurrency` workers share one request stream. A request's due time (from
+# rps pacing or a replayed log) holds it back until then; a request that is
+# due while every worker is busy is sent late, and its latency is still
+# measured from when it was sent. Each worker keeps its own samples, merged
+# once the run is over.
+def run(client, requests, targets, concurrency=10, rps=None, duration=None):
+    lock = threading.Lock()
+    stream = iter(requests)
+    sent = [0]
+    start = time.perf_counter()
+
+    def take():
+        with lock:
+            request = next(stream, None)
+            if request is not None and rps:
+                request.due = sent[0] / rps
+            sent[0] += 1
+            return request
+
+    def work(samples):
+        try:
+            while not duration or time.perf_counter() - start < duration:
+                request = take()
+                if request is None:
+                    return
+                if request.due is not None:
+                    wait = start + request.due - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                headers = {}
+                if request.body:
+                    headers['Content-Type'] = 'application/json'
+                if request.account is not None:
+                    headers['Authorization'] = f'Bearer {targets.accounts[request.account]}'
+                began = time.perf_counter()
+                status, _ = client.send(request.method, request.path, request.body, headers)
+                samples.append((request.endpoint, (time.perf_counter() - began) * 1000, status))
+        finally:
+            client.close()
+
+    per_worker = [[] for _ in range(concurrency)]
+    threads = [threading.Thread(target=work, args=(samples,)) for samples in per_worker]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if isinstance(client, InProcess):
+        view_counter.flush()
+    return summarize([sample for samples in per_worker for sample in samples], elapsed)
+
+
+# ---------------- Report ----------------
+def histogram(timings):
+    counts = Counter()
+    for timing in timings:
+        bucket = next((bound for bound in BUCKETS if timing <= bound), None)
+        counts[f'<={bucket}ms' if bucket else f'>{BUCKETS[-1]}ms'] += 1
+    labels = [f'<={bound}ms' for bound in BUCKETS] + [f'>{BUCKETS[-1]}ms']
+    return {label: counts[label] for label in labels}
+
+
+def stats(samples, elapsed):
+    timings = sorted(timing for _, timing, _ in samples)
+    errors = sum(1 for _, _, status in samples if not 200 <= status < 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(timings, 0.5) if timings else None,
+        'p95_ms': percentile(timings, 0.95) if timings else None,
+        'p99_ms': percentile(timings, 0.99) if timings else None,
+        'max_ms': timings[-1] if timings else None,
+        'statuses': {str(code): count for code, count in sorted(Counter(s for _, _, s in samples).items())},
+        'histogram': histogram(timings),
+    }
+
+
+def summarize(samples, elapsed):
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        'elapsed_s': elapsed,
+        'total': stats(samples, elapsed),
+        'endpoints': {name: stats(rows, elapsed) for name, rows in sorted(by_endpoint.items())},
+    }
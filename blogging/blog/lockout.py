@@ -0,0 +1,70 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'MAX_FAILURES': 5,     # failed logins per identifier or account within WINDOW
+    'WINDOW': 15 * 60,
+    'LOCKOUT': 15 * 60,    # seconds logins are refused once MAX_FAILURES is reached
+    'PREFIX': 'bloglogin',
+}
+
+
+# ------------------- Login lockout -------------------
+# Failed logins are counted per identifier in the cache (an atomic incr on
+# memcached/redis) rather than in the database, so a brute-force run costs no
+# writes. A failure counts against the identifier typed and, when it names
+# one, the account, so alternating a user's username and email does not buy
+# extra attempts. A locked identifier or account is refused before any
+# password is hashed.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_LOGIN_LOCKOUT', {})}
+
+
+def backend():
+    return caches[config()['ALIAS']]
+
+
+def keys(identifier):
+    digest = hashlib.sha1((identifier or '').strip().lower().encode()).hexdigest()
+    prefix = config()['PREFIX']
+    return f'{prefix}:fail:{digest}', f'{prefix}:lock:{digest}'
+
+
+def subjects(identifier, user=None):
+    """What a login attempt counts against: the identifier and the account it resolved to, if any."""
+    return [identifier] if user is None else [identifier, f'user:{user.pk}']
+
+
+def retry_after(*identifiers):
+    """Seconds until every identifier may log in again; 0 when none is locked."""
+    found = backend().get_many([keys(identifier)[1] for identifier in identifiers])
+    return max([0] + [int(until - time.time()) for until in found.values()])
+
+
+def register_failure(*identifiers):
+    """Count a failure against each identifier; returns the highest count."""
+    return max(_register_failure(identifier) for identifier in identifiers)
+
+
+def _register_failure(identifier):
+    options = config()
+    fail_key, lock_key = keys(identifier)
+    cache = backend()
+    cache.add(fail_key, 0, options['WINDOW'])
+    try:
+        failures = cache.incr(fail_key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(fail_key, 1, options['WINDOW'])
+        failures = 1
+    if failures >= options['MAX_FAILURES']:
+        cache.set(lock_key, time.time() + options['LOCKOUT'], options['LOCKOUT'])
+        cache.delete(fail_key)
+    return failures
+
+
+def reset(*identifiers):
+    backend().delete_many([key for identifier in identifiers for key in keys(identifier)])
@@ -0,0 +1,152 @@
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from blog.benchmarks import percentile
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = ("Compare WSGI and ASGI throughput of read endpoints at high concurrency. Each mode runs in its own "
+            "process (ASGI with BLOG_ASYNC_VIEWS on) and requests go straight into Django's handler, so the "
+            "numbers cover the application and database, not a web server. Run against a seeded database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Request path, repeatable (default: /api/blogs/ and /api/categories/)")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per mode")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--token', help="Access token sent as a Bearer Authorization header")
+        parser.add_argument('--mode', choices=MODES, help="Run a single mode in this process")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON")
+
+    def handle(self, *args, **options):
+        options['paths'] = options['paths'] or ['/api/blogs/', '/api/categories/']
+        if options['mode']:
+            results = {options['mode']: self.run_mode(options['mode'], options)}
+        else:
+            results = {mode: self.run_child(mode, options) for mode in MODES}
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<5} {result['requests_per_second']:.1f} req/s median={result['median_ms']:.2f}ms "
+                f"p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms errors={result['errors']}"
+            )
+
+    def run_child(self, mode, options):
+        command = [sys.executable, '-m', 'django', 'benchmark_asgi', '--mode', mode, '--json',
+                   '--requests', str(options['requests']), '--concurrency', str(options['concurrency'])]
+        for path in options['paths']:
+            command += ['--path', path]
+        if options['token']:
+            command += ['--token', options['token']]
+        env = {**os.environ, 'BLOG_ASYNC_VIEWS': str(mode == 'asgi'),
+               'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'blogging.settings')}
+        child = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if child.returncode != 0:
+            raise CommandError(f"{mode} run failed:\n{child.stderr}")
+        return json.loads(child.stdout)[mode]
+
+    def run_mode(self, mode, options):
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        headers = {'host': host}
+        if options['token']:
+            headers['authorization'] = f"Bearer {options['token']}"
+        paths = [options['paths'][i % len(options['paths'])] for i in range(options['requests'])]
+        # One untimed round per path warms caches and connections
+        run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+        run(options['paths'], 1, headers)
+
+        start = time.perf_counter()
+        samples = run(paths, options['concurrency'], headers)
+        elapsed = time.perf_counter() - start
+        return self.summarize(samples, elapsed, options['concurrency'])
+
+    # ---------------- WSGI: a thread per concurrent request ----------------
+    def run_wsgi(self, paths, concurrency, headers):
+        handler = WSGIHandler()
+
+        def call(path):
+            path, _, query = path.partition('?')
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': headers['host'], 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+                **{f"HTTP_{name.upper()}": value for name, value in headers.items()},
+            }
+            statuses = []
+            start = time.perf_counter()
+            response = handler(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return (time.perf_counter() - start) * 1000, int(statuses[0].split()[0])
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(call, paths))
+
+    # ---------------- ASGI: one event loop, bounded by a semaphore ----------------
+    def run_asgi(self, paths, concurrency, headers):
+        handler = ASGIHandler()
+        raw_headers = [(name.encode(), value.encode()) for name, value in headers.items()]
+
+        async def call(path, semaphore):
+            path, _, query = path.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'headers': raw_headers, 'client': ('127.0.0.1', 0),
+                'server': (headers['host'], 80),
+            }
+            received = False
+            messages = []
+
+            async def receive():
+                nonlocal received
+                if received:
+                    # The handler listens for a disconnect until the response is sent
+                    await asyncio.Event().wait()
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            async with semaphore:
+                start = time.perf_counter()
+                await handler(scope, receive, send)
+                return (time.perf_counter() - start) * 1000, messages[0]['status']
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(call(path, semaphore) for path in paths))
+
+        return asyncio.run(run())
+
+    def summarize(self, samples, elapsed, concurrency):
+        timings = sorted(latency for latency, _ in samples)
+        return {
+            'requests': len(samples),
+            'concurrency': concurrency,
+            'requests_per_second': len(samples) / elapsed if elapsed else 0.0,
+            'median_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 0.95),
+            'p99_ms': percentile(timings, 0.99),
+            'errors': sum(1 for _, status in samples if status >= 400),
+        }
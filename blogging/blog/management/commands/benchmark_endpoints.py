@@ -0,0 +1,62 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from blog import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the API endpoints (feed, detail, search, like toggle, comments, stats, login) and record "
+            "p50/p95/p99 latency, SQL query count and time, and response bytes as JSON. Each size in --sizes is "
+            "seeded into a throwaway test database; 'current' uses the configured database inside a rolled-back "
+            "transaction. --baseline flags regressions against an earlier run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small',
+                            help=f"Comma-separated: {', '.join([*benchmarks.SIZES, 'current'])}")
+        parser.add_argument('--endpoints', help=f"Comma-separated subset of: {', '.join(benchmarks.ENDPOINTS)}")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warm', action='store_true', help="Keep the response cache between requests")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Earlier results to compare against")
+        parser.add_argument('--threshold', type=float, default=0.2, help="Allowed p95 growth, as a fraction")
+        parser.add_argument('--fail-on-regression', action='store_true', help="Exit with an error on regressions")
+
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = [size for size in sizes if size != 'current' and size not in benchmarks.SIZES]
+        endpoints = options['endpoints'].split(',') if options['endpoints'] else None
+        unknown += [name for name in endpoints or [] if name not in benchmarks.ENDPOINTS]
+        if unknown:
+            raise CommandError(f"Unknown size or endpoint: {', '.join(unknown)}")
+
+        results = {'meta': benchmarks.metadata(options['iterations'], options['warm']), 'sizes': {}}
+        for size in sizes:
+            self.stdout.write(f"Benchmarking {size}...")
+            try:
+                results['sizes'][size] = benchmarks.run_size(size, options['iterations'], options['warm'], endpoints)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            for name, result in results['sizes'][size]['endpoints'].items():
+                self.stdout.write(
+                    f"  {name:<14} p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+                    f"p99={result['p99_ms']:.2f}ms queries={result['queries']} sql={result['sql_ms']:.2f}ms "
+                    f"bytes={result['bytes']} status={result['status']}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+            regressions = benchmarks.compare(baseline, results, options['threshold'])
+            for item in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f"REGRESSION {item['size']}/{item['endpoint']} {item['metric']}: "
+                    f"{item['baseline']:.2f} -> {item['current']:.2f}"
+                ))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+            elif options['fail_on_regression']:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
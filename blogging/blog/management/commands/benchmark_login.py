@@ -0,0 +1,73 @@
+import json
+import statistics
+import time
+from django.contrib.auth.backends import ModelBackend
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from blog import lockout
+from blog.benchmarks import percentile
+from blog.models import User
+from blog.views import MyTokenObtainPairView
+
+PASSWORD = 'Bench-pass-123'
+
+
+class Command(BaseCommand):
+    help = ("Time /api/auth/login/ for username and email identifiers with the configured password hasher. "
+            "Runs against a throwaway user inside a rolled-back transaction.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(username='login-bench', email='login-bench@example.com', password=PASSWORD)
+            results = {
+                'username': self.measure(lambda: self.login(user.username), options['iterations']),
+                'email': self.measure(lambda: self.login(user.email), options['iterations']),
+                # The former email path: a failed username authenticate, a lookup, then a second authenticate
+                'email_two_step': self.measure(lambda: self.two_step(user.email), options['iterations']),
+            }
+            lockout.reset(user.username)
+            lockout.reset(user.email)
+            transaction.set_rollback(True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<16} median={result['median_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+                f"queries={result['queries']}"
+            )
+
+    def login(self, identifier):
+        request = RequestFactory().post('/api/auth/login/', {'username': identifier, 'password': PASSWORD},
+                                        content_type='application/json')
+        response = MyTokenObtainPairView.as_view()(request)
+        if response.status_code != 200:
+            raise RuntimeError(f"Login failed with {response.status_code}: {response.data}")
+
+    def two_step(self, identifier):
+        backend = ModelBackend()
+        user = backend.authenticate(None, username=identifier, password=PASSWORD)
+        if user is None:
+            user = backend.authenticate(None, username=User.objects.get(email=identifier).username, password=PASSWORD)
+
+    def measure(self, call, iterations):
+        call()  # warm up
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return {
+            'median_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 0.95),
+            'queries': len(queries) // iterations,
+        }
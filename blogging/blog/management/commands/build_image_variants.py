@@ -0,0 +1,39 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from blog import images
+
+
+class Command(BaseCommand):
+    help = ("Build missing thumb/card/full variants for blog images and profile pictures. With --strip-originals, "
+            "also rewrite stored originals that still carry EXIF/XMP metadata (uploaded before it was stripped).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild variants that already exist")
+        parser.add_argument('--strip-originals', action='store_true',
+                            help="Remove metadata from stored originals first")
+
+    def handle(self, *args, **options):
+        if options['strip_originals']:
+            stripped = 0
+            for label, (field, _, _) in images.SOURCES.items():
+                rows = apps.get_model(*label).objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                for pk in rows.values_list('pk', flat=True).iterator():
+                    stripped += images.strip_stored(label, pk)
+            self.stdout.write(f"Stripped metadata from {stripped} originals.")
+
+        pending = []
+        for label, (field, variants_field, _) in images.SOURCES.items():
+            rows = (apps.get_model(*label).objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                    .only('pk', field, variants_field))
+            for row in rows.iterator():
+                if options['force'] or images.needs_processing(row, label):
+                    pending.append((label, row.pk))
+
+        if images.config()['WORKERS'] <= 0:
+            for label, pk in pending:
+                images.build(label, pk)
+        else:
+            futures = [images.submit(label, pk) for label, pk in pending]
+            for future in futures:
+                future.result()
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(pending)} images."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from blog import blacklist
+
+
+class Command(BaseCommand):
+    help = ("Delete expired outstanding and blacklisted JWTs in chunks and report the table sizes. "
+            "The publish_scheduled worker runs this daily; schedule it yourself when that runs with --once.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        before = blacklist.table_sizes()
+        purged = blacklist.purge_expired(chunk_size=options['chunk_size'])
+        after = blacklist.table_sizes()
+        for table in before:
+            self.stdout.write(f"{table}: {before[table]} -> {after[table]} (purged {purged[table]})")
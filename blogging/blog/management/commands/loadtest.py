@@ -0,0 +1,77 @@
+import json
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from blog import loadgen
+
+
+class Command(BaseCommand):
+    help = ("Drive concurrent traffic at the API and report throughput, error rate and a latency histogram per "
+            "endpoint. Sends a weighted mix of anonymous feed reads, authenticated detail reads, like toggles, "
+            "comments and logins, or replays an access log. Requests go into Django in this process unless --url "
+            "points at a running server. Likes and comments are real writes to the configured database, and "
+            "accounts come from manage.py seed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server, e.g. http://localhost:8000")
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in loadgen.DEFAULT_MIX.items()),
+                            help="Weighted request types (default: %(default)s)")
+        parser.add_argument('--replay', help="Access log to replay instead of the mix")
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help="Replay speed-up over the logged timestamps; 0 sends as fast as possible")
+        parser.add_argument('--requests', type=int, default=1000, help="Requests to send from the mix")
+        parser.add_argument('--duration', type=float, help="Stop after this many seconds")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--rps', type=float, help="Target requests per second (default: unpaced)")
+        parser.add_argument('--prefix', default='seed', help="Prefix of the seeded accounts to log in as")
+        parser.add_argument('--password', default='seed-pass-123', help="Password of the seeded accounts")
+        parser.add_argument('--accounts', type=int, default=20, help="Accounts to spread requests over")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['accounts'] < 1:
+            raise CommandError("--concurrency and --accounts must be at least 1")
+        client = loadgen.Remote(options['url']) if options['url'] else loadgen.InProcess()
+        try:
+            mix = loadgen.parse_mix(options['mix'])
+            targets = loadgen.Targets(client, options['prefix'], options['password'], options['accounts'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        finally:
+            client.close()
+
+        skipped = Counter()
+        if options['replay']:
+            log = open(options['replay'], errors='replace')
+            requests = loadgen.replay(log, targets, options['speed'], options['seed'], skipped)
+        else:
+            log = None
+            requests = loadgen.generate(targets, mix, options['requests'], options['seed'])
+        try:
+            results = loadgen.run(client, requests, targets, options['concurrency'], options['rps'],
+                                  options['duration'])
+        finally:
+            if log:
+                log.close()
+        results['skipped'] = dict(skipped)
+
+        total = results['total']
+        self.stdout.write(
+            f"{total['requests']} requests in {results['elapsed_s']:.1f}s: {total['throughput_rps']:.1f} req/s, "
+            f"{total['error_rate']:.1%} errors"
+        )
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f"  {name:<22} {result['requests']:>7} {result['throughput_rps']:>8.1f} req/s "
+                f"errors={result['error_rate']:.1%} p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+                f"p99={result['p99_ms']:.2f}ms statuses={result['statuses']}"
+            )
+            buckets = ' '.join(f'{label}:{count}' for label, count in result['histogram'].items() if count)
+            self.stdout.write(f"  {'':<22} {buckets}")
+        if skipped:
+            self.stdout.write(f"Skipped log lines: {dict(skipped)}")
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from blog import blacklist, scheduler
+
+
+class Command(BaseCommand):
+    help = ("Publish blogs whose publish_at has passed; runs forever unless --once is given. "
+            "Also compacts the token blacklist tables (see compact_tokens) every --compact-every seconds.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Publish what is due now and exit")
+        parser.add_argument('--interval', type=float, default=30, help="Seconds between ticks")
+        parser.add_argument('--batch-size', type=int, default=scheduler.BATCH_SIZE)
+        parser.add_argument('--compact-every', type=float, default=24 * 3600,
+                            help="Seconds between token compactions; 0 disables them")
+
+    def handle(self, *args, **options):
+        compacted_at = None
+        try:
+            while True:
+                behind = scheduler.lag()
+                published = scheduler.publish_all_due(batch_size=options['batch_size'])
+                self.stdout.write(f"published={published} lag={behind.total_seconds():.1f}s")
+                if options['compact_every'] and not options['once'] and (
+                        compacted_at is None or time.monotonic() - compacted_at >= options['compact_every']):
+                    purged = blacklist.purge_expired()
+                    compacted_at = time.monotonic()
+                    self.stdout.write(f"compacted outstanding_tokens={purged['outstanding_tokens']} "
+                                      f"blacklisted_tokens={purged['blacklisted_tokens']}")
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
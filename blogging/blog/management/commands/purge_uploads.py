@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from blog import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete expired upload sessions that were never attached, with their partial and stored files."
+
+    def handle(self, *args, **options):
+        purged = uploads.purge()
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} upload sessions."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from blog import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily stats rollups (blogs, users, comments, likes) from the base tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='end', help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        bounds = []
+        for name in ('start', 'end'):
+            value = options[name]
+            day = parse_date(value) if value else None
+            if value and day is None:
+                raise CommandError(f"Invalid date: {value}")
+            bounds.append(day)
+        rebuilt = rollups.rebuild(*bounds)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} daily stats rows."))
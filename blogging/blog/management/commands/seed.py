@@ -0,0 +1,54 @@
+import time
+from datetime import datetime, time as day_start, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from blog import seeding
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with a synthetic, Zipf-skewed dataset of users, categories, blogs, comments and likes. "
+            "The same --seed and counts give the same rows; keys continue after the existing rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--blogs', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000, help="Total comments, replies included")
+        parser.add_argument('--likes', type=int, default=100000)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help="Zipf exponent for authorship and popularity; 0 is uniform")
+        parser.add_argument('--published', type=float, default=0.9, help="Share of published blogs")
+        parser.add_argument('--replies', type=float, default=0.25, help="Share of comments that are replies")
+        parser.add_argument('--deleted', type=float, default=0.02, help="Share of soft-deleted comments")
+        parser.add_argument('--days', type=int, default=365, help="Timestamps span this many days before --end")
+        parser.add_argument('--end', help="Last day of the data (YYYY-MM-DD, default today)")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='seed', help="Prefix of generated user and category names")
+        parser.add_argument('--password', default='seed-pass-123', help="Password of every generated user")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per INSERT")
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--users and --chunk-size must be at least 1")
+        end = parse_date(options['end']) if options['end'] else datetime.now(dt_timezone.utc).date()
+        if end is None:
+            raise CommandError(f"Invalid date: {options['end']}")
+        end = datetime.combine(end, day_start.max, tzinfo=dt_timezone.utc).replace(microsecond=0)
+
+        started = time.perf_counter()
+        verbose = options['verbosity'] > 1
+        try:
+            totals = seeding.run(options, end, workers=options['workers'],
+                                 progress=self.progress if verbose else None)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        summary = ', '.join(f"{count} {name}" for name, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {summary} in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)."
+        ))
+
+    def progress(self, totals):
+        self.stdout.write(', '.join(f"{name}={count}" for name, count in totals.items()))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from blog import outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox email in batches; runs forever unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send what is due now and exit")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between ticks")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                sent, failed = outbox.send_all_due(batch_size=options['batch_size'])
+                backlog = outbox.backlog()
+                self.stdout.write(
+                    f"sent={sent} failed={failed} pending={backlog['pending']} "
+                    f"oldest={backlog['oldest_age'].total_seconds():.1f}s"
+                )
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -0,0 +1,328 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from .authentication import user_cache
+from .models import Blog, OutboxEmail
+from .viewcounter import view_counter
+from . import images, outbox, responsecache, scheduler, timing
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'DIR': None,            # directory shared by the worker processes; None keeps metrics in this process
+    'FLUSH_INTERVAL': 10,   # seconds between writes of this process's file
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'blog_http_requests_total': ('counter', 'HTTP requests by view, method and status code.', None),
+    'blog_http_request_duration_seconds': ('histogram', 'Request latency by view and method.', LATENCY_BUCKETS),
+    'blog_db_queries_per_request': ('histogram', 'SQL queries run per request, by view.', QUERY_BUCKETS),
+    'blog_db_seconds_per_request': ('histogram', 'SQL time per request, by view.', DB_TIME_BUCKETS),
+    'blog_response_cache_requests_total': ('counter', 'Response cache lookups by endpoint and result.', None),
+    'blog_response_cache_hit_ratio': ('gauge', 'Share of response cache lookups that hit, by endpoint.', None),
+    'blog_user_cache_lookups_total': ('counter', 'User cache lookups by where they were answered.', None),
+    'blog_user_cache_hit_ratio': ('gauge', 'Share of user cache lookups answered without the database.', None),
+    'blog_outbox_events_total': ('counter', 'Outbox events recorded by the web and worker processes.', None),
+    'blog_outbox_pending': ('gauge', 'Emails waiting in the outbox.', None),
+    'blog_scheduled_posts_pending': ('gauge', 'Unpublished posts with a publish_at, by whether it has passed.', None),
+    'blog_view_counter_pending': ('gauge', 'Blog view increments buffered in memory, not yet written.', None),
+    'blog_image_jobs_pending': ('gauge', 'Image variant jobs queued or running.', None),
+}
+
+
+# ------------------- Metrics registry -------------------
+# Request counts and histograms are kept per process. With DIR set, every
+# process writes its cumulative values to DIR/<pid>.json at most every
+# FLUSH_INTERVAL seconds and on exit, and a scrape adds up all the files, so
+# preforked workers report as one. Counters and histograms of exited
+# processes stay in the sum; their gauges are dropped. Clear DIR when the
+# server starts. Queue depths held in the database are read at scrape time.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_METRICS', {})}
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._last_flush = time.monotonic()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            counts[bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        """This process's values, in the form written to DIR."""
+        with self._lock:
+            counters = [[name, labels, value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, labels, list(counts)] for (name, labels), counts in self._histograms.items()]
+        gauges = []
+        for kind, *sample in process_samples():
+            (counters if kind == 'counter' else gauges).append(sample)
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def flush_due(self):
+        return time.monotonic() - self._last_flush >= config()['FLUSH_INTERVAL']
+
+    def flush(self):
+        directory = config()['DIR']
+        self._last_flush = time.monotonic()
+        if not directory:
+            return
+        snapshot = self.snapshot()
+        # Written aside and renamed, so a scrape never reads half a file
+        handle, path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(handle, 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(path, os.path.join(directory, f"{snapshot['pid']}.json"))
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+def flush_on_exit():
+    try:
+        registry.flush()
+    except OSError:
+        logger.exception("Writing the final metrics snapshot failed")
+
+
+atexit.register(flush_on_exit)
+
+
+# ---------------- Collected values ----------------
+RESULTS = {'hits': 'hit', 'misses': 'miss'}
+
+
+def process_samples():
+    """Counters and gauges other modules keep for this process: (type, name, labels, value)."""
+    samples = []
+    for endpoint, counts in responsecache.counters().items():
+        for outcome, count in counts.items():
+            labels = (('endpoint', endpoint), ('result', RESULTS[outcome]))
+            samples.append(('counter', 'blog_response_cache_requests_total', labels, count))
+    for outcome, count in user_cache.counters().items():
+        samples.append(('counter', 'blog_user_cache_lookups_total', (('result', outcome),), count))
+    for event, count in outbox.counters().items():
+        samples.append(('counter', 'blog_outbox_events_total', (('event', event),), count))
+    samples.append(('gauge', 'blog_view_counter_pending', (), view_counter.pending_total()))
+    samples.append(('gauge', 'blog_image_jobs_pending', (), images.pending()))
+    return samples
+
+
+def database_samples():
+    now = timezone.now()
+    return [
+        ('blog_outbox_pending', (), OutboxEmail.objects.filter(status=OutboxEmail.PENDING).count()),
+        ('blog_scheduled_posts_pending', (('state', 'due'),), scheduler.due(now).count()),
+        ('blog_scheduled_posts_pending', (('state', 'future'),),
+         Blog.objects.filter(is_published=False, publish_at__gt=now).count()),
+    ]
+
+
+def hit_ratios(counters):
+    """Hit ratio gauges from the summed cache counters."""
+    totals = {}
+    for (name, labels), value in counters.items():
+        if name == 'blog_response_cache_requests_total':
+            key = ('blog_response_cache_hit_ratio', tuple(l for l in labels if l[0] != 'result'))
+            hit = dict(labels)['result'] == 'hit'
+        elif name == 'blog_user_cache_lookups_total':
+            key = ('blog_user_cache_hit_ratio', ())
+            hit = dict(labels)['result'] != 'database'
+        else:
+            continue
+        hits, total = totals.get(key, (0, 0))
+        totals[key] = (hits + value * hit, total + value)
+    return {key: hits / total for key, (hits, total) in totals.items() if total}
+
+
+# ---------------- Aggregation ----------------
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def snapshots():
+    """Every process's snapshot; with DIR, as last written there (this process's just now)."""
+    directory = config()['DIR']
+    if not directory:
+        return [registry.snapshot()]
+    registry.flush()
+    found = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable metrics file %s", entry.path)
+            continue
+        if not alive(snapshot['pid']):
+            snapshot['gauges'] = []
+        found.append(snapshot)
+    return found
+
+
+def label_key(labels):
+    # Labels come back from JSON as lists
+    return tuple(tuple(pair) for pair in labels)
+
+
+def collect():
+    """{(name, labels): value} for counters and gauges, {(name, labels): counts} for histograms."""
+    values, histograms = {}, {}
+    for snapshot in snapshots():
+        for name, labels, value in snapshot['counters'] + snapshot['gauges']:
+            key = (name, label_key(labels))
+            values[key] = values.get(key, 0) + value
+        for name, labels, counts in snapshot['histograms']:
+            key = (name, label_key(labels))
+            total = histograms.setdefault(key, [0] * len(counts))
+            for index, count in enumerate(counts):
+                total[index] += count
+    values.update(hit_ratios(values))
+    for name, labels, value in database_samples():
+        values[name, labels] = value
+    return values, histograms
+
+
+# ---------------- Prometheus text format ----------------
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}' if labels else ''
+
+
+def format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render():
+    values, histograms = collect()
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        if kind == 'histogram':
+            for (metric, labels), counts in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip([*buckets, '+Inf'], counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {format_value(counts[-1])}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        else:
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ---------------- Middleware ----------------
+# Joins the request's Timing when ServerTimingMiddleware (outside it) sampled
+# the request, otherwise starts one, for the query count and time. Enabling
+# metrics therefore turns on the full per-query and serializer instrumentation
+# of blog.timing for every request, whatever BLOG_SERVER_TIMING says.
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not config()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        timing.enable()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measured, token, before = self.begin()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                timing.current.reset(token)
+        self.observe(request, response, time.perf_counter() - start, measured, before)
+        return response
+
+    async def __acall__(self, request):
+        measured, token, before = self.begin()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                timing.current.reset(token)
+        self.observe(request, response, time.perf_counter() - start, measured, before)
+        return response
+
+    def begin(self):
+        measured, token = timing.current.get(), None
+        if measured is None:
+            measured, token = timing.measure()
+        return measured, token, (measured.queries, measured.durations.get('db', 0.0))
+
+    def observe(self, request, response, seconds, measured, before):
+        match = request.resolver_match
+        view = (match.url_name or match.route) if match else 'unmatched'
+        registry.inc('blog_http_requests_total',
+                     (('view', view), ('method', request.method), ('status', str(response.status_code))))
+        registry.observe('blog_http_request_duration_seconds', (('view', view), ('method', request.method)), seconds)
+        registry.observe('blog_db_queries_per_request', (('view', view),), measured.queries - before[0])
+        registry.observe('blog_db_seconds_per_request', (('view', view),),
+                         measured.durations.get('db', 0.0) - before[1])
+        if config()['DIR'] and registry.flush_due():
+            try:
+                registry.flush()
+            except OSError:
+                logger.exception("Writing the metrics snapshot failed")
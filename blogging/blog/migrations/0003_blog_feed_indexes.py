@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_blog_likes_blog_views_alter_blog_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['is_published', 'created_at', 'id'], name='blog_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['author', 'created_at', 'id'], name='blog_author_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['category', 'is_published', 'created_at', 'id'], name='blog_category_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute("ALTER TABLE blog_blog ADD FULLTEXT INDEX blog_title_ft (title)")
+    schema_editor.execute("ALTER TABLE blog_blog ADD FULLTEXT INDEX blog_title_content_ft (title, content)")
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute("ALTER TABLE blog_blog DROP INDEX blog_title_ft")
+    schema_editor.execute("ALTER TABLE blog_blog DROP INDEX blog_title_content_ft")
+
+
+def build_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        return
+    from blog.search import term_weights
+    Blog = apps.get_model('blog', 'Blog')
+    SearchTerm = apps.get_model('blog', 'SearchTerm')
+    for blog in Blog.objects.only('id', 'title', 'content').iterator(chunk_size=500):
+        SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, blog=blog, weight=weight)
+            for term, weight in term_weights(blog).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_blog_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=0)),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='blog.blog')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'blog'), name='unique_search_term')],
+            },
+        ),
+        migrations.RunPython(add_fulltext_indexes, drop_fulltext_indexes),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_likes_count(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    Like = apps.get_model('blog', 'Like')
+    counts = (
+        Like.objects.filter(blog=models.OuterRef('pk')).order_by()
+        .values('blog').annotate(n=models.Count('pk')).values('n')
+    )
+    Blog.objects.update(likes_count=models.functions.Coalesce(models.Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_search_index'),
+    ]
+
+    operations = [
+        # The auto-created blog_blog_likes table already has id, blog_id, user_id
+        # and a unique (blog_id, user_id); adopt it as the Like model.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Like',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blog.blog')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'blog_blog_likes',
+                        'unique_together': {('blog', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='blog',
+                    name='likes',
+                    field=models.ManyToManyField(blank=True, related_name='liked_blogs', through='blog.Like', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='like',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:42
+
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    DailyStats = apps.get_model('blog', 'DailyStats')
+    sources = {
+        'blogs': (apps.get_model('blog', 'Blog'), 'created_at'),
+        'users': (apps.get_model('blog', 'User'), 'date_joined'),
+        'comments': (apps.get_model('blog', 'Comment'), 'created_at'),
+        'likes': (apps.get_model('blog', 'Like'), 'created_at'),
+    }
+    counts = defaultdict(dict)
+    for metric, (model, field) in sources.items():
+        rows = model.objects.annotate(day=TruncDate(field)).values('day').annotate(n=models.Count('pk')).order_by()
+        for row in rows:
+            counts[row['day']][metric] = row['n']
+    DailyStats.objects.bulk_create(
+        [DailyStats(date=day, **metrics) for day, metrics in counts.items()], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_like_through_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('blogs', models.IntegerField(default=0)),
+                ('users', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('views', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'daily stats',
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    # parent is new, so every reply_count starts at its default of 0
+    Blog = apps.get_model('blog', 'Blog')
+    Comment = apps.get_model('blog', 'Comment')
+    live = (
+        Comment.objects.filter(blog=models.OuterRef('pk'), deleted_at__isnull=True)
+        .order_by().values('blog').annotate(n=models.Count('pk')).values('n')
+    )
+    Blog.objects.update(comment_count=Coalesce(models.Subquery(live), 0))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blog_publish_due_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='blog.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog', 'deleted_at', 'created_at', 'id'], name='comment_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', 'deleted_at', 'created_at', 'id'], name='comment_replies_idx'),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
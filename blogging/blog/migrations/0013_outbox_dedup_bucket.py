@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_user_admin_list_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxemail',
+            name='dedup_bucket',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+import uuid
+from django.db import IntegrityError, models, transaction
+from django.db.models import Prefetch
+from django.dispatch import Signal
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -16,8 +19,16 @@ def validate_image(image):
 class User(AbstractUser):
     is_admin = models.BooleanField(default=False)
     profile_picture = models.ImageField(upload_to="profile_pics/", blank=True, null=True, validators=[validate_image])
+    # Resized WebP renders of profile_picture, filled in by blog.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
     email = models.EmailField(unique=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination of the admin users table (blog.pagination.UserPagination)
+            models.Index(fields=['is_admin', 'date_joined', 'id'], name='user_admin_list_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -31,11 +42,31 @@ class Category(models.Model):
         return self.name
 
 
+# ------------------- Blog QuerySet -------------------
+RECENT_COMMENTS = 3
+
+
+def recent_comments_prefetch():
+    # Newest few live top-level comments per blog (sliced prefetch, one query for the page)
+    return Prefetch(
+        'comments',
+        queryset=Comment.objects.filter(deleted_at__isnull=True, parent__isnull=True)
+        .select_related('author').order_by('-created_at', '-id')[:RECENT_COMMENTS],
+        to_attr='recent_comments',
+    )
+
+
+class BlogQuerySet(models.QuerySet):
+    def for_detail(self):
+        return self.select_related('author', 'category').prefetch_related(recent_comments_prefetch())
+
+
 # ------------------- Blog Model -------------------
 class Blog(models.Model):
     title = models.CharField(max_length=100)
     content = models.TextField()
     image = models.ImageField(upload_to='blog_image/', blank=True, null=True, validators=[validate_image])
+    image_variants = models.JSONField(default=dict, blank=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blogs')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='blogs')
     created_at = models.DateTimeField(default=timezone.now)
@@ -43,35 +74,206 @@ class Blog(models.Model):
     is_published = models.BooleanField(default=False)
     publish_at = models.DateTimeField(null=True, blank=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
-    likes = models.ManyToManyField(User, related_name='liked_blogs', blank=True)
+    likes = models.ManyToManyField(User, through='Like', related_name='liked_blogs', blank=True)
+    # Kept in step with Like rows by toggle_like() and blog.signals; never COUNT(*) likes
+    likes_count = models.PositiveIntegerField(default=0)
+    # Live (not soft-deleted) comments, maintained by blog.signals
+    comment_count = models.PositiveIntegerField(default=0)
     views = models.PositiveIntegerField(default=0)
 
+    objects = BlogQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination: feed, author and category listings walk (created_at, id)
+            models.Index(fields=['is_published', 'created_at', 'id'], name='blog_feed_idx'),
+            models.Index(fields=['author', 'created_at', 'id'], name='blog_author_feed_idx'),
+            models.Index(fields=['category', 'is_published', 'created_at', 'id'], name='blog_category_feed_idx'),
+            # Scheduled publishing due-queue (blog.scheduler)
+            models.Index(fields=['is_published', 'publish_at'], name='blog_publish_due_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.publish_at and self.publish_at <= timezone.now():
             self.is_published = True
         super().save(*args, **kwargs)
 
-    @property
-    def likes_count(self):
-        return self.likes.count()
+    def toggle_like(self, user):
+        # DELETE first: if it removed a row the user had liked, otherwise INSERT.
+        # The unique (blog, user) constraint settles concurrent likes.
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(blog=self, user=user).delete()
+            if not deleted:
+                try:
+                    with transaction.atomic():
+                        Like.objects.create(blog=self, user=user)
+                except IntegrityError:
+                    pass
+        self.likes_count = Blog.objects.values_list('likes_count', flat=True).get(pk=self.pk)
+        return not deleted, self.likes_count
 
     def __str__(self):
         return self.title
 
 
 
+# ------------------- Like Model -------------------
+# Explicit through table for Blog.likes (reuses the original auto-created table)
+class Like(models.Model):
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'blog_blog_likes'
+        unique_together = [('blog', 'user')]
+
+    @classmethod
+    def liked_blog_ids(cls, user, blog_ids):
+        if not user.is_authenticated or not blog_ids:
+            return set()
+        return set(cls.objects.filter(user=user, blog_id__in=blog_ids).values_list('blog_id', flat=True))
+
+    @classmethod
+    async def aliked_blog_ids(cls, user, blog_ids):
+        if not user.is_authenticated or not blog_ids:
+            return set()
+        return {pk async for pk in cls.objects.filter(user=user, blog_id__in=blog_ids).values_list('blog_id', flat=True)}
+
+    def __str__(self):
+        return f"{self.user_id} likes {self.blog_id}"
+
+
+
+# ------------------- Search Index Model -------------------
+# Inverted index used by blog.search when the database has no FULLTEXT support.
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=64)
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'blog'], name='unique_search_term'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.blog_id} ({self.weight})"
+
+
 # ------------------- Comment Model -------------------
+# Sent once when a comment is soft-deleted (blog.signals adjusts the counters)
+comment_soft_deleted = Signal()
+
+
 class Comment(models.Model):
     blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     content = models.TextField()
     created_at = models.DateTimeField(default=timezone.now)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    reply_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a blog's thread and of a comment's replies
+            models.Index(fields=['blog', 'deleted_at', 'created_at', 'id'], name='comment_thread_idx'),
+            models.Index(fields=['parent', 'deleted_at', 'created_at', 'id'], name='comment_replies_idx'),
+        ]
 
     def soft_delete(self):
-        self.deleted_at = timezone.now()
-        self.save()
+        # Conditional UPDATE so a repeated or concurrent delete is only counted once
+        now = timezone.now()
+        if not Comment.objects.filter(pk=self.pk, deleted_at__isnull=True).update(deleted_at=now):
+            return
+        self.deleted_at = now
+        comment_soft_deleted.send(sender=Comment, instance=self)
 
     def __str__(self):
         return f"{self.author.username} on '{self.blog.title}': {self.content[:50]}"
 
+
+
+# ------------------- Stats Rollup Model -------------------
+# One row per day of activity, maintained by blog.rollups; /stats reads only this table.
+class DailyStats(models.Model):
+    date = models.DateField(unique=True)
+    blogs = models.IntegerField(default=0)
+    users = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    views = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily stats'
+
+    def __str__(self):
+        return str(self.date)
+
+
+# ------------------- Email Outbox Model -------------------
+# Outgoing mail is queued here by request handlers and sent by the
+# send_outbox worker (blog.outbox), never inline.
+class OutboxEmail(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=50)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    # Repeat requests with the same key inside the dedup window are dropped
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)
+    # dedup_key plus the window it was queued in; unique, so of two concurrent
+    # requests only one inserts. Cleared when the message fails for good.
+    dedup_bucket = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+            models.Index(fields=['dedup_key', 'created_at'], name='outbox_dedup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.to_email} ({self.status})"
+
+
+# ------------------- Upload Session Model -------------------
+# A resumable image upload (blog.uploads): bytes are appended to a partial file
+# chunk by chunk, then the finished file is moved into media storage and can be
+# attached to a blog or profile by id.
+class UploadSession(models.Model):
+    BLOG_IMAGE = 'blog_image'
+    PROFILE_PICTURE = 'profile_picture'
+    KIND_CHOICES = [(BLOG_IMAGE, 'Blog image'), (PROFILE_PICTURE, 'Profile picture')]
+
+    OPEN = 'open'
+    COMPLETE = 'complete'
+    ATTACHED = 'attached'
+    STATUS_CHOICES = [(OPEN, 'Open'), (COMPLETE, 'Complete'), (ATTACHED, 'Attached')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    received = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
+    file = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'], name='upload_expiry_idx')]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
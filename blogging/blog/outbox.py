@@ -0,0 +1,181 @@
+import logging
+import threading
+from collections import Counter
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,            # messages sent per SMTP connection
+    'MAX_ATTEMPTS': 5,            # then the message is marked failed
+    'BACKOFF_BASE': 30,           # seconds before the first retry, doubled per attempt
+    'BACKOFF_MAX': 3600,
+    'LEASE': 300,                 # seconds a claimed batch is hidden from other workers
+    'RESET_DEDUP_WINDOW': 900,    # one password-reset mail per user per window
+}
+
+
+# ------------------- Email outbox -------------------
+# Handlers enqueue a row and return; the send_outbox worker claims due rows in
+# batches, sends each batch over one backend connection and reschedules
+# failures with exponential backoff. Claiming pushes next_attempt_at out by
+# LEASE, so a crashed worker's batch is picked up again once the lease ends.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_EMAIL_OUTBOX', {})}
+
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def record(event, count=1):
+    with _lock:
+        _counters[event] += count
+
+
+def counters():
+    """{'enqueued'|'deduplicated'|'sent'|'retried'|'failed': n} for this process."""
+    with _lock:
+        return dict(_counters)
+
+
+def reset_counters():
+    with _lock:
+        _counters.clear()
+
+
+def enqueue(to_email, subject, body, kind='notification', dedup_key=None, window=None):
+    """Queue a message; returns None when an equal dedup_key was queued within window seconds."""
+    now = timezone.now()
+    bucket = None
+    if dedup_key and window:
+        recent = OutboxEmail.objects.filter(
+            dedup_key=dedup_key, created_at__gte=now - timezone.timedelta(seconds=window),
+        ).exclude(status=OutboxEmail.FAILED)
+        if recent.exists():
+            record('deduplicated')
+            return None
+        # Two requests can both pass the check above; the unique bucket lets one insert
+        bucket = f'{int(now.timestamp()) // window}:{dedup_key}'[:255]
+    try:
+        with transaction.atomic():
+            message = OutboxEmail.objects.create(
+                kind=kind, to_email=to_email, subject=subject, body=body,
+                dedup_key=dedup_key, dedup_bucket=bucket, created_at=now, next_attempt_at=now,
+            )
+    except IntegrityError:
+        if bucket is None:
+            raise
+        record('deduplicated')
+        return None
+    record('enqueued')
+    return message
+
+
+def enqueue_password_reset(user, reset_link):
+    return enqueue(
+        user.email,
+        "Password Reset",
+        f"Click this link to reset your password: {reset_link}",
+        kind='password_reset',
+        dedup_key=f'password_reset:{user.pk}',
+        window=config()['RESET_DEDUP_WINDOW'],
+    )
+
+
+# ---------------- Worker ----------------
+def due(now=None):
+    return OutboxEmail.objects.filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now or timezone.now())
+
+
+def claim(now=None, batch_size=None):
+    now = now or timezone.now()
+    batch_size = batch_size or config()['BATCH_SIZE']
+    with transaction.atomic():
+        ids = list(
+            due(now).select_for_update(skip_locked=True)
+            .order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            lease = now + timezone.timedelta(seconds=config()['LEASE'])
+            OutboxEmail.objects.filter(pk__in=ids).update(next_attempt_at=lease)
+    return list(OutboxEmail.objects.filter(pk__in=ids).order_by('pk')) if ids else []
+
+
+def backoff(attempts):
+    options = config()
+    return timezone.timedelta(seconds=min(options['BACKOFF_BASE'] * 2 ** (attempts - 1), options['BACKOFF_MAX']))
+
+
+def send_due(now=None, batch_size=None):
+    """Send one claimed batch over a single connection; returns (sent, failed) counts."""
+    now = now or timezone.now()
+    messages = claim(now, batch_size)
+    if not messages:
+        return 0, 0
+
+    sent, failures = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        failures = [(message, exc) for message in messages]
+    else:
+        try:
+            for message in messages:
+                email = EmailMessage(message.subject, message.body, settings.DEFAULT_FROM_EMAIL,
+                                     [message.to_email], connection=connection)
+                try:
+                    email.send()
+                except Exception as exc:
+                    failures.append((message, exc))
+                else:
+                    sent.append(message.pk)
+        finally:
+            connection.close()
+
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(status=OutboxEmail.SENT, sent_at=timezone.now(), last_error='')
+        record('sent', len(sent))
+    for message, exc in failures:
+        reschedule(message, exc, now)
+    return len(sent), len(failures)
+
+
+def reschedule(message, exc, now):
+    attempts = message.attempts + 1
+    changes = {'attempts': attempts, 'last_error': f'{type(exc).__name__}: {exc}'[:1000]}
+    if attempts >= config()['MAX_ATTEMPTS']:
+        # A failed message no longer holds back a new one for its dedup window
+        changes.update(status=OutboxEmail.FAILED, dedup_bucket=None)
+        record('failed')
+        logger.error("Giving up on outbox email %s after %s attempts: %s", message.pk, attempts, exc)
+    else:
+        changes['next_attempt_at'] = now + backoff(attempts)
+        record('retried')
+        logger.warning("Outbox email %s failed (attempt %s), retrying: %s", message.pk, attempts, exc)
+    OutboxEmail.objects.filter(pk=message.pk).update(**changes)
+
+
+def send_all_due(now=None, batch_size=None):
+    now = now or timezone.now()
+    batch_size = batch_size or config()['BATCH_SIZE']
+    sent = failed = 0
+    while True:
+        batch_sent, batch_failed = send_due(now, batch_size)
+        sent, failed = sent + batch_sent, failed + batch_failed
+        if batch_sent + batch_failed < batch_size:
+            return sent, failed
+
+
+def backlog(now=None):
+    """Pending message count and the age of the oldest one (zero when empty)."""
+    now = now or timezone.now()
+    pending = OutboxEmail.objects.filter(status=OutboxEmail.PENDING).aggregate(n=Count('pk'), oldest=Min('created_at'))
+    age = now - pending['oldest'] if pending['oldest'] else timezone.timedelta(0)
+    return {'pending': pending['n'], 'oldest_age': age}
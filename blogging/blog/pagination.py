@@ -0,0 +1,159 @@
+import base64
+import json
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# ------------------- Keyset (cursor) Pagination -------------------
+# Pages are addressed by the (created_at, id) of the row at the edge of the
+# previous page instead of an OFFSET, so page 1000 costs the same index range
+# scan as page 1. Results are returned newest first.
+class KeysetPagination(BasePagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    # Leading field plus a unique tie-breaker; must match a composite index.
+    keyset_fields = ('created_at', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        return self.finish_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request):
+        queryset = self.page_queryset(queryset, request)
+        return self.finish_page([obj async for obj in queryset[:self.page_size + 1]])
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        if self.position is not None:
+            queryset = self.filter_after(queryset, self.position, self.reverse)
+
+        first, tie = self.keyset_fields
+        if self.reverse:
+            return queryset.order_by(first, tie)
+        return queryset.order_by(f'-{first}', f'-{tie}')
+
+    def finish_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        # Walking backwards, "more rows" means there is a previous page and we
+        # know a next page exists because that is where we came from.
+        if self.reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.position is not None, has_more
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def filter_after(self, queryset, position, reverse):
+        first, tie = self.keyset_fields
+        first_value, tie_value = position
+        # Bounded range on the leading column, tie-breaker only for equal rows.
+        if reverse:
+            return queryset.filter(**{f'{first}__gte': first_value}).filter(
+                Q(**{f'{first}__gt': first_value}) | Q(**{f'{tie}__gt': tie_value})
+            )
+        return queryset.filter(**{f'{first}__lte': first_value}).filter(
+            Q(**{f'{first}__lt': first_value}) | Q(**{f'{tie}__lt': tie_value})
+        )
+
+    # ---------------- Cursor encoding ----------------
+    def encode_cursor(self, obj, reverse):
+        values = [getattr(obj, name) for name in self.keyset_fields]
+        payload = {'p': [v.isoformat() if hasattr(v, 'isoformat') else v for v in values]}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        token = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            payload = json.loads(raw)
+            values = payload['p']
+            if len(values) != len(self.keyset_fields):
+                raise ValueError
+            position = tuple(
+                self.cursor_value(model, name, value)
+                for name, value in zip(self.keyset_fields, values)
+            )
+            if any(value is None for value in position):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get('r'))
+
+    def cursor_value(self, model, name, value):
+        return model._meta.get_field(name).to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+# Search results are ordered by relevance; search_rank is an annotation, not a column.
+class SearchPagination(KeysetPagination):
+    keyset_fields = ('search_rank', 'id')
+
+    def cursor_value(self, model, name, value):
+        if name == 'search_rank':
+            return float(value)
+        return super().cursor_value(model, name, value)
+
+
+# Admin user listing (blog.views.admin_users), newest accounts first.
+class UserPagination(KeysetPagination):
+    keyset_fields = ('date_joined', 'id')
@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import connection, transaction
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'PREFIX': 'blogresp',
+    'SINGLE_PROCESS': False,   # one process serves requests, so a per-process backend is coherent
+}
+
+# Backends whose entries only the process that wrote them can see
+PER_PROCESS_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+# ------------------- Versioned response cache -------------------
+# Each cached payload is keyed by endpoint, normalized query params and the
+# current generation of every scope it depends on ('blogs', 'categories',
+# 'users', 'blog:<id>'). Writes bump generations (see blog.signals) rather than
+# deleting keys, so an entry filled before a write can never be read after it.
+# That only holds across processes when they share the cache backend: with a
+# per-process backend (LocMemCache) a bump is invisible to the other workers,
+# so caching, validators and the generation checks of blog.authentication and
+# blog.blacklist stay off unless SINGLE_PROCESS declares there are none.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_RESPONSE_CACHE', {})}
+
+
+def backend():
+    return caches[config()['ALIAS']]
+
+
+def enabled():
+    options = config()
+    return options['SINGLE_PROCESS'] or settings.CACHES[options['ALIAS']]['BACKEND'] not in PER_PROCESS_BACKENDS
+
+
+def check_backend(app_configs, **kwargs):
+    if enabled():
+        return []
+    return [checks.Warning(
+        "The cache backend is per-process: response caching, conditional GET and cached token checks are off.",
+        hint="Set CACHE_BACKEND to a shared backend (memcached, redis), or CACHE_SINGLE_PROCESS=True when "
+             "only one process serves requests.",
+        id='blog.W001',
+    )]
+
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def record(endpoint, outcome):
+    with _lock:
+        _counters[endpoint, outcome] += 1
+
+
+def counters():
+    """{endpoint: {'hits': n, 'misses': n}}"""
+    with _lock:
+        snapshot = dict(_counters)
+    result = {}
+    for (endpoint, outcome), count in snapshot.items():
+        result.setdefault(endpoint, {'hits': 0, 'misses': 0})[outcome] = count
+    return result
+
+
+def reset_counters():
+    with _lock:
+        _counters.clear()
+
+
+# ---------------- Generations ----------------
+# A generation is the time (ns) of the last write to its scope, which makes it
+# usable as a Last-Modified value as well as a cache version (blog.conditional).
+def generation_key(scope):
+    return f"{config()['PREFIX']}:gen:{scope}"
+
+
+def generations(scopes):
+    cache = backend()
+    keys = [generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Seed unknown (or evicted) generations with a fresh value so an
+            # entry stored under an older generation is never matched again.
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+_local = threading.local()
+
+
+def bump(*scopes):
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.update(scopes)
+        return
+    _bump(scopes)
+    if connection.in_atomic_block:
+        # A reader could refill from pre-commit rows in between; bump again once the write is visible
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+@contextmanager
+def batched():
+    """Collect bumps (e.g. from a bulk write) and bump each scope once on exit."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = set()
+    try:
+        yield
+    finally:
+        scopes, _local.pending = _local.pending, None
+        if scopes:
+            bump(*scopes)
+
+
+def _bump(scopes):
+    cache = backend()
+    keys = [generation_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    now = time.time_ns()
+    cache.set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, None)
+
+
+# ---------------- Entries ----------------
+def normalize_params(params):
+    items = []
+    for name in sorted(params):
+        values = params.getlist(name) if hasattr(params, 'getlist') else [params[name]]
+        if name in ('fields', 'expand'):
+            values = [','.join(sorted({v.strip() for value in values for v in value.split(',') if v.strip()}))]
+        items.append((name, tuple(values)))
+    return items
+
+
+def make_key(endpoint, params, scopes, host=''):
+    raw = repr((endpoint, host, normalize_params(params), list(zip(scopes, generations(scopes)))))
+    return f"{config()['PREFIX']}:{endpoint}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def fetch(key, endpoint):
+    if not enabled():
+        return None
+    data = backend().get(key)
+    record(endpoint, 'misses' if data is None else 'hits')
+    return data
+
+
+def store(key, data):
+    if enabled():
+        backend().set(key, data, config()['TIMEOUT'])
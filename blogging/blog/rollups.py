@@ -0,0 +1,117 @@
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Blog, Comment, DailyStats, Like, User
+
+METRICS = ('blogs', 'users', 'comments', 'likes', 'views')
+
+# metric -> (model, date field) for the counts that can be recomputed from source rows;
+# views are events with no source row, so compaction leaves them alone.
+SOURCES = {
+    'blogs': (Blog, 'created_at'),
+    'users': (User, 'date_joined'),
+    'comments': (Comment, 'created_at'),
+    'likes': (Like, 'created_at'),
+}
+
+_local = threading.local()
+
+
+# ------------------- Incremental updates -------------------
+def bump(metric, when, delta=1):
+    day = timezone.localdate(when)
+    batch = getattr(_local, 'batch', None)
+    if batch is not None:
+        batch[day, metric] += delta
+        return
+    apply_deltas({day: {metric: delta}})
+
+
+@contextmanager
+def batched():
+    """Collect bumps (e.g. from a cascading delete) and write one UPDATE per day on exit."""
+    if getattr(_local, 'batch', None) is not None:
+        yield
+        return
+    _local.batch = Counter()
+    try:
+        yield
+        batch = _local.batch
+    finally:
+        _local.batch = None
+    by_day = defaultdict(dict)
+    for (day, metric), delta in batch.items():
+        if delta:
+            by_day[day][metric] = delta
+    apply_deltas(by_day)
+
+
+def apply_deltas(by_day):
+    for day, deltas in by_day.items():
+        updates = {metric: F(metric) + delta for metric, delta in deltas.items()}
+        if DailyStats.objects.filter(date=day).update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                DailyStats.objects.create(date=day, **deltas)
+        except IntegrityError:
+            # Another writer created the row first
+            DailyStats.objects.filter(date=day).update(**updates)
+
+
+# ------------------- Compaction -------------------
+def rebuild(start=None, end=None):
+    """Recompute source-backed metrics for [start, end] (inclusive dates) from the base tables."""
+    counts = defaultdict(dict)
+    for metric, (model, field) in SOURCES.items():
+        rows = model.objects.annotate(day=TruncDate(field))
+        if start:
+            rows = rows.filter(day__gte=start)
+        if end:
+            rows = rows.filter(day__lte=end)
+        for row in rows.values('day').annotate(n=Count('pk')).order_by():
+            counts[row['day']][metric] = row['n']
+
+    existing = DailyStats.objects.all()
+    if start:
+        existing = existing.filter(date__gte=start)
+    if end:
+        existing = existing.filter(date__lte=end)
+    days = set(counts) | set(existing.values_list('date', flat=True))
+
+    rows = [DailyStats(date=day, **{m: counts[day].get(m, 0) for m in SOURCES}) for day in sorted(days)]
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+    target = ['date'] if connection.features.supports_update_conflicts_with_target else None
+    DailyStats.objects.bulk_create(
+        rows, batch_size=500, update_conflicts=True, unique_fields=target, update_fields=list(SOURCES),
+    )
+    return len(rows)
+
+
+# ------------------- Reading -------------------
+def totals():
+    sums = DailyStats.objects.aggregate(**{m: Sum(m) for m in METRICS})
+    return {m: sums[m] or 0 for m in METRICS}
+
+
+def series(start=None, end=None):
+    """Daily and monthly series for every metric, aligned on the same dates."""
+    rows = DailyStats.objects.order_by('date')
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    rows = list(rows.values('date', *METRICS))
+
+    daily = {m: [{'date': r['date'], 'count': r[m]} for r in rows] for m in METRICS}
+    months = defaultdict(Counter)
+    for r in rows:
+        month = r['date'].replace(day=1)
+        for m in METRICS:
+            months[month][m] += r[m]
+    monthly = {m: [{'month': month, 'count': c[m]} for month, c in sorted(months.items())] for m in METRICS}
+    return daily, monthly
@@ -0,0 +1,51 @@
+import logging
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from .models import Blog
+from . import responsecache
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+# ------------------- Scheduled publishing -------------------
+# Due posts are read off the (is_published, publish_at) index. Rows are locked
+# with SKIP LOCKED where the database supports it, so several workers can run
+# side by side without publishing, or waiting on, the same rows.
+def due(now=None):
+    return Blog.objects.filter(is_published=False, publish_at__lte=now or timezone.now())
+
+
+def publish_due(now=None, batch_size=BATCH_SIZE):
+    """Publish one batch of due posts with a single UPDATE; returns the published ids."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            due(now).select_for_update(skip_locked=True)
+            .order_by('publish_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            # update() skips auto_now; stamp it as blog.bulk.set_blog_field does
+            Blog.objects.filter(pk__in=ids).update(is_published=True, updated_at=timezone.now())
+    if ids:
+        responsecache.bump('blogs', *[f'blog:{pk}' for pk in ids])
+    return ids
+
+
+def publish_all_due(now=None, batch_size=BATCH_SIZE):
+    now = now or timezone.now()
+    published = 0
+    while True:
+        ids = publish_due(now, batch_size)
+        published += len(ids)
+        if len(ids) < batch_size:
+            return published
+
+
+def lag(now=None):
+    """How long the oldest still-unpublished due post has been waiting (zero when caught up)."""
+    now = now or timezone.now()
+    oldest = due(now).aggregate(oldest=Min('publish_at'))['oldest']
+    return now - oldest if oldest else timezone.timedelta(0)
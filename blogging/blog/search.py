@@ -0,0 +1,141 @@
+import html
+import operator
+import re
+from collections import Counter
+from functools import reduce
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Max, OuterRef, Q, Subquery, Sum, When
+from django.db.models.expressions import RawSQL
+from .models import Blog, SearchTerm
+
+# ------------------- Full-text search -------------------
+# MySQL uses FULLTEXT indexes on (title) and (title, content), see migration
+# 0004. Every other backend (SQLite in tests/dev) uses the SearchTerm inverted
+# index, kept current by the post_save hook in blog.signals; deleted blogs drop
+# their terms through the CASCADE foreign key.
+
+TITLE_WEIGHT = 5
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+SNIPPET_LENGTH = 160
+
+# InnoDB defaults: innodb_ft_min_token_size and INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD
+FULLTEXT_MIN_TOKEN_SIZE = 3
+FULLTEXT_STOPWORDS = frozenset((
+    'a about an are as at be by com de en for from how i in is it la of on or that the this to was what '
+    'when where who will with und www'
+).split())
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if MIN_TERM_LENGTH <= len(t) <= MAX_TERM_LENGTH]
+
+
+def query_terms(query):
+    # Deduplicated, order preserved; the last term is matched as a prefix (search-as-you-type)
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def uses_fulltext():
+    return connection.vendor == 'mysql'
+
+
+# ---------------- Indexing ----------------
+def term_weights(blog):
+    weights = Counter(tokenize(blog.content))
+    for term in tokenize(blog.title):
+        weights[term] += TITLE_WEIGHT
+    return weights
+
+
+def index_blog(blog):
+    if uses_fulltext():
+        return
+    with transaction.atomic():
+        SearchTerm.objects.filter(blog=blog).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, blog=blog, weight=weight)
+            for term, weight in term_weights(blog).items()
+        ])
+
+
+def rebuild_index(chunk_size=500):
+    if uses_fulltext():
+        return 0
+    indexed = 0
+    for blog in Blog.objects.only('id', 'title', 'content').iterator(chunk_size=chunk_size):
+        index_blog(blog)
+        indexed += 1
+    return indexed
+
+
+# ---------------- Querying ----------------
+def search_blogs(queryset, query):
+    """Filter queryset to blogs matching every term and annotate search_rank (higher is better)."""
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+    if uses_fulltext():
+        return _search_fulltext(queryset, terms)
+    return _search_index(queryset, terms)
+
+
+def boolean_query(terms):
+    # A required word the index never holds (too short, a stopword) would match nothing, so
+    # those are dropped; the prefix term stays, InnoDB keeps truncated words whatever their length
+    required = [t for t in terms[:-1] if len(t) >= FULLTEXT_MIN_TOKEN_SIZE and t not in FULLTEXT_STOPWORDS]
+    return ' '.join([f'+{t}' for t in required] + [f'+{terms[-1]}*'])
+
+
+def _search_fulltext(queryset, terms):
+    query = boolean_query(terms)
+    table = Blog._meta.db_table
+    rank = RawSQL(
+        f"MATCH ({table}.title) AGAINST (%s IN BOOLEAN MODE) * %s"
+        f" + MATCH ({table}.title, {table}.content) AGAINST (%s IN BOOLEAN MODE)",
+        [query, TITLE_WEIGHT, query],
+    )
+    return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
+
+
+def _search_index(queryset, terms):
+    conditions = [Q(term=t) for t in terms[:-1]] + [Q(term__startswith=terms[-1])]
+    matched = reduce(operator.add, [
+        Max(Case(When(condition, then=1), default=0, output_field=IntegerField()))
+        for condition in conditions
+    ])
+    ranked = (
+        SearchTerm.objects.filter(reduce(operator.or_, conditions))
+        .values('blog')
+        .annotate(rank=Sum('weight'), matched=matched)
+        .filter(matched=len(conditions))
+    )
+    return queryset.filter(pk__in=ranked.values('blog')).annotate(
+        search_rank=Subquery(ranked.filter(blog=OuterRef('pk')).values('rank')[:1])
+    )
+
+
+def highlight(text, terms, length=SNIPPET_LENGTH):
+    """Return an HTML-escaped snippet of text around the first match, matches wrapped in <mark>."""
+    text = text or ''
+    if not terms:
+        return html.escape(text[:length])
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(t) for t in terms) + r')\w*', re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - length // 4) if first else 0
+    end = min(len(text), start + length)
+    snippet = text[start:end]
+
+    parts, last = [], 0
+    for match in pattern.finditer(snippet):
+        parts.append(html.escape(snippet[last:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(html.escape(snippet[last:]))
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(text) else ''
+    return prefix + ''.join(parts) + suffix
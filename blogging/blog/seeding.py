@@ -0,0 +1,253 @@
+import random
+from array import array
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
+from .models import Blog, Category, Comment, Like, SearchTerm, User
+from . import responsecache, rollups, search
+
+WORDS = (
+    'the of and to in is for on with as by at from that this it be are was not or an have one all new more can '
+    'about into when time year people way day work life world data code web app design user team build test '
+    'python django react api server cache query index page post blog story travel food music film book game '
+    'art photo city home health money market news sport science space history future idea guide tips review '
+    'simple fast small large better best first last great good local global open free early late quick slow '
+    'learn write read share start stop grow change move make take give find keep show try use run ship plan'
+).split()
+
+# Models in insert order: rows only reference rows of models before them
+MODELS = (Category, User, Blog, Comment, Like, SearchTerm)
+
+
+# ------------------- Synthetic dataset -------------------
+# Counts, authors and popularity follow Zipf distributions (exponent `skew`):
+# a few authors write most posts and a few posts draw most comments and likes.
+# Every row is derived from (seed, row index) alone, with explicit primary keys
+# allocated up front, so the dataset is identical however the work is split
+# across chunks or worker processes. Counters (likes_count, comment_count,
+# reply_count) are written with the rows instead of by signals.
+def zipf_weights(count, skew):
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def allocate(total, weights, rng, cap=None):
+    """Split total across weights, rounding each share up or down at random; returns an array."""
+    scale = total / (sum(weights) or 1)
+    counts = array('q')
+    for weight in weights:
+        expected = weight * scale
+        count = int(expected) + (rng.random() < expected - int(expected))
+        counts.append(count if cap is None else min(count, cap))
+    return counts
+
+
+def words(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+class Plan:
+    """Everything derived from the options, cheap enough for each worker to rebuild."""
+
+    def __init__(self, options, bases, end):
+        self.options = options
+        self.bases = bases
+        self.end = end
+        self.window = timedelta(days=options['days'])
+        self.start = end - self.window
+        self.password = make_password(options['password'])
+        seed, skew = options['seed'], options['skew']
+
+        # Long-tail authors: user index 0 writes the most
+        self.author_weights = list(accumulate(zipf_weights(options['users'], skew)))
+        # Popularity rank of each blog, shuffled so viral posts are spread over time
+        rng = random.Random(f'{seed}:popularity')
+        ranks = list(range(options['blogs']))
+        rng.shuffle(ranks)
+        by_rank = zipf_weights(options['blogs'], skew)
+        weights = [by_rank[rank] for rank in ranks]
+        self.comment_counts = allocate(options['comments'], weights, rng)
+        # Authors never like their own posts, so a post has at most users - 1 likes
+        self.like_counts = allocate(options['likes'], weights, rng, cap=max(options['users'] - 1, 0))
+        self.comment_starts = array('q', accumulate(self.comment_counts, initial=0))
+
+    def joined(self, user):
+        # Users sign up over the first half of the window, in index order
+        return self.start + self.window / 2 * (user / max(self.options['users'], 1))
+
+    # ---------------- Rows ----------------
+    def categories(self):
+        prefix, base = self.options['prefix'], self.bases[Category]
+        for index in range(self.options['categories']):
+            yield Category(pk=base + index, name=f'{prefix} category {index}', description=f'Seeded category {index}')
+
+    def users(self, start, end):
+        prefix, base = self.options['prefix'], self.bases[User]
+        for index in range(start, end):
+            yield User(pk=base + index, username=f'{prefix}_user{index}', email=f'{prefix}_user{index}@example.com',
+                       password=self.password, date_joined=self.joined(index))
+
+    def blog(self, index):
+        """The blog row plus its comments, likes and (without FULLTEXT) search terms."""
+        options, seed = self.options, self.options['seed']
+        rng = random.Random(f'{seed}:blog:{index}')
+        author = rng.choices(range(options['users']), cum_weights=self.author_weights)[0]
+        created = self.joined(author) + (self.end - self.joined(author)) * rng.random()
+        likes = self.like_counts[index]
+        thread = self.thread(index)
+        blog = Blog(
+            pk=self.bases[Blog] + index,
+            title=words(rng, 3, 8).capitalize()[:100],
+            content='\n\n'.join(words(rng, 30, 90) for _ in range(rng.randint(1, 8))),
+            author_id=self.bases[User] + author,
+            category_id=self.bases[Category] + rng.randrange(options['categories']) if options['categories'] else None,
+            created_at=created,
+            is_published=rng.random() < options['published'],
+            likes_count=likes,
+            comment_count=sum(1 for _, deleted, _ in thread if not deleted),
+            views=likes * rng.randint(3, 20) + rng.randint(0, 50),
+        )
+        yield blog
+        if not search.uses_fulltext():
+            for term, weight in search.term_weights(blog).items():
+                yield SearchTerm(term=term, blog_id=blog.pk, weight=weight)
+        yield from self.comments(index, blog, thread)
+        rng = random.Random(f'{seed}:likes:{index}')
+        for user in rng.sample(range(options['users'] - 1), likes):
+            user += user >= author  # every user but the author
+            yield Like(blog_id=blog.pk, user_id=self.bases[User] + user,
+                       created_at=created + (self.end - created) * rng.random())
+
+    def thread(self, index):
+        """(parent position or None, deleted, live replies) for each comment of a blog."""
+        options = self.options
+        rng = random.Random(f"{options['seed']}:thread:{index}")
+        thread, top_level = [], []
+        for position in range(self.comment_counts[index]):
+            parent = rng.choice(top_level) if top_level and rng.random() < options['replies'] else None
+            deleted = rng.random() < options['deleted']
+            thread.append([parent, deleted, 0])
+            if parent is None:
+                top_level.append(position)
+            elif not deleted:
+                thread[parent][2] += 1
+        return thread
+
+    def comments(self, index, blog, thread):
+        rng = random.Random(f"{self.options['seed']}:comments:{index}")
+        first = self.bases[Comment] + self.comment_starts[index]
+        span = (self.end - blog.created_at) / max(len(thread), 1)
+        for position, (parent, deleted, replies) in enumerate(thread):
+            created = blog.created_at + span * (position + rng.random())
+            author = rng.choices(range(self.options['users']), cum_weights=self.author_weights)[0]
+            yield Comment(
+                pk=first + position, blog_id=blog.pk, author_id=self.bases[User] + author,
+                parent_id=first + parent if parent is not None else None,
+                content=words(rng, 3, 40).capitalize(), created_at=created,
+                deleted_at=created + span * rng.random() if deleted else None, reply_count=replies,
+            )
+
+
+# ---------------- Writing ----------------
+class Writer:
+    """Buffers rows per model and bulk inserts them chunk_size at a time, parents first."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.buffers = {model: [] for model in MODELS}
+        self.written = dict.fromkeys(MODELS, 0)
+
+    def add(self, obj):
+        buffer = self.buffers[type(obj)]
+        buffer.append(obj)
+        if len(buffer) >= self.chunk_size:
+            self.flush(type(obj))
+
+    def flush(self, upto=MODELS[-1]):
+        for model in MODELS[:MODELS.index(upto) + 1]:
+            rows, self.buffers[model] = self.buffers[model], []
+            if rows:
+                model.objects.bulk_create(rows, batch_size=self.chunk_size)
+                self.written[model] += len(rows)
+
+    def counts(self):
+        self.flush()
+        return {model.__name__.lower(): count for model, count in self.written.items() if count}
+
+
+_plan = None
+
+
+def init_worker(options, bases, end):
+    global _plan
+    if not apps.ready:
+        django.setup()
+    _plan = Plan(options, bases, end)
+
+
+def run_unit(unit):
+    kind, start, end = unit
+    writer = Writer(_plan.options['chunk_size'])
+    rows = _plan.users(start, end) if kind == 'users' else (
+        row for index in range(start, end) for row in _plan.blog(index))
+    for row in rows:
+        writer.add(row)
+    return writer.counts()
+
+
+def units(kind, count, size):
+    return [(kind, start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def next_ids():
+    return {model: (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+            for model in (Category, User, Blog, Comment)}
+
+
+def run(options, end, workers=1, progress=None):
+    """Insert the dataset; returns rows written per model."""
+    prefix = options['prefix']
+    if User.objects.filter(username__startswith=f'{prefix}_user').exists():
+        raise ValueError(f"Users prefixed '{prefix}_user' exist already; pick another prefix.")
+    bases = next_ids()
+    init_worker(options, bases, end)
+
+    writer = Writer(options['chunk_size'])
+    for category in _plan.categories():
+        writer.add(category)
+    totals = writer.counts()
+    # Blogs carry their comments and likes, so blog units are kept small
+    blog_unit = max(1, min(options['chunk_size'] // 10, -(-options['blogs'] // (workers * 4))))
+    phases = [units('users', options['users'], options['chunk_size']), units('blogs', options['blogs'], blog_unit)]
+    try:
+        for phase in phases:
+            if workers > 1:
+                # Children open their own connections
+                connections.close_all()
+                with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(options, bases, end)) as pool:
+                    results = pool.map(run_unit, phase)
+                    for counts in results:
+                        merge(totals, counts, progress)
+            else:
+                for unit in phase:
+                    merge(totals, run_unit(unit), progress)
+    finally:
+        # Explicit keys leave sequences behind on backends that have them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), list(MODELS)):
+                cursor.execute(sql)
+        rollups.rebuild()
+        responsecache.bump('blogs', 'categories', 'users')
+    return totals
+
+
+def merge(totals, counts, progress):
+    for name, count in counts.items():
+        totals[name] = totals.get(name, 0) + count
+    if progress:
+        progress(totals)
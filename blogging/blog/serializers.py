@@ -1,18 +1,32 @@
+import os
 from rest_framework import serializers
-from .models import User, Category, Blog, Comment
+from rest_framework.exceptions import Throttled
+from django.db.models.functions import Substr
+from .models import User, Category, Blog, Comment, UploadSession, recent_comments_prefetch
+from .backends import find_user
+from .images import srcset
+from .search import highlight
+from . import bulk, lockout, timing, uploads
+from .viewcounter import view_counter
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .blacklist import FilteredRefreshToken
 from django.contrib.auth import password_validation
 
 
 # ------------------- User Serializer -------------------
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'is_admin', 'profile_picture', 'email']
+        fields = ['id', 'username', 'is_admin', 'profile_picture', 'profile_picture_srcset', 'email']
         read_only_fields = ['is_admin']
 
+    def get_profile_picture_srcset(self, obj):
+        return srcset(obj.profile_picture_variants, self.context.get('request'))
+
 
 # ------------------- Category Serializer -------------------
 class CategorySerializer(serializers.ModelSerializer):
@@ -21,15 +35,44 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description']
 
 
+# ------------------- Summary Serializers -------------------
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    profile_picture_srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile_picture', 'profile_picture_srcset']
+
+    def get_profile_picture_srcset(self, obj):
+        return srcset(obj.profile_picture_variants, self.context.get('request'))
+
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'name']
+
+
 # ------------------- Comment Serializer -------------------
 class CommentSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
+    author = AuthorSummarySerializer(read_only=True)
     comment = serializers.CharField(source='content') 
 
     class Meta:
         model = Comment
-        fields = ['id', 'blog', 'author', 'comment', 'created_at', 'deleted_at']
-        read_only_fields = ['blog', 'author', 'created_at', 'deleted_at']
+        fields = ['id', 'blog', 'parent', 'author', 'comment', 'reply_count', 'created_at', 'deleted_at']
+        read_only_fields = ['blog', 'author', 'reply_count', 'created_at', 'deleted_at']
+
+    def validate_parent(self, value):
+        # Replies must target a live comment on the same blog
+        blog_id = self.context.get('blog_id')
+        if value is not None and (value.deleted_at is not None or value.blog_id != blog_id):
+            raise serializers.ValidationError("Parent comment not found on this blog.")
+        return value
+
+    @timing.timed('comment-serializer')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
 
 
 # ------------------- Blog Serializer -------------------
@@ -37,21 +80,39 @@ class BlogSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     category_name = serializers.CharField(write_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    # Newest few top-level comments; the full thread is paged at blogs/<id>/comments/
+    recent_comments = CommentSerializer(many=True, read_only=True, default=list)
+    comments_count = serializers.IntegerField(source='comment_count', read_only=True)
     image = serializers.ImageField(required=False, allow_null=True)
-    likes_count = serializers.SerializerMethodField()  
+    # Id of a finished upload session, as an alternative to sending the file inline
+    image_upload = serializers.UUIDField(write_only=True, required=False)
+    image_srcset = serializers.SerializerMethodField()
+    views = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = Blog
         fields = [
-            'id', 'title', 'content', 'author', 'category', 'category_name', 'image',
+            'id', 'title', 'content', 'author', 'category', 'category_name', 'image', 'image_upload', 'image_srcset',
             'is_published', 'publish_at', 'created_at', 'deleted_at', 'updated_at',
-            'likes_count', 'comments'
+            'likes_count', 'liked_by_me', 'views', 'comments_count', 'recent_comments'
         ]
-        read_only_fields = ['author', 'category', "created_at", "deleted_at", "updated_at", "likes_count"]
+        read_only_fields = ['author', 'category', "created_at", "deleted_at", "updated_at", "likes_count", "views"]
+
+    def get_liked_by_me(self, obj):
+        # Views pass the ids the requesting user liked, looked up once per page
+        return obj.pk in self.context.get('liked_ids', ())
+
+    @timing.timed('blog-serializer')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
 
-    def get_likes_count(self, obj):
-        return obj.likes.count() 
+    def get_image_srcset(self, obj):
+        return srcset(obj.image_variants, self.context.get('request'))
+
+    def get_views(self, obj):
+        # Stored count plus increments still buffered in the view counter
+        return obj.views + view_counter.pending(obj.pk)
 
     def validate_category_name(self, value):
         try:
@@ -60,10 +121,19 @@ class BlogSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Category does not exist. Only admins can create new categories.")
         return value
 
+    def validate_image_upload(self, value):
+        return uploads.completed(value, self.context.get('user'), UploadSession.BLOG_IMAGE)
+
+    def attach_upload(self, validated_data):
+        session = validated_data.pop('image_upload', None)
+        if session is not None:
+            validated_data['image'] = uploads.attach(session)
+
     # ---------------- Create new blog ----------------
     def create(self, validated_data):
         category_name = validated_data.pop('category_name')
         category = Category.objects.get(name=category_name)
+        self.attach_upload(validated_data)
         blog = Blog.objects.create(category=category, **validated_data)
         return blog
 
@@ -74,12 +144,218 @@ class BlogSerializer(serializers.ModelSerializer):
         if category_name:
             category = Category.objects.get(name=category_name)
             instance.category = category
+        self.attach_upload(validated_data)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
         return instance
 
 
+# ------------------- Sparse fieldsets -------------------
+def requested_fields(request):
+    """Return the (fields, expand) name sets asked for in ?fields= and ?expand=."""
+    if request is None:
+        return set(), set()
+
+    def parse(param):
+        raw = request.query_params.get(param, '')
+        return {name.strip() for name in raw.split(',') if name.strip()}
+
+    return parse('fields'), parse('expand')
+
+
+class DynamicFieldsMixin:
+    # name -> (serializer class, kwargs); only rendered when named in ?expand=
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields') or set()
+        expand = self.context.get('expand') or set()
+
+        for name in expand & set(self.expandable_fields):
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+
+        if fields:
+            for name in set(self.fields) - fields - expand:
+                self.fields.pop(name)
+
+
+# ------------------- Blog List Serializer -------------------
+class BlogListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    EXCERPT_LENGTH = 200
+
+    author = AuthorSummarySerializer(read_only=True)
+    category = CategorySummarySerializer(read_only=True)
+    excerpt = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    views = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
+    comments_count = serializers.IntegerField(source='comment_count', read_only=True)
+
+    expandable_fields = {
+        'author': (UserSerializer, {}),
+        'category': (CategorySerializer, {}),
+        'comments': (CommentSerializer, {'many': True, 'source': 'recent_comments'}),
+    }
+
+    # output field -> model columns it needs loaded
+    field_columns = {
+        'id': ['id'],
+        'title': ['title'],
+        'excerpt': [],
+        'author': ['author__id', 'author__username', 'author__profile_picture', 'author__profile_picture_variants'],
+        'category': ['category__id', 'category__name'],
+        'image': ['image'],
+        'image_srcset': ['image_variants'],
+        'is_published': ['is_published'],
+        'created_at': ['created_at'],
+        'views': ['views'],
+        'likes_count': ['likes_count'],
+        'liked_by_me': [],
+        'comments_count': ['comment_count'],
+    }
+
+    class Meta:
+        model = Blog
+        fields = [
+            'id', 'title', 'excerpt', 'author', 'category', 'image', 'image_srcset', 'is_published',
+            'created_at', 'views', 'likes_count', 'liked_by_me', 'comments_count'
+        ]
+        read_only_fields = fields
+
+    def get_excerpt(self, obj):
+        excerpt = getattr(obj, 'excerpt', None)
+        if excerpt is None:
+            excerpt = obj.content[:self.EXCERPT_LENGTH]
+        return excerpt
+
+    def get_image_srcset(self, obj):
+        return srcset(obj.image_variants, self.context.get('request'))
+
+    def get_views(self, obj):
+        return obj.views + view_counter.pending(obj.pk)
+
+    def get_liked_by_me(self, obj):
+        return obj.pk in self.context.get('liked_ids', ())
+
+    @timing.timed('blog-serializer')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+    @classmethod
+    def setup_queryset(cls, queryset, fields=frozenset(), expand=frozenset()):
+        """Load only the columns (and relations) the requested representation renders."""
+        rendered = (fields & set(cls.Meta.fields)) or set(cls.Meta.fields)
+        rendered |= expand & set(cls.expandable_fields)
+
+        # id and created_at are always needed by the keyset paginator
+        columns = {'id', 'created_at'}
+        for name in rendered - expand:
+            columns.update(cls.field_columns.get(name, []))
+
+        if 'author' in rendered:
+            queryset = queryset.select_related('author')
+            if 'author' in expand:
+                columns = {c for c in columns if not c.startswith('author__')} | {'author'}
+        if 'category' in rendered:
+            queryset = queryset.select_related('category')
+            if 'category' in expand:
+                columns = {c for c in columns if not c.startswith('category__')} | {'category'}
+        if 'excerpt' in rendered:
+            queryset = queryset.annotate(excerpt=Substr('content', 1, cls.EXCERPT_LENGTH))
+        if 'comments' in expand:
+            queryset = queryset.prefetch_related(recent_comments_prefetch())
+        return queryset.only(*columns)
+
+
+class SearchResultSerializer(BlogListSerializer):
+    snippet = serializers.SerializerMethodField()
+
+    field_columns = {**BlogListSerializer.field_columns, 'snippet': ['content']}
+
+    class Meta(BlogListSerializer.Meta):
+        fields = BlogListSerializer.Meta.fields + ['snippet']
+        read_only_fields = fields
+
+    def get_snippet(self, obj):
+        return highlight(obj.content, self.context.get('search_terms', []))
+
+
+# ------------------- Upload Session Serializer -------------------
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'kind', 'filename', 'size', 'offset', 'status', 'expires_at']
+        read_only_fields = ['id', 'offset', 'status', 'expires_at']
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        if not value.lower().endswith(uploads.ALLOWED_EXTENSIONS):
+            raise serializers.ValidationError("Only .jpg, .jpeg, .png files are allowed.")
+        return value
+
+    def validate_size(self, value):
+        limit = uploads.config()['MAX_SIZE']
+        if not 0 < value <= limit:
+            raise serializers.ValidationError(f"Image size should be between 1 byte and {limit // (1024 * 1024)}MB")
+        return value
+
+
+# ------------------- Bulk Moderation Serializers -------------------
+class BlogBulkFilterSerializer(serializers.Serializer):
+    author = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False, allow_null=True)
+    is_published = serializers.BooleanField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+
+class CommentBulkFilterSerializer(serializers.Serializer):
+    blog = serializers.IntegerField(required=False)
+    author = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+
+class BulkActionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+
+    def validate_ids(self, value):
+        limit = bulk.config()['MAX_ITEMS']
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} ids per request.")
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Send either ids or filter.")
+        if 'filter' in attrs and not attrs['filter']:
+            # An empty filter would match every row
+            raise serializers.ValidationError({'filter': "Give at least one condition."})
+        return attrs
+
+
+class BlogBulkActionSerializer(BulkActionSerializer):
+    action = serializers.ChoiceField(choices=bulk.BLOG_ACTIONS)
+    filter = BlogBulkFilterSerializer(required=False)
+    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False, allow_null=True)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs['action'] == 'recategorize' and 'category' not in attrs:
+            raise serializers.ValidationError({'category': "Required for recategorize (null to clear)."})
+        return attrs
+
+
+class CommentBulkActionSerializer(BulkActionSerializer):
+    action = serializers.ChoiceField(choices=bulk.COMMENT_ACTIONS)
+    filter = CommentBulkFilterSerializer(required=False)
+
+
 # ------------------- Registration Serializer -------------------
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -112,24 +388,21 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = User.USERNAME_FIELD
 
     def validate(self, attrs):
-        # Can be username OR email
+        # Can be username OR email; blog.backends resolves either with one query
         identifier = attrs.get("username") 
         password = attrs.get("password")
-        # Try username-based authentication first
-        user = authenticate(username=identifier, password=password)
-        # If not found, try email
-        if user is None:
-            
-            try:
-                user_obj = User.objects.get(email=identifier)
-                user = authenticate(username=user_obj.username, password=password)
-            except User.DoesNotExist:
-                pass
+        account = find_user(identifier)
+        subjects = lockout.subjects(identifier, account)
+        wait = lockout.retry_after(*subjects)
+        if wait:
+            raise Throttled(wait=wait, detail="Too many failed login attempts. Try again later.")
 
+        user = authenticate(self.context.get('request'), username=identifier, password=password, user=account)
         if user is None:
+            lockout.register_failure(*subjects)
             raise serializers.ValidationError({"detail": "Invalid username/email or password"})
+        lockout.reset(*subjects)
 
-     
         refresh = self.get_token(user)
 
         return {
@@ -144,8 +417,16 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['username'] = user.username
         token['email'] = user.email
         token['is_admin'] = getattr(user, 'is_admin', False)
+        # Lets blog.authentication build request.user from the token alone
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token['is_active'] = user.is_active
         return token
 
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    # Blacklist check goes through the in-memory pre-filter (blog.blacklist)
+    token_class = FilteredRefreshToken
+
 # ------------------- Password Reset Serializers -------------------
 class PasswordResetSerializer(serializers.Serializer):
     email = serializers.EmailField()
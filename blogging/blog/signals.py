@@ -0,0 +1,167 @@
+from django.db.models import F, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Blog, Category, Comment, Like, User, comment_soft_deleted
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .blacklist import SCOPE as BLACKLIST_SCOPE, blacklist_filter
+from . import images, responsecache, rollups, search
+
+
+# ------------------- Search index -------------------
+@receiver(post_save, sender=Blog)
+def index_blog_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # e.g. the views counter saves with update_fields=['views']
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    search.index_blog(instance)
+
+
+# ------------------- Image variants -------------------
+def strip_image_metadata(sender, instance, raw=False, **kwargs):
+    # Originals are served as stored, so location and camera data never reach storage
+    if not raw:
+        images.strip_upload(instance, (sender._meta.app_label, sender.__name__))
+
+
+def schedule_image_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    label = (sender._meta.app_label, sender.__name__)
+    field, variants_field, _ = images.SOURCES[label]
+    if raw or (update_fields is not None and field not in update_fields):
+        return
+    if images.needs_processing(instance, label):
+        images.schedule(label, instance.pk)
+    elif not getattr(instance, field) and getattr(instance, variants_field):
+        # Image removed: drop the stale variants
+        sender.objects.filter(pk=instance.pk).update(**{variants_field: {}})
+        setattr(instance, variants_field, {})
+
+
+for model in (Blog, User):
+    pre_save.connect(strip_image_metadata, sender=model, dispatch_uid=f'image_metadata_{model.__name__}')
+    post_save.connect(schedule_image_variants, sender=model, dispatch_uid=f'image_variants_{model.__name__}')
+
+
+# ------------------- Likes counter -------------------
+@receiver(post_save, sender=Like)
+def count_like(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Blog.objects.filter(pk=instance.blog_id).update(likes_count=F('likes_count') + 1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, origin=None, **kwargs):
+    # The blog itself is going away; no point updating it once per like
+    if isinstance(origin, Blog) or (isinstance(origin, QuerySet) and origin.model is Blog):
+        return
+    Blog.objects.filter(pk=instance.blog_id).update(likes_count=F('likes_count') - 1)
+
+
+@receiver(m2m_changed, sender=Like)
+def count_added_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    # blog.likes.add() / user.liked_blogs.add() bulk insert without post_save;
+    # removals go through a queryset delete and hit uncount_like() instead.
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        Blog.objects.filter(pk__in=pk_set).update(likes_count=F('likes_count') + 1)
+    else:
+        Blog.objects.filter(pk=instance.pk).update(likes_count=F('likes_count') + len(pk_set))
+        instance.likes_count += len(pk_set)
+
+
+# ------------------- Comment counters -------------------
+def adjust_comment_counts(comment, delta):
+    Blog.objects.filter(pk=comment.blog_id).update(comment_count=F('comment_count') + delta)
+    if comment.parent_id:
+        Comment.objects.filter(pk=comment.parent_id).update(reply_count=F('reply_count') + delta)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.deleted_at is None:
+        adjust_comment_counts(instance, 1)
+
+
+@receiver(comment_soft_deleted, sender=Comment)
+def uncount_soft_deleted_comment(sender, instance, **kwargs):
+    adjust_comment_counts(instance, -1)
+    responsecache.bump('blogs', f'blog:{instance.blog_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    # Soft-deleted comments were uncounted already; blog deletes take the counters with them
+    if instance.deleted_at is not None:
+        return
+    if isinstance(origin, Blog) or (isinstance(origin, QuerySet) and origin.model is Blog):
+        return
+    adjust_comment_counts(instance, -1)
+
+
+# ------------------- Stats rollups -------------------
+ROLLUP_SOURCES = {Blog: ('blogs', 'created_at'), User: ('users', 'date_joined'),
+                  Comment: ('comments', 'created_at'), Like: ('likes', 'created_at')}
+
+
+def rollup_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metric, field = ROLLUP_SOURCES[sender]
+        rollups.bump(metric, getattr(instance, field))
+
+
+def rollup_deleted(sender, instance, **kwargs):
+    metric, field = ROLLUP_SOURCES[sender]
+    rollups.bump(metric, getattr(instance, field), -1)
+
+
+for model in ROLLUP_SOURCES:
+    post_save.connect(rollup_created, sender=model, dispatch_uid=f'rollup_created_{model.__name__}')
+    post_delete.connect(rollup_deleted, sender=model, dispatch_uid=f'rollup_deleted_{model.__name__}')
+
+
+# ------------------- Response cache invalidation -------------------
+def invalidate_blog(sender, instance, **kwargs):
+    responsecache.bump('blogs', f'blog:{instance.pk}')
+
+
+def invalidate_blog_children(sender, instance, **kwargs):
+    responsecache.bump('blogs', f'blog:{instance.blog_id}')
+
+
+def invalidate_categories(sender, instance, **kwargs):
+    responsecache.bump('categories')
+
+
+def invalidate_users(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached payload renders
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    # 'user:<id>' also versions the cached request.user (blog.authentication)
+    responsecache.bump('users', f'user:{instance.pk}')
+
+
+def invalidate_added_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add' and pk_set:
+        blog_ids = pk_set if reverse else [instance.pk]
+        responsecache.bump('blogs', *[f'blog:{pk}' for pk in blog_ids])
+
+
+for signal in (post_save, post_delete):
+    signal.connect(invalidate_blog, sender=Blog, dispatch_uid=f'cache_blog_{signal is post_save}')
+    signal.connect(invalidate_categories, sender=Category, dispatch_uid=f'cache_category_{signal is post_save}')
+    signal.connect(invalidate_users, sender=User, dispatch_uid=f'cache_user_{signal is post_save}')
+    for model in (Comment, Like):
+        signal.connect(invalidate_blog_children, sender=model,
+                       dispatch_uid=f'cache_{model.__name__}_{signal is post_save}')
+m2m_changed.connect(invalidate_added_likes, sender=Like, dispatch_uid='cache_like_m2m')
+
+
+# ------------------- Token blacklist pre-filter -------------------
+@receiver(post_save, sender=BlacklistedToken)
+def track_blacklisted_token(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        blacklist_filter.add(instance.token.jti)
+        # Other processes read rows added since their filter's generation
+        responsecache.bump(BLACKLIST_SCOPE)
@@ -141,7 +141,7 @@ from django.contrib.auth import get_user_model
 from rest_framework.exceptions import ValidationError
 from .models import User, Category, Blog, Comment
 from .serializers import (
-    MyTokenObtainPairSerializer,UserSerializer, CategorySerializer, BlogSerializer, CommentSerializer,
+    MyTokenObtainPairSerializer,UserSerializer, CategorySerializer, BlogSerializer, BlogListSerializer, CommentSerializer,
     RegisterSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer
 )
 
@@ -301,10 +301,8 @@ class MyTokenObtainPairSerializerTest(TestCase):
 # DJANGO VIEW TESTS (API)
 from rest_framework import status
 from rest_framework.test import APITestCase
-from django.utils.http import urlsafe_base64_encode
-from django.utils.encoding import force_bytes
-from django.contrib.auth.tokens import default_token_generator
 from blog.models import User, Category, Blog, Comment
+from blog.viewcounter import view_counter
 
 class ViewsTestCase(APITestCase):
 
@@ -388,6 +386,7 @@ class ViewsTestCase(APITestCase):
         url = f'/api/blogs/{self.blog.id}/'
         old_views = self.blog.views
         response = self.client.get(url)
+        view_counter.flush()
         self.blog.refresh_from_db()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.blog.views, old_views + 1)
@@ -450,3 +449,1822 @@ class ViewsTestCase(APITestCase):
 
     
 
+
+
+# ---------- KEYSET PAGINATION ----------
+class BlogPaginationTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="pager", email="pager@example.com", password="pass123")
+        self.category = Category.objects.create(name="Paging")
+        now = timezone.now()
+        # Pairs of blogs share a created_at so the id tie-breaker is exercised
+        self.blogs = [
+            Blog.objects.create(title=f"Blog {i}", content="Content", author=self.user, category=self.category,
+                                is_published=True, created_at=now - timezone.timedelta(minutes=i // 2))
+            for i in range(7)
+        ]
+
+    def test_pages_follow_next_cursor(self):
+        response = self.client.get('/api/blogs/', {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        seen = [b['id'] for b in response.data['results']]
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            seen += [b['id'] for b in response.data['results']]
+            next_url = response.data['next']
+        expected = [b.id for b in sorted(self.blogs, key=lambda b: (b.created_at, b.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_same_page(self):
+        first = self.client.get('/api/blogs/', {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([b['id'] for b in back.data['results']], [b['id'] for b in first.data['results']])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/blogs/', {'page_size': 10000})
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/blogs/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_my_blogs_paginated(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/blogs/my-blogs/', {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+
+# ---------- LIST PROJECTION ----------
+class BlogListProjectionTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="writer", email="writer@example.com", password="pass123")
+        self.category = Category.objects.create(name="Travel", description="Trips")
+        self.blog = Blog.objects.create(title="Long Read", content="x" * 1000, author=self.user,
+                                        category=self.category, is_published=True)
+        Comment.objects.create(blog=self.blog, author=self.user, content="First!")
+
+    def test_summary_representation(self):
+        item = self.client.get('/api/blogs/').data['results'][0]
+        self.assertNotIn('content', item)
+        self.assertNotIn('comments', item)
+        self.assertEqual(len(item['excerpt']), BlogListSerializer.EXCERPT_LENGTH)
+        self.assertEqual(item['author'], {'id': self.user.id, 'username': 'writer', 'profile_picture': None,
+                                          'profile_picture_srcset': None})
+        self.assertEqual(item['category'], {'id': self.category.id, 'name': 'Travel'})
+        self.assertEqual(item['comments_count'], 1)
+
+    def test_sparse_fields(self):
+        item = self.client.get('/api/blogs/', {'fields': 'id,title'}).data['results'][0]
+        self.assertEqual(set(item), {'id', 'title'})
+
+    def test_expand_relations(self):
+        item = self.client.get('/api/blogs/', {'fields': 'id', 'expand': 'comments,author'}).data['results'][0]
+        self.assertEqual(set(item), {'id', 'comments', 'author'})
+        self.assertEqual(item['comments'][0]['comment'], "First!")
+        self.assertEqual(item['author']['email'], "writer@example.com")
+
+    def test_queryset_defers_unrendered_columns(self):
+        qs = BlogListSerializer.setup_queryset(Blog.objects.all(), {'id', 'title'}, set())
+        blog = qs.get()
+        self.assertEqual(blog.get_deferred_fields() & {'content', 'image', 'views'}, {'content', 'image', 'views'})
+
+
+# ---------- QUERY BUDGETS ----------
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    # Fails when an endpoint's query count depends on how many rows it renders.
+
+    def count_queries(self, url, params=None):
+        # Buffered view increments would otherwise land in whichever request trips the flush
+        view_counter.flush()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx)
+
+    def assertQueryBudget(self, url, budget, add_rows, params=None):
+        add_rows(2)
+        small = self.count_queries(url, params)
+        add_rows(8)
+        large = self.count_queries(url, params)
+        self.assertEqual(small, large, f"{url}: query count grew from {small} to {large} with more rows")
+        self.assertLessEqual(large, budget, f"{url}: {large} queries exceeds budget of {budget}")
+
+
+class QueryBudgetTest(QueryBudgetMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="budget", email="budget@example.com", password="pass123")
+        self.category = Category.objects.create(name="Budget")
+        self.blog = Blog.objects.create(title="Budgeted", content="Content", author=self.user,
+                                        category=self.category, is_published=True)
+        self.client.force_authenticate(user=self.user)
+        self.counter = 0
+
+    def add_blogs(self, n):
+        for _ in range(n):
+            self.counter += 1
+            reader = User.objects.create_user(username=f"reader{self.counter}",
+                                              email=f"reader{self.counter}@example.com", password="pass123")
+            blog = Blog.objects.create(title=f"Blog {self.counter}", content="Content", author=reader,
+                                       category=Category.objects.create(name=f"Cat {self.counter}"),
+                                       is_published=True)
+            blog.likes.add(self.user)
+            Comment.objects.create(blog=blog, author=reader, content="Hi")
+
+    def add_comments(self, n):
+        for _ in range(n):
+            self.counter += 1
+            commenter = User.objects.create_user(username=f"commenter{self.counter}",
+                                                 email=f"commenter{self.counter}@example.com", password="pass123")
+            Comment.objects.create(blog=self.blog, author=commenter, content="Hi")
+            self.blog.likes.add(commenter)
+
+    def test_blog_feed(self):
+        # page + the requesting user's likes on that page
+        self.assertQueryBudget('/api/blogs/', 2, self.add_blogs)
+
+    def test_blog_feed_expanded(self):
+        self.assertQueryBudget('/api/blogs/', 3, self.add_blogs, {'expand': 'comments,author,category'})
+
+    def test_my_blogs(self):
+        def add_own_blogs(n):
+            for i in range(n):
+                self.counter += 1
+                blog = Blog.objects.create(title=f"Mine {self.counter}", content="Content", author=self.user,
+                                           category=self.category)
+                Comment.objects.create(blog=blog, author=self.user, content="Hi")
+        self.assertQueryBudget('/api/blogs/my-blogs/', 2, add_own_blogs)
+
+    def test_blog_detail(self):
+        self.assertQueryBudget(f'/api/blogs/{self.blog.id}/', 3, self.add_comments)
+
+    def test_comment_list(self):
+        self.assertQueryBudget(f'/api/blogs/{self.blog.id}/comments/', 2, self.add_comments)
+
+    def test_category_list(self):
+        def add_categories(n):
+            for _ in range(n):
+                self.counter += 1
+                Category.objects.create(name=f"Extra {self.counter}")
+        self.assertQueryBudget('/api/categories/', 1, add_categories)
+
+
+# ---------- FULL-TEXT SEARCH ----------
+from blog import search
+from blog.models import SearchTerm
+
+
+class SearchTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="searcher", email="searcher@example.com", password="pass123")
+        self.category = Category.objects.create(name="Code")
+        self.in_title = Blog.objects.create(title="Python tips", content="Short notes on tooling.",
+                                            author=self.user, category=self.category, is_published=True)
+        self.in_body = Blog.objects.create(title="Weekly notes", content="Some python and some rust & <tags>.",
+                                           author=self.user, category=self.category, is_published=True)
+        self.unrelated = Blog.objects.create(title="Cooking", content="Pasta recipes.",
+                                             author=self.user, category=self.category, is_published=True)
+
+    def search(self, query, **params):
+        return self.client.get('/api/blogs/', {'search': query, **params}).data
+
+    def test_title_matches_rank_first(self):
+        results = self.search("python")['results']
+        self.assertEqual([b['id'] for b in results], [self.in_title.id, self.in_body.id])
+
+    def test_all_terms_must_match(self):
+        results = self.search("python rust")['results']
+        self.assertEqual([b['id'] for b in results], [self.in_body.id])
+
+    def test_mysql_query_skips_unindexed_words(self):
+        terms = search.query_terms("the django of orm is fast")
+        self.assertEqual(search.boolean_query(terms), '+django +orm +fast*')
+        self.assertEqual(search.boolean_query(search.query_terms("to be")), '+be*')
+
+    def test_last_term_is_prefix(self):
+        results = self.search("pyth")['results']
+        self.assertEqual(len(results), 2)
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        snippet = self.search("rust")['results'][0]['snippet']
+        self.assertIn("<mark>rust</mark>", snippet)
+        self.assertIn("&lt;tags&gt;", snippet)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.unrelated.content = "Pasta with python sauce."
+        self.unrelated.save()
+        self.assertEqual(len(self.search("python")['results']), 3)
+        self.unrelated.delete()
+        self.assertFalse(SearchTerm.objects.filter(blog_id=self.unrelated.id).exists())
+        self.assertEqual(len(self.search("python")['results']), 2)
+
+    def test_views_save_skips_reindex(self):
+        SearchTerm.objects.filter(blog=self.in_title).delete()
+        self.in_title.views += 1
+        self.in_title.save(update_fields=['views'])
+        self.assertFalse(SearchTerm.objects.filter(blog=self.in_title).exists())
+
+    def test_search_results_paginate_by_rank(self):
+        first = self.search("python", page_size=1)
+        self.assertEqual(first['results'][0]['id'], self.in_title.id)
+        second = self.client.get(first['next']).data
+        self.assertEqual([b['id'] for b in second['results']], [self.in_body.id])
+        self.assertIsNone(second['next'])
+
+    def test_rebuild_index(self):
+        SearchTerm.objects.all().delete()
+        self.assertEqual(search.rebuild_index(), 3)
+        self.assertEqual(len(self.search("notes")['results']), 2)
+
+
+# ---------- WRITE-BEHIND VIEW COUNTER ----------
+import threading
+from unittest import mock
+from django.test import override_settings
+
+
+class ViewCounterTest(APITestCase):
+
+    def setUp(self):
+        view_counter.clear()
+        self.user = User.objects.create_user(username="viewer", email="viewer@example.com", password="pass123")
+        self.blog = Blog.objects.create(title="Popular", content="Content", author=self.user, is_published=True)
+        self.other = Blog.objects.create(title="Quiet", content="Content", author=self.user, is_published=True)
+        self.client.force_authenticate(user=self.user)
+
+    def test_reads_do_not_write_until_flush(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/api/blogs/{self.blog.id}/')
+        self.assertFalse(any(q['sql'].startswith('UPDATE') for q in ctx.captured_queries))
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.views, 0)
+
+    def test_pending_counts_are_visible_to_reads(self):
+        self.client.get(f'/api/blogs/{self.blog.id}/')
+        response = self.client.get(f'/api/blogs/{self.blog.id}/')
+        self.assertEqual(response.data['views'], 2)
+
+    def test_flush_batches_increments(self):
+        for _ in range(3):
+            view_counter.increment(self.blog.id)
+        view_counter.increment(self.other.id)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(view_counter.flush(), 4)
+        blog_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "blog_blog"')]
+        self.assertEqual(len(blog_updates), 2)
+        self.blog.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.blog.views, self.other.views), (3, 1))
+        self.assertEqual(view_counter.pending_total(), 0)
+
+    @override_settings(BLOG_VIEW_COUNTER={'FLUSH_THRESHOLD': 2})
+    def test_threshold_triggers_flush(self):
+        view_counter.increment(self.blog.id)
+        view_counter.increment(self.blog.id)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.views, 2)
+        self.assertEqual(view_counter.pending(self.blog.id), 0)
+
+    @override_settings(BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 0})
+    def test_flush_thread_writes_quiet_blogs(self):
+        flushed = threading.Event()
+        with mock.patch.object(view_counter, 'flush', side_effect=flushed.set):
+            view_counter.start()
+            try:
+                self.assertTrue(flushed.wait(5))
+            finally:
+                view_counter.stop()
+
+
+# ---------- LIKES ----------
+from blog.models import Like
+
+
+class LikeToggleTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="liked", email="liked@example.com", password="pass123")
+        self.fan = User.objects.create_user(username="fan", email="fan@example.com", password="pass123")
+        self.blog = Blog.objects.create(title="Likeable", content="Content", author=self.author, is_published=True)
+        self.client.force_authenticate(user=self.fan)
+        self.url = f'/api/blogs/{self.blog.id}/like-toggle/'
+
+    def test_toggle_maintains_counter(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {"liked": True, "total_likes": 1})
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.likes_count, 1)
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {"liked": False, "total_likes": 0})
+        self.assertFalse(Like.objects.filter(blog=self.blog, user=self.fan).exists())
+
+    def test_toggle_does_not_load_likers(self):
+        for i in range(5):
+            user = User.objects.create_user(username=f"liker{i}", email=f"liker{i}@example.com", password="pass123")
+            self.blog.likes.add(user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.url)
+        self.assertFalse(any('blog_user' in q['sql'] and 'INNER JOIN' in q['sql'] for q in ctx.captured_queries))
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.likes_count, 6)
+
+    def test_cannot_like_own_blog(self):
+        self.client.force_authenticate(user=self.author)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unique_like(self):
+        Like.objects.create(blog=self.blog, user=self.fan)
+        with self.assertRaises(IntegrityError):
+            Like.objects.create(blog=self.blog, user=self.fan)
+
+    def test_manager_paths_keep_counter(self):
+        self.fan.liked_blogs.add(self.blog)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.likes_count, 1)
+        self.blog.likes.remove(self.fan)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.likes_count, 0)
+
+    def test_liked_by_me_in_feed(self):
+        other = Blog.objects.create(title="Other", content="Content", author=self.author, is_published=True)
+        self.client.post(self.url)
+        results = self.client.get('/api/blogs/').data['results']
+        flags = {b['id']: b['liked_by_me'] for b in results}
+        self.assertEqual(flags, {self.blog.id: True, other.id: False})
+        detail = self.client.get(f'/api/blogs/{self.blog.id}/').data
+        self.assertTrue(detail['liked_by_me'])
+        self.assertEqual(detail['likes_count'], 1)
+
+
+# ---------- STATS ROLLUPS ----------
+from datetime import date
+from io import StringIO
+from django.core.management import call_command
+from blog import rollups
+from blog.models import DailyStats
+
+
+class StatsRollupTest(APITestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username="staff", email="staff@example.com", password="pass123",
+                                              is_staff=True)
+        self.author = User.objects.create_user(username="stat_author", email="stat@example.com", password="pass123")
+        self.blog = Blog.objects.create(title="Counted", content="Content", author=self.author, is_published=True)
+        Comment.objects.create(blog=self.blog, author=self.author, content="Hi")
+        self.blog.toggle_like(self.staff)
+        self.client.force_authenticate(user=self.staff)
+
+    def test_writes_update_rollups(self):
+        today = DailyStats.objects.get(date=timezone.localdate())
+        self.assertEqual((today.users, today.blogs, today.comments, today.likes), (2, 1, 1, 1))
+        self.blog.toggle_like(self.staff)
+        today.refresh_from_db()
+        self.assertEqual(today.likes, 0)
+
+    def test_stats_reads_rollups(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('blog_blog_likes' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(response.data['total_likes'], 1)
+        self.assertEqual(response.data['total_blogs'], 1)
+        self.assertEqual(response.data['daily_blogs'], [{'date': timezone.localdate(), 'count': 1}])
+        self.assertEqual(response.data['monthly_users'][0]['count'], 2)
+
+    def test_stats_date_range(self):
+        DailyStats.objects.create(date=date(2020, 1, 5), blogs=3)
+        response = self.client.get('/api/stats/', {'from': '2020-01-01', 'to': '2020-01-31'})
+        self.assertEqual(response.data['daily_blogs'], [{'date': date(2020, 1, 5), 'count': 3}])
+        self.assertEqual(response.data['total_blogs'], 4)
+        response = self.client.get('/api/stats/', {'from': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cascading_delete_batches_updates(self):
+        for i in range(3):
+            Comment.objects.create(blog=self.blog, author=self.author, content=f"More {i}")
+        with CaptureQueriesContext(connection) as ctx:
+            with rollups.batched():
+                self.blog.delete()
+        rollup_writes = [q for q in ctx.captured_queries if 'blog_dailystats' in q['sql']]
+        self.assertEqual(len(rollup_writes), 1)
+        today = DailyStats.objects.get(date=timezone.localdate())
+        self.assertEqual((today.blogs, today.comments, today.likes), (0, 0, 0))
+
+    def test_flushed_views_are_rolled_up(self):
+        view_counter.clear()
+        view_counter.increment(self.blog.id, 4)
+        view_counter.flush()
+        self.assertEqual(DailyStats.objects.get(date=timezone.localdate()).views, 4)
+
+    def test_rebuild_heals_drift(self):
+        DailyStats.objects.all().update(blogs=99, views=7)
+        call_command('rebuild_stats', stdout=StringIO())
+        today = DailyStats.objects.get(date=timezone.localdate())
+        self.assertEqual((today.blogs, today.views), (1, 7))
+
+
+# ---------- STREAMING EXPORTS ----------
+import csv
+import json
+from blog import exports
+
+
+class ExportTest(APITestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username="exporter", email="exporter@example.com", password="pass123",
+                                              is_staff=True)
+        for i in range(5):
+            user = User.objects.create_user(username=f"row{i}", email=f"row{i}@example.com", password="pass123")
+            Blog.objects.create(title=f"Row {i}", content="Content", author=user)
+        self.client.force_authenticate(user=self.staff)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_users(self):
+        response = self.client.get('/api/exports/users/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(set(rows[0]), {'id', 'username', 'email', 'is_admin', 'date_joined'})
+
+    def test_csv_blogs(self):
+        response = self.client.get('/api/exports/blogs/', {'output': 'csv'})
+        rows = list(csv.reader(self.read(response).splitlines()))
+        self.assertEqual(rows[0][:2], ['id', 'title'])
+        self.assertEqual(len(rows), 6)
+
+    def test_rows_read_in_pk_batches(self):
+        queryset, columns = exports.DATASETS['users']
+        with CaptureQueriesContext(connection) as ctx:
+            rows = list(exports.iter_rows(queryset, ['username'], chunk_size=2))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(ctx.captured_queries), 4)
+
+    def test_admin_only_and_validation(self):
+        self.assertEqual(self.client.get('/api/exports/passwords/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/exports/users/', {'output': 'xml'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=User.objects.get(username="row0"))
+        self.assertEqual(self.client.get('/api/exports/users/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_carries_only_aggregates(self):
+        data = self.client.get('/api/stats/').data
+        self.assertNotIn('users', data)
+        self.assertNotIn('blogs', data)
+        self.assertEqual(data['total_users'], 6)
+
+    def test_admin_users_paginated(self):
+        User.objects.create_user(username="other_admin", email="other_admin@example.com", password="pass123",
+                                 is_admin=True)
+        first = self.client.get('/api/stats/users/', {'page_size': 4}).data
+        self.assertEqual(len(first['results']), 4)
+        second = self.client.get(first['next']).data
+        self.assertIsNone(second['next'])
+        usernames = [u['username'] for u in first['results'] + second['results']]
+        self.assertEqual(len(usernames), 6)
+        self.assertNotIn('other_admin', usernames)
+        self.client.force_authenticate(user=User.objects.get(username="row0"))
+        self.assertEqual(self.client.get('/api/stats/users/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+# ---------- RESPONSE CACHE ----------
+from django.core.cache import cache
+from blog import responsecache
+
+
+class ResponseCacheTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        responsecache.reset_counters()
+        view_counter.clear()
+        self.author = User.objects.create_user(username="cached", email="cached@example.com", password="pass123")
+        self.reader = User.objects.create_user(username="reader", email="reader@example.com", password="pass123")
+        self.category = Category.objects.create(name="Cached")
+        self.blog = Blog.objects.create(title="Cached post", content="Content", author=self.author,
+                                        category=self.category, is_published=True)
+
+    def test_anonymous_feed_is_cached(self):
+        self.client.get('/api/blogs/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/blogs/')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(response.data['results'][0]['id'], self.blog.id)
+        self.assertEqual(responsecache.counters()['blog-list-create'], {'hits': 1, 'misses': 1})
+
+    def test_param_order_does_not_split_cache(self):
+        self.client.get('/api/blogs/', {'fields': 'id,title', 'page_size': 5})
+        self.client.get('/api/blogs/?page_size=5&fields=title,id')
+        self.assertEqual(responsecache.counters()['blog-list-create']['hits'], 1)
+
+    def test_writes_invalidate_feed(self):
+        self.client.get('/api/blogs/')
+        self.blog.title = "Renamed"
+        self.blog.save()
+        self.assertEqual(self.client.get('/api/blogs/').data['results'][0]['title'], "Renamed")
+        self.category.name = "Recategorized"
+        self.category.save()
+        self.assertEqual(self.client.get('/api/blogs/').data['results'][0]['category']['name'], "Recategorized")
+        Comment.objects.create(blog=self.blog, author=self.reader, content="New")
+        self.assertEqual(self.client.get('/api/blogs/').data['results'][0]['comments_count'], 1)
+        self.blog.toggle_like(self.reader)
+        self.assertEqual(self.client.get('/api/blogs/').data['results'][0]['likes_count'], 1)
+
+    def test_category_list_cached_and_invalidated(self):
+        self.client.get('/api/categories/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/categories/')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        Category.objects.create(name="Fresh")
+        self.assertEqual(len(self.client.get('/api/categories/').data), 2)
+
+    def test_detail_cached_per_blog_with_user_overlay(self):
+        self.client.force_authenticate(user=self.reader)
+        self.client.get(f'/api/blogs/{self.blog.id}/')
+        self.blog.toggle_like(self.reader)
+        response = self.client.get(f'/api/blogs/{self.blog.id}/')
+        self.assertTrue(response.data['liked_by_me'])
+        self.assertEqual(response.data['likes_count'], 1)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/blogs/{self.blog.id}/')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(response.data['views'], 3)
+
+    def test_unpublished_detail_not_cached(self):
+        draft = Blog.objects.create(title="Draft", content="Content", author=self.author)
+        self.client.force_authenticate(user=self.author)
+        self.client.get(f'/api/blogs/{draft.id}/')
+        self.client.force_authenticate(user=self.reader)
+        self.assertEqual(self.client.get(f'/api/blogs/{draft.id}/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_view_flush_keeps_cached_feed(self):
+        self.client.get('/api/blogs/')
+        view_counter.increment(self.blog.id, 2)
+        self.assertEqual(self.client.get('/api/blogs/').data['results'][0]['views'], 2)
+        view_counter.flush()
+        self.assertEqual(self.client.get('/api/blogs/').data['results'][0]['views'], 2)
+        view_counter.increment(self.blog.id)
+        self.assertEqual(self.client.get('/api/blogs/').data['results'][0]['views'], 3)
+        self.assertEqual(responsecache.counters()['blog-list-create'], {'hits': 3, 'misses': 1})
+
+    def test_per_process_backend_disables_caching(self):
+        with self.settings(BLOG_RESPONSE_CACHE={'SINGLE_PROCESS': False}):
+            self.assertFalse(responsecache.enabled())
+            self.assertEqual([check.id for check in responsecache.check_backend(None)], ['blog.W001'])
+            self.client.get('/api/blogs/')
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/blogs/')
+            self.assertGreater(len(ctx.captured_queries), 0)
+            self.assertNotIn('ETag', response)
+            with self.settings(CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/blogresp'}}):
+                self.assertTrue(responsecache.enabled())
+
+
+# ---------- CONDITIONAL GET ----------
+class ConditionalGetTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        view_counter.clear()
+        self.author = User.objects.create_user(username="etag", email="etag@example.com", password="pass123")
+        self.reader = User.objects.create_user(username="etag_reader", email="etag_reader@example.com",
+                                               password="pass123")
+        self.blog = Blog.objects.create(title="Validated", content="Content", author=self.author, is_published=True)
+        self.client.force_authenticate(user=self.reader)
+
+    def test_detail_etag_round_trip(self):
+        url = f'/api/blogs/{self.blog.id}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(response['ETag'], etag)
+        # Only the first read counted a view
+        self.assertEqual(view_counter.pending(self.blog.id), 1)
+
+    def test_write_changes_etag(self):
+        url = f'/api/blogs/{self.blog.id}/comments/'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(blog=self.blog, author=self.reader, content="New")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/categories/')
+        response = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_feed_etag_varies_by_user_and_params(self):
+        etag = self.client.get('/api/blogs/')['ETag']
+        self.assertEqual(self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get('/api/blogs/', {'page_size': 1}, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_200_OK)
+        self.client.force_authenticate(user=self.author)
+        self.assertEqual(self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_unchecked_blogs_never_not_modified(self):
+        draft = Blog.objects.create(title="Draft", content="Content", author=self.author, is_published=False)
+        future = 'Fri, 01 Jan 2100 00:00:00 GMT'
+        view_counter.clear()
+        for url, code in [(f'/api/blogs/{draft.id}/', status.HTTP_403_FORBIDDEN),
+                          ('/api/blogs/99999/', status.HTTP_404_NOT_FOUND),
+                          ('/api/blogs/99999/comments/', status.HTTP_404_NOT_FOUND)]:
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=future).status_code, code, url)
+        self.assertEqual(view_counter.pending(draft.id), 0)
+        self.assertEqual(view_counter.pending(99999), 0)
+
+    def test_view_flush_keeps_etags(self):
+        detail, comments = f'/api/blogs/{self.blog.id}/', f'/api/blogs/{self.blog.id}/comments/'
+        detail_etag = self.client.get(detail)['ETag']
+        comments_etag = self.client.get(comments)['ETag']
+        self.client.get(detail)
+        view_counter.flush()
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=detail_etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(comments, HTTP_IF_NONE_MATCH=comments_etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+
+# ---------- SCHEDULED PUBLISHING ----------
+from blog import scheduler
+
+
+class SchedulerTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="scheduler", email="scheduler@example.com", password="pass123")
+        now = timezone.now()
+        self.due = [
+            Blog.objects.create(title=f"Due {i}", content="Content", author=self.user,
+                                publish_at=now + timezone.timedelta(seconds=1))
+            for i in range(3)
+        ]
+        self.future = Blog.objects.create(title="Later", content="Content", author=self.user,
+                                          publish_at=now + timezone.timedelta(days=1))
+        self.later = now + timezone.timedelta(minutes=5)
+
+    def test_publishes_due_posts_in_one_update(self):
+        before = timezone.now()
+        with CaptureQueriesContext(connection) as ctx:
+            ids = scheduler.publish_due(self.later)
+        self.assertEqual(sorted(ids), sorted(b.id for b in self.due))
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(Blog.objects.filter(is_published=True, updated_at__gte=before).count(), 3)
+        self.future.refresh_from_db()
+        self.assertFalse(self.future.is_published)
+
+    def test_batches_until_caught_up(self):
+        self.assertEqual(scheduler.publish_all_due(self.later, batch_size=2), 3)
+        self.assertEqual(scheduler.publish_due(self.later), [])
+
+    def test_lag(self):
+        self.assertEqual(scheduler.lag(self.later), timezone.timedelta(minutes=5) - timezone.timedelta(seconds=1))
+        scheduler.publish_all_due(self.later)
+        self.assertEqual(scheduler.lag(self.later), timezone.timedelta(0))
+
+    def test_publish_invalidates_feed(self):
+        cache.clear()
+        self.assertEqual(self.client.get('/api/blogs/').data['results'], [])
+        scheduler.publish_due(self.later)
+        self.assertEqual(len(self.client.get('/api/blogs/').data['results']), 3)
+
+
+# ---------- COMMENT THREADS ----------
+class CommentThreadTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="threader", email="threader@example.com", password="pass123")
+        self.blog = Blog.objects.create(title="Thread", content="Content", author=self.user, is_published=True)
+        self.url = f'/api/blogs/{self.blog.id}/comments/'
+        self.client.force_authenticate(user=self.user)
+
+    def comment(self, content, parent=None):
+        return Comment.objects.create(blog=self.blog, author=self.user, content=content, parent=parent)
+
+    def test_comment_count_follows_creates_and_deletes(self):
+        first = self.comment("one")
+        self.comment("two")
+        first.soft_delete()
+        first.soft_delete()
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comment_count, 1)
+        Comment.objects.filter(content="two").delete()
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comment_count, 0)
+
+    def test_replies_are_counted_and_loaded_lazily(self):
+        root = self.comment("root")
+        response = self.client.post(self.url, {'comment': 'reply', 'parent': root.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+
+        top = self.client.get(self.url).data['results']
+        self.assertEqual([c['comment'] for c in top], ['root'])
+        replies = self.client.get(self.url, {'parent': root.id}).data['results']
+        self.assertEqual([c['comment'] for c in replies], ['reply'])
+
+    def test_reply_to_other_blog_rejected(self):
+        other = Blog.objects.create(title="Other", content="Content", author=self.user)
+        foreign = Comment.objects.create(blog=other, author=self.user, content="elsewhere")
+        response = self.client.post(self.url, {'comment': 'reply', 'parent': foreign.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comments_paginated_newest_first(self):
+        for i in range(5):
+            self.comment(f"c{i}")
+        page = self.client.get(self.url, {'page_size': 2}).data
+        self.assertEqual([c['comment'] for c in page['results']], ['c4', 'c3'])
+        page = self.client.get(page['next']).data
+        self.assertEqual([c['comment'] for c in page['results']], ['c2', 'c1'])
+
+    def test_blog_payload_carries_count_and_recent_comments(self):
+        for i in range(5):
+            self.comment(f"c{i}")
+        self.comment("gone").soft_delete()
+        data = self.client.get(f'/api/blogs/{self.blog.id}/').data
+        self.assertEqual(data['comments_count'], 5)
+        self.assertEqual([c['comment'] for c in data['recent_comments']], ['c4', 'c3', 'c2'])
+        self.assertNotIn('comments', data)
+
+
+# ---------- EMAIL OUTBOX ----------
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from blog import outbox
+from blog.models import OutboxEmail
+
+
+class CountingBackend(LocmemBackend):
+    opened = 0
+    fail_for = set()
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if any(set(m.to) & self.fail_for for m in messages):
+            raise ConnectionError("refused")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='blog.tests.CountingBackend')
+class OutboxTest(APITestCase):
+
+    def setUp(self):
+        outbox.reset_counters()
+        CountingBackend.opened = 0
+        CountingBackend.fail_for = set()
+        self.user = User.objects.create_user(username="forgetful", email="forgetful@example.com", password="pass123")
+
+    def test_reset_request_only_enqueues(self):
+        response = self.client.post('/api/auth/reset-password/', {'email': 'forgetful@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual((queued.kind, queued.to_email), ('password_reset', 'forgetful@example.com'))
+
+    def test_repeat_reset_requests_deduplicated(self):
+        for _ in range(3):
+            self.client.post('/api/auth/reset-password/', {'email': 'forgetful@example.com'})
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertEqual(outbox.counters()['deduplicated'], 2)
+
+    def test_concurrent_requests_deduplicated(self):
+        # Both requests ran the window check before either row was inserted
+        with mock.patch('django.db.models.query.QuerySet.exists', return_value=False):
+            first = outbox.enqueue_password_reset(self.user, 'http://example.com/reset/1')
+            second = outbox.enqueue_password_reset(self.user, 'http://example.com/reset/2')
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+        # A message that failed for good frees its window
+        OutboxEmail.objects.update(status=OutboxEmail.FAILED, dedup_bucket=None)
+        self.assertIsNotNone(outbox.enqueue_password_reset(self.user, 'http://example.com/reset/3'))
+
+    def test_batch_sent_over_one_connection(self):
+        for i in range(5):
+            outbox.enqueue(f"reader{i}@example.com", "Hello", "Body")
+        self.assertEqual(outbox.send_all_due(batch_size=10), (5, 0))
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 5)
+        self.assertEqual(outbox.backlog()['pending'], 0)
+
+    def test_failures_back_off_then_give_up(self):
+        CountingBackend.fail_for = {"bounce@example.com"}
+        message = outbox.enqueue("bounce@example.com", "Hello", "Body")
+        now = timezone.now()
+        with self.assertLogs('blog.outbox', 'WARNING'):
+            self.assertEqual(outbox.send_due(now), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxEmail.PENDING, 1))
+        self.assertEqual(message.next_attempt_at, now + outbox.backoff(1))
+        self.assertEqual(outbox.send_due(now), (0, 0))
+
+        with override_settings(BLOG_EMAIL_OUTBOX={'MAX_ATTEMPTS': 2}), self.assertLogs('blog.outbox', 'ERROR'):
+            outbox.send_due(message.next_attempt_at)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxEmail.FAILED, 2))
+        self.assertEqual(outbox.counters(), {'enqueued': 1, 'retried': 1, 'failed': 1})
+
+
+# ---------- IMAGE VARIANTS ----------
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from blog import images
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg_upload(name="photo.jpg", size=(2000, 1000), color='red'):
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BLOG_IMAGE_PIPELINE={'WORKERS': 0})
+class ImageVariantsTest(APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="photographer", email="photo@example.com", password="pass123")
+
+    def create_blog(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            blog = Blog.objects.create(title="Photo", content="Content", author=self.user, is_published=True,
+                                       image=jpeg_upload(), **kwargs)
+        blog.refresh_from_db()
+        return blog
+
+    def test_variants_resized_webp_without_exif(self):
+        blog = self.create_blog()
+        self.assertEqual(blog.image_variants['source'], blog.image.name)
+        for name, edge in images.VARIANTS.items():
+            variant = blog.image_variants[name]
+            self.assertEqual((variant['width'], variant['height']), (edge, edge // 2))
+            with default_storage.open(variant['name']) as handle, Image.open(handle) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(len(image.getexif()), 0)
+
+    def test_original_stored_without_exif(self):
+        blog = self.create_blog()
+        with default_storage.open(blog.image.name) as handle, Image.open(handle) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_command_strips_stored_originals(self):
+        blog = self.create_blog()
+        upload = jpeg_upload()
+        name = default_storage.save('blog_image/old.jpg', upload)
+        Blog.objects.filter(pk=blog.pk).update(image=name, image_variants={**blog.image_variants, 'source': name})
+        out = io.StringIO()
+        call_command('build_image_variants', strip_originals=True, stdout=out)
+        self.assertIn("Stripped metadata from 1 originals.", out.getvalue())
+        blog.refresh_from_db()
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(blog.image_variants['source'], blog.image.name)
+        with default_storage.open(blog.image.name) as handle, Image.open(handle) as image:
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_command_jobs_counted_as_pending(self):
+        blog = self.create_blog()
+        Blog.objects.filter(pk=blog.pk).update(image_variants={})
+        with self.settings(BLOG_IMAGE_PIPELINE={'WORKERS': 1}), mock.patch.object(images, 'build') as build:
+            call_command('build_image_variants', stdout=io.StringIO())
+        build.assert_called_once_with(('blog', 'Blog'), blog.pk)
+        self.assertEqual(images.pending(), 0)
+
+    def test_identical_renders_share_files(self):
+        first, second = self.create_blog(), self.create_blog()
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants['thumb'], second.image_variants['thumb'])
+
+    def test_unchanged_image_not_reprocessed(self):
+        blog = self.create_blog()
+        with mock.patch.object(images, 'schedule') as schedule:
+            blog.title = "Renamed"
+            blog.save()
+        schedule.assert_not_called()
+
+    def test_removed_image_drops_variants(self):
+        blog = self.create_blog()
+        blog.image = None
+        blog.save()
+        blog.refresh_from_db()
+        self.assertEqual(blog.image_variants, {})
+
+    def test_srcset_in_payloads(self):
+        blog = self.create_blog()
+        item = self.client.get('/api/blogs/').data['results'][0]
+        self.assertEqual(set(item['image_srcset']), {'thumb', 'card', 'full', 'srcset'})
+        self.assertIn(f"{item['image_srcset']['thumb']} 160w", item['image_srcset']['srcset'])
+        self.client.force_authenticate(user=self.user)
+        detail = self.client.get(f'/api/blogs/{blog.id}/').data
+        self.assertEqual(detail['image_srcset']['card'], default_storage.url(blog.image_variants['card']['name']))
+        self.assertIsNone(detail['author']['profile_picture_srcset'])
+
+
+# ---------- RESUMABLE UPLOADS ----------
+from blog import uploads
+from blog.models import UploadSession
+
+UPLOAD_DIR = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BLOG_UPLOADS={'TEMP_DIR': UPLOAD_DIR, 'MAX_CHUNK': 4096},
+                   BLOG_IMAGE_PIPELINE={'WORKERS': 0})
+class UploadSessionTest(APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(UPLOAD_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="uploader", email="uploader@example.com", password="pass123")
+        self.client.force_authenticate(user=self.user)
+        buffer = io.BytesIO()
+        Image.effect_noise((300, 200), 64).convert('RGB').save(buffer, format='JPEG')
+        self.data = buffer.getvalue()
+        Category.objects.create(name="Uploads")
+
+    def start(self, kind='blog_image', **overrides):
+        payload = {'kind': kind, 'filename': 'photo.jpg', 'size': len(self.data), **overrides}
+        return self.client.post('/api/uploads/', payload)
+
+    def put(self, session_id, start, end, body=None):
+        body = self.data[start:end + 1] if body is None else body
+        return self.client.put(f'/api/uploads/{session_id}/', body, content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.data)}')
+
+    def put_from(self, session_id, offset):
+        for start in range(offset, len(self.data), 4096):
+            self.put(session_id, start, min(start + 4096, len(self.data)) - 1)
+
+    def upload(self, kind='blog_image'):
+        session_id = self.start(kind).data['id']
+        self.put_from(session_id, 0)
+        self.assertEqual(self.client.post(f'/api/uploads/{session_id}/complete/').status_code, status.HTTP_200_OK)
+        return session_id
+
+    def test_size_and_extension_checked_up_front(self):
+        self.assertEqual(self.start(size=6 * 1024 * 1024).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.start(filename='notes.pdf').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_first_chunk_signature_checked(self):
+        session_id = self.start().data['id']
+        response = self.put(session_id, 0, 15, body=b'%PDF-1.4 fakepdf')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertFalse(UploadSession.objects.filter(pk=session_id).exists())
+
+    def test_resume_from_offset(self):
+        session_id = self.start().data['id']
+        self.put(session_id, 0, 999)
+        self.assertEqual(self.put(session_id, 2000, 2999).status_code, status.HTTP_409_CONFLICT)
+        # Retrying an overlapping range only appends the missing bytes
+        self.assertEqual(self.put(session_id, 500, 1499).data['offset'], 1500)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').data['offset'], 1500)
+        self.put_from(session_id, 1500)
+        session = self.client.post(f'/api/uploads/{session_id}/complete/').data
+        self.assertEqual(session['status'], UploadSession.COMPLETE)
+        # Every chunk arrived in order: the stored file is the upload minus its metadata
+        with default_storage.open(UploadSession.objects.get(pk=session_id).file) as handle:
+            self.assertEqual(handle.read(), images.strip_metadata(io.BytesIO(self.data)))
+
+    def test_concurrent_chunk_loses_to_the_first_commit(self):
+        session_id = self.start().data['id']
+        content_range = f'bytes 0-999/{len(self.data)}'
+
+        class Slow(io.BytesIO):
+            # Another PUT of the same range lands while this body is still arriving
+            def read(inner, size=-1):
+                if not inner.tell():
+                    uploads.write_chunk(session_id, self.user, io.BytesIO(self.data[:1000]), content_range, 1000)
+                return super().read(size)
+
+        with self.assertRaises(uploads.UploadConflict):
+            uploads.write_chunk(session_id, self.user, Slow(self.data[:1000]), content_range, 1000)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').data['offset'], 1000)
+
+    def test_incomplete_upload_cannot_finish(self):
+        session_id = self.start().data['id']
+        self.put(session_id, 0, 999)
+        self.assertEqual(self.client.post(f'/api/uploads/{session_id}/complete/').status_code,
+                         status.HTTP_409_CONFLICT)
+
+    def test_attach_to_blog_and_profile(self):
+        session_id = self.upload()
+        response = self.client.post('/api/blogs/', {'title': 'Uploaded', 'content': 'Body', 'category_name': 'Uploads',
+                                                    'image_upload': session_id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        blog = Blog.objects.get(pk=response.data['id'])
+        self.assertTrue(blog.image.name.startswith('blog_image/'))
+        self.assertEqual(UploadSession.objects.get(pk=session_id).status, UploadSession.ATTACHED)
+
+        # An attached upload cannot be reused
+        response = self.client.post('/api/blogs/', {'title': 'Again', 'content': 'Body', 'category_name': 'Uploads',
+                                                    'image_upload': session_id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        avatar = self.upload('profile_picture')
+        response = self.client.put('/api/auth/me/update-profile-picture/', {'upload': avatar})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.profile_picture.name.startswith('profile_pics/'))
+
+    def test_concurrent_attach_only_one_wins(self):
+        session_id = self.upload()
+        # Both requests validated the session before either attached it
+        first, second = (uploads.completed(session_id, self.user, UploadSession.BLOG_IMAGE) for _ in range(2))
+        self.assertTrue(uploads.attach(first))
+        with self.assertRaises(uploads.UploadConflict):
+            uploads.attach(second)
+
+    def test_other_users_cannot_use_session(self):
+        session_id = self.upload()
+        other = User.objects.create_user(username="other", email="other-up@example.com", password="pass123")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_purge_expired(self):
+        session_id = self.start().data['id']
+        self.put(session_id, 0, 999)
+        self.assertEqual(uploads.purge(timezone.now() + timezone.timedelta(days=2)), 1)
+        self.assertFalse(os.path.exists(os.path.join(UPLOAD_DIR, f'{session_id}.part')))
+
+
+# ---------- LOGIN ----------
+from django.contrib.auth import base_user
+from blog import lockout
+
+
+class LoginTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="loginuser", email="login@example.com", password="pass123")
+        self.url = '/api/auth/login/'
+
+    def login(self, identifier, password="pass123"):
+        return self.client.post(self.url, {'username': identifier, 'password': password})
+
+    def test_email_login_hashes_once_in_one_lookup(self):
+        for identifier in ("loginuser", "login@example.com"):
+            with mock.patch.object(base_user, 'check_password', wraps=base_user.check_password) as check, \
+                    CaptureQueriesContext(connection) as ctx:
+                response = self.login(identifier)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(check.call_count, 1)
+            self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "blog_user"' in q['sql']]), 1)
+
+    def test_username_wins_over_matching_email(self):
+        User.objects.create_user(username="login@example.com", email="other@example.com", password="other123")
+        self.assertEqual(self.login("login@example.com", "other123").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.login("login@example.com").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lockout_after_repeated_failures(self):
+        for _ in range(lockout.config()['MAX_FAILURES']):
+            self.assertEqual(self.login("login@example.com", "wrong").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.login("LOGIN@example.com ")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        # The account is locked whichever identifier is used; other accounts are unaffected
+        self.assertEqual(self.login("loginuser").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        User.objects.create_user(username="bystander", email="bystander@example.com", password="pass123")
+        self.assertEqual(self.login("bystander").status_code, status.HTTP_200_OK)
+
+    def test_alternating_identifiers_share_failures(self):
+        for attempt in range(lockout.config()['MAX_FAILURES']):
+            identifier = "loginuser" if attempt % 2 else "login@example.com"
+            self.assertEqual(self.login(identifier, "wrong").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login("loginuser").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_success_resets_failures(self):
+        for _ in range(lockout.config()['MAX_FAILURES'] - 1):
+            self.login("loginuser", "wrong")
+        self.assertEqual(self.login("loginuser").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.login("loginuser", "wrong").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login("loginuser").status_code, status.HTTP_200_OK)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_login', iterations=2, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results), {'username', 'email', 'email_two_step'})
+        self.assertFalse(User.objects.filter(username='login-bench').exists())
+
+
+# ---------- CACHED JWT AUTHENTICATION ----------
+from blog.authentication import user_cache
+
+
+class CachedAuthenticationTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(username="reader", email="reader@example.com", password="pass123")
+        token = self.client.post('/api/auth/login/', {'username': 'reader', 'password': 'pass123'}).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len([q for q in ctx.captured_queries if 'FROM "blog_user"' in q['sql']])
+
+    def test_fresh_token_needs_no_user_query(self):
+        # Tokens are only trusted when issued in a later second than the user's last change
+        cache.set(responsecache.generation_key(f'user:{self.user.pk}'), 1, None)
+        self.assertEqual(self.user_queries('/api/blogs/my-blogs/'), 0)
+
+    def test_user_change_is_seen_then_cached(self):
+        self.user.is_admin = True
+        self.user.save()
+        self.assertEqual(self.user_queries('/api/blogs/my-blogs/'), 1)
+        self.assertEqual(self.user_queries('/api/blogs/my-blogs/'), 0)
+        response = self.client.post('/api/categories/', {'name': 'Admins only'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_inactive_or_deleted_user_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/blogs/my-blogs/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/blogs/my-blogs/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_me_is_complete_and_deferred_fields_load(self):
+        data = self.client.get('/api/auth/me/').data
+        self.assertEqual((data['username'], data['email'], data['profile_picture']),
+                         ('reader', 'reader@example.com', None))
+        request = self.client.get('/api/blogs/my-blogs/').wsgi_request
+        self.assertTrue(request.user.check_password('pass123'))
+
+    @override_settings(BLOG_RESPONSE_CACHE={'SINGLE_PROCESS': False})
+    def test_per_process_cache_reads_user_every_request(self):
+        cache.set(responsecache.generation_key(f'user:{self.user.pk}'), 1, None)
+        self.assertEqual(self.user_queries('/api/blogs/my-blogs/'), 1)
+        # A write by another worker that never reaches this process's generation
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/blogs/my-blogs/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(BLOG_USER_CACHE={'MAX_ENTRIES': 2})
+    def test_local_cache_is_bounded(self):
+        for i in range(4):
+            user_cache.get(self.user.pk, i)
+        self.assertEqual(len(user_cache._entries), 2)
+
+
+# ---------- TOKEN BLACKLIST ----------
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from blog import blacklist
+from blog.blacklist import BloomFilter, blacklist_filter
+
+
+class TokenBlacklistTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user(username="refresher", email="refresher@example.com", password="pass123")
+
+    def login(self):
+        return self.client.post('/api/auth/login/', {'username': 'refresher', 'password': 'pass123'}).data
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token})
+
+    def outstanding(self, token):
+        return OutstandingToken.objects.filter(jti=blacklist.FilteredRefreshToken(token, verify=False)['jti'])
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"in-{i}")
+        self.assertTrue(all(f"in-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"out-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_rotated_token_rejected_and_fresh_one_skips_query(self):
+        tokens = self.login()
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.refresh(response.data['refresh']).status_code, status.HTTP_200_OK)
+        lookups = [q for q in ctx.captured_queries
+                   if 'token_blacklist_blacklistedtoken' in q['sql'] and q['sql'].startswith('SELECT')]
+        # Only the incremental filter sync, no per-token blacklist lookup
+        self.assertEqual(len(lookups), 1)
+        self.assertTrue(blacklist_filter.metrics()['filtered'] >= 1)
+
+    def test_blacklisted_elsewhere_is_seen(self):
+        tokens = self.login()
+        self.refresh(tokens['refresh'])
+        # A token blacklisted by another process: row plus generation bump, no local add
+        other = self.login()
+        outstanding = self.outstanding(other['refresh']).get()
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=outstanding)])
+        responsecache.bump(blacklist.SCOPE)
+        self.assertEqual(self.refresh(other['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sync_rereads_ids_that_commit_late(self):
+        self.refresh(self.login()['refresh'])
+        late, other = self.login(), self.login()
+        # Another process's rows, where the lower id commits after this process has synced
+        late_id = BlacklistedToken.objects.latest('id').pk + 1
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(id=late_id + 1, token=self.outstanding(other['refresh']).get())])
+        responsecache.bump(blacklist.SCOPE)
+        self.assertEqual(self.refresh(other['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(list(blacklist_filter.gaps), [late_id])
+
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(id=late_id, token=self.outstanding(late['refresh']).get())])
+        responsecache.bump(blacklist.SCOPE)
+        with CaptureQueriesContext(connection) as ctx:
+            blacklist_filter.sync()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(blacklist_filter.gaps, {})
+        self.assertEqual(blacklist_filter.max_id, late_id + 1)
+        self.assertEqual(self.refresh(late['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(BLOG_RESPONSE_CACHE={'SINGLE_PROCESS': False})
+    def test_per_process_cache_checks_database(self):
+        tokens = self.login()
+        self.refresh(tokens['refresh'])
+        # Another worker's blacklist row, whose generation bump this process would never see
+        other = self.login()
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=self.outstanding(other['refresh']).get())])
+        self.assertEqual(self.refresh(other['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn('filtered', blacklist_filter.metrics())
+
+    def test_logout_blacklists(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.client.post('/api/auth/logout/', {'refresh': tokens['refresh']})
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_compaction_purges_expired_in_chunks(self):
+        for _ in range(5):
+            self.refresh(self.login()['refresh'])
+        live = self.login()
+        OutstandingToken.objects.exclude(pk__in=self.outstanding(live['refresh'])).update(expires_at=timezone.now())
+        purged = blacklist.purge_expired(timezone.now() + timezone.timedelta(days=1), chunk_size=2)
+        self.assertEqual(purged['blacklisted_tokens'], 5)
+        self.assertEqual(blacklist.table_sizes()['outstanding_tokens'], OutstandingToken.objects.count())
+        self.assertTrue(self.outstanding(live['refresh']).exists())
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+
+
+# ---------- ASYNC READ PATH ----------
+import asyncio
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory
+from blog import async_views
+
+
+class AsyncReadViewsTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        view_counter.clear()
+        self.user = User.objects.create_user(username="async", email="async@example.com", password="pass123")
+        self.other = User.objects.create_user(username="other", email="other@example.com", password="pass123")
+        self.category = Category.objects.create(name="Async")
+        self.blog = Blog.objects.create(title="Async blog", content="Body", author=self.other,
+                                        category=self.category, is_published=True)
+        self.draft = Blog.objects.create(title="Draft", content="Body", author=self.other, is_published=False)
+        for i in range(3):
+            Comment.objects.create(blog=self.blog, author=self.user, content=f"Comment {i}")
+        self.blog.toggle_like(self.user)
+        self.token = self.client.post('/api/auth/login/', {'username': 'async', 'password': 'pass123'}).data['access']
+        self.factory = AsyncRequestFactory()
+
+    def get(self, url, token=None, **headers):
+        # AsyncRequestFactory only sends headers given per request
+        return self.factory.get(url, headers={'Authorization': f'Bearer {token or self.token}', **headers})
+
+    def sync_json(self, url):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = self.client.get(url)
+        cache.clear()
+        return response.status_code, json.loads(response.content)
+
+    async def async_json(self, view, url, *args, token=None):
+        response = await view(self.get(url, token), *args)
+        return response.status_code, json.loads(response.content)
+
+    async def test_payloads_match_sync_views(self):
+        sync_json = sync_to_async(self.sync_json)
+        cases = [
+            (async_views.category_list_create, '/api/categories/', ()),
+            (async_views.blog_list_create, '/api/blogs/', ()),
+            (async_views.blog_list_create, f'/api/blogs/?category={self.category.pk}&fields=id,title,liked_by_me', ()),
+            (async_views.blog_detail, f'/api/blogs/{self.blog.pk}/', (self.blog.pk,)),
+            (async_views.comment_list_create, f'/api/blogs/{self.blog.pk}/comments/?page_size=2',
+             (self.blog.pk,)),
+        ]
+        for view, url, args in cases:
+            code, expected = await sync_json(url)
+            actual = await self.async_json(view, url, *args)
+            if view is async_views.blog_detail:
+                # Each read counts a view
+                expected['views'] += 1
+            self.assertEqual(actual, (code, expected), url)
+
+    async def test_detail_views_and_likes(self):
+        code, data = await self.async_json(async_views.blog_detail, f'/api/blogs/{self.blog.pk}/', self.blog.pk)
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertTrue(data['liked_by_me'])
+        self.assertEqual(view_counter.pending(self.blog.pk), 1)
+        # Second read is served from the response cache
+        code, data = await self.async_json(async_views.blog_detail, f'/api/blogs/{self.blog.pk}/', self.blog.pk)
+        self.assertEqual(data['views'], self.blog.views + 2)
+
+    async def test_errors(self):
+        response = await async_views.blog_detail(self.factory.get(f'/api/blogs/{self.blog.pk}/'), self.blog.pk)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+        code, _ = await self.async_json(async_views.category_list_create, '/api/categories/', token='nope')
+        self.assertEqual(code, status.HTTP_401_UNAUTHORIZED)
+        code, _ = await self.async_json(async_views.blog_detail, '/api/blogs/999/', 999)
+        self.assertEqual(code, status.HTTP_404_NOT_FOUND)
+        code, _ = await self.async_json(async_views.blog_detail, f'/api/blogs/{self.draft.pk}/', self.draft.pk)
+        self.assertEqual(code, status.HTTP_403_FORBIDDEN)
+        code, _ = await self.async_json(async_views.comment_list_create, '/api/blogs/999/comments/?parent=x', 999)
+        self.assertEqual(code, status.HTTP_404_NOT_FOUND)
+        code, _ = await self.async_json(async_views.comment_list_create,
+                                        f'/api/blogs/{self.blog.pk}/comments/?parent=x', self.blog.pk)
+        self.assertEqual(code, status.HTTP_400_BAD_REQUEST)
+        code, _ = await self.async_json(async_views.blog_list_create, '/api/blogs/?cursor=bogus')
+        self.assertEqual(code, status.HTTP_404_NOT_FOUND)
+
+    async def test_not_modified_and_writes_delegate(self):
+        url = f'/api/blogs/{self.blog.pk}/comments/'
+        first = await async_views.comment_list_create(self.get(url), self.blog.pk)
+        again = self.get(url, **{'If-None-Match': first['ETag']})
+        self.assertEqual((await async_views.comment_list_create(again, self.blog.pk)).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        request = self.factory.post(url, {'comment': 'From async'}, content_type='application/json',
+                                    headers={'Authorization': f'Bearer {self.token}'})
+        response = await async_views.comment_list_create(request, self.blog.pk)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await Comment.objects.filter(content="From async").aexists())
+
+    async def test_cache_calls_stay_off_the_event_loop(self):
+        on_loop = []
+        backend = responsecache.backend
+
+        def checked_backend():
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                pass
+            return backend()
+
+        cases = [(async_views.category_list_create, '/api/categories/', ()),
+                 (async_views.blog_detail, f'/api/blogs/{self.blog.pk}/', (self.blog.pk,)),
+                 (async_views.comment_list_create, f'/api/blogs/{self.blog.pk}/comments/', (self.blog.pk,))]
+        with mock.patch.object(responsecache, 'backend', checked_backend):
+            for view, url, args in cases * 2:
+                self.assertEqual((await view(self.get(url), *args)).status_code, status.HTTP_200_OK, url)
+            response = await async_views.blog_list_create(self.factory.get('/api/blogs/'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(on_loop, [])
+
+    async def test_detail_not_modified_not_counted(self):
+        url = f'/api/blogs/{self.blog.pk}/'
+        first = await async_views.blog_detail(self.get(url), self.blog.pk)
+        again = await async_views.blog_detail(self.get(url, **{'If-None-Match': first['ETag']}), self.blog.pk)
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(view_counter.pending(self.blog.pk), 1)
+
+    async def test_unchecked_blogs_never_not_modified(self):
+        future = {'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}
+        cases = [(async_views.blog_detail, f'/api/blogs/{self.draft.pk}/', self.draft.pk, status.HTTP_403_FORBIDDEN),
+                 (async_views.blog_detail, '/api/blogs/99999/', 99999, status.HTTP_404_NOT_FOUND),
+                 (async_views.comment_list_create, '/api/blogs/99999/comments/', 99999, status.HTTP_404_NOT_FOUND)]
+        for view, url, pk, code in cases:
+            response = await view(self.get(url, **future), pk)
+            self.assertEqual(response.status_code, code, url)
+        self.assertEqual(view_counter.pending(self.draft.pk), 0)
+        self.assertEqual(view_counter.pending(99999), 0)
+
+
+# ---------- BULK MODERATION ----------
+class BulkModerationTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="moderator", email="mod@example.com", password="pass123",
+                                              is_admin=True)
+        self.writer = User.objects.create_user(username="writer", email="writer@example.com", password="pass123")
+        self.news = Category.objects.create(name="News")
+        self.misc = Category.objects.create(name="Misc")
+        self.blogs = [Blog.objects.create(title=f"Post {i}", content="Body", author=self.writer, category=self.news,
+                                          is_published=i % 2 == 0) for i in range(6)]
+        self.client.force_authenticate(self.admin)
+
+    def bulk(self, url, payload):
+        return self.client.post(url, payload, format='json')
+
+    def statuses(self, response):
+        return {item['id']: item['status'] for item in response.data['results']}
+
+    @override_settings(BLOG_BULK={'CHUNK_SIZE': 2})
+    def test_publish_by_ids_reports_each_item(self):
+        ids = [blog.pk for blog in self.blogs] + [9999]
+        generation = responsecache.generations(['blogs'])[0]
+        response = self.bulk('/api/blogs/bulk/', {'action': 'publish', 'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = self.statuses(response)
+        self.assertEqual([results[blog.pk] for blog in self.blogs],
+                         ['unchanged', 'updated', 'unchanged', 'updated', 'unchanged', 'updated'])
+        self.assertEqual(results[9999], 'not_found')
+        self.assertEqual(response.data['summary'], {'updated': 3, 'unchanged': 3, 'not_found': 1})
+        self.assertEqual(Blog.objects.filter(is_published=True).count(), 6)
+        self.assertGreater(responsecache.generations(['blogs'])[0], generation)
+
+    def test_unpublish_clears_schedule(self):
+        blog = self.blogs[0]
+        Blog.objects.filter(pk=blog.pk).update(publish_at=timezone.now() - timezone.timedelta(hours=1))
+        self.bulk('/api/blogs/bulk/', {'action': 'unpublish', 'ids': [blog.pk]})
+        blog.refresh_from_db()
+        self.assertEqual((blog.is_published, blog.publish_at), (False, None))
+
+    def test_recategorize_by_filter(self):
+        response = self.bulk('/api/blogs/bulk/', {'action': 'recategorize', 'category': self.misc.pk,
+                                                  'filter': {'category': self.news.pk, 'is_published': True}})
+        self.assertEqual(response.data['summary'], {'updated': 3})
+        self.assertEqual(Blog.objects.filter(category=self.misc).count(), 3)
+        response = self.bulk('/api/blogs/bulk/', {'action': 'recategorize', 'category': None,
+                                                  'ids': [self.blogs[1].pk]})
+        self.assertEqual(response.data['summary'], {'updated': 1})
+        self.assertIsNone(Blog.objects.get(pk=self.blogs[1].pk).category_id)
+
+    def test_delete_blogs_with_counters(self):
+        call_command('rebuild_stats', stdout=StringIO())
+        for blog in self.blogs[:3]:
+            Comment.objects.create(blog=blog, author=self.admin, content="Hi")
+            blog.toggle_like(self.admin)
+        before = rollups.totals()
+        response = self.bulk('/api/blogs/bulk/', {'action': 'delete', 'ids': [b.pk for b in self.blogs[:3]]})
+        self.assertEqual(response.data['summary'], {'deleted': 3})
+        after = rollups.totals()
+        self.assertEqual((before['blogs'] - after['blogs'], before['comments'] - after['comments'],
+                          before['likes'] - after['likes']), (3, 3, 3))
+        self.assertFalse(Comment.objects.filter(blog_id__in=[b.pk for b in self.blogs[:3]]).exists())
+
+    def test_soft_delete_comments(self):
+        blog = self.blogs[0]
+        parent = Comment.objects.create(blog=blog, author=self.writer, content="Parent")
+        replies = [Comment.objects.create(blog=blog, author=self.writer, parent=parent, content=f"Reply {i}")
+                   for i in range(3)]
+        other = Comment.objects.create(blog=self.blogs[2], author=self.writer, content="Elsewhere")
+        replies[0].soft_delete()
+        ids = [reply.pk for reply in replies] + [other.pk]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk('/api/comments/bulk/', {'action': 'delete', 'ids': ids})
+        self.assertEqual(self.statuses(response), {replies[0].pk: 'unchanged', replies[1].pk: 'deleted',
+                                                   replies[2].pk: 'deleted', other.pk: 'deleted'})
+        parent.refresh_from_db()
+        self.assertEqual(parent.reply_count, 0)
+        self.assertEqual(Blog.objects.get(pk=blog.pk).comment_count, 1)
+        self.assertEqual(Blog.objects.get(pk=self.blogs[2].pk).comment_count, 0)
+        # Lock-and-read, one UPDATE, blog counters by amount, one reply counter UPDATE
+        writes = [q for q in ctx.captured_queries if q['sql'].startswith(('UPDATE', 'SELECT "blog_comment"'))]
+        self.assertLessEqual(len(writes), 5)
+
+    def test_comment_filter_and_permissions(self):
+        Comment.objects.create(blog=self.blogs[0], author=self.writer, content="Spam 1")
+        Comment.objects.create(blog=self.blogs[0], author=self.writer, content="Spam 2")
+        Comment.objects.create(blog=self.blogs[0], author=self.admin, content="Keep")
+        response = self.bulk('/api/comments/bulk/', {'action': 'delete', 'filter': {'author': self.writer.pk}})
+        self.assertEqual(response.data['summary'], {'deleted': 2})
+        self.assertEqual(Comment.objects.filter(deleted_at__isnull=True).count(), 1)
+
+        self.client.force_authenticate(self.writer)
+        response = self.bulk('/api/comments/bulk/', {'action': 'delete', 'ids': [1]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(BLOG_BULK={'MAX_ITEMS': 3})
+    def test_invalid_requests(self):
+        cases = [
+            {'action': 'publish'},
+            {'action': 'publish', 'ids': [1], 'filter': {'author': 1}},
+            {'action': 'publish', 'filter': {}},
+            {'action': 'recategorize', 'ids': [1]},
+            {'action': 'archive', 'ids': [1]},
+            {'action': 'publish', 'ids': [1, 2, 3, 4]},
+            {'action': 'publish', 'filter': {'author': self.writer.pk}},
+        ]
+        for payload in cases:
+            self.assertEqual(self.bulk('/api/blogs/bulk/', payload).status_code, status.HTTP_400_BAD_REQUEST, payload)
+
+
+# ---------- SEED DATA ----------
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+
+
+class SeedCommandTest(TestCase):
+
+    def seed(self, **options):
+        call_command('seed', users=30, categories=3, blogs=40, comments=200, likes=300, chunk_size=25,
+                     end='2026-01-31', stdout=StringIO(), **options)
+
+    def test_counters_match_rows(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Blog.objects.count(), 40)
+        for blog in Blog.objects.annotate(likes_n=Count('like', distinct=True)):
+            self.assertEqual(blog.likes_count, blog.likes_n)
+            self.assertEqual(blog.comment_count, blog.comments.filter(deleted_at__isnull=True).count())
+        for comment in Comment.objects.filter(parent__isnull=True)[:20]:
+            self.assertEqual(comment.reply_count, comment.replies.filter(deleted_at__isnull=True).count())
+        self.assertFalse(Like.objects.filter(user=F('blog__author')).exists())
+        self.assertEqual(rollups.totals()['blogs'], 40)
+        self.assertEqual(self.client.post('/api/auth/login/', {'username': 'seed_user0',
+                                                              'password': 'seed-pass-123'}).status_code, 200)
+
+    def test_deterministic_and_skewed(self):
+        self.seed()
+        self.seed(prefix='again')
+        first = list(Blog.objects.filter(author__username__startswith='seed_')
+                     .order_by('pk').values_list('title', 'likes_count', 'comment_count', 'created_at'))
+        second = list(Blog.objects.filter(author__username__startswith='again_')
+                      .order_by('pk').values_list('title', 'likes_count', 'comment_count', 'created_at'))
+        self.assertEqual(first, second)
+        # Long-tail authors: the first user writes more than the median author
+        per_author = sorted(Blog.objects.filter(author__username__startswith='seed_')
+                            .values('author').annotate(n=Count('pk')).values_list('n', flat=True))
+        self.assertGreater(per_author[-1], per_author[len(per_author) // 2])
+
+    def test_prefix_reuse_refused(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+# ---------- ENDPOINT BENCHMARKS ----------
+import tempfile
+from blog import benchmarks
+
+
+class BenchmarkEndpointsTest(TestCase):
+
+    def test_current_database_run_is_rolled_back(self):
+        call_command('seed', users=10, categories=2, blogs=15, comments=40, likes=30, end='2026-01-31',
+                     stdout=StringIO())
+        likes = Like.objects.count()
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('benchmark_endpoints', sizes='current', iterations=2, output=output.name,
+                         stdout=StringIO())
+            results = json.load(open(output.name))
+        endpoints = results['sizes']['current']['endpoints']
+        self.assertEqual(set(endpoints), set(benchmarks.ENDPOINTS))
+        for name, result in endpoints.items():
+            self.assertEqual(result['status'], [200], name)
+            self.assertGreater(result['queries'], 0, name)
+        self.assertEqual(Like.objects.count(), likes)
+        self.assertFalse(User.objects.filter(username=benchmarks.READER).exists())
+
+    def test_compare_flags_latency_and_queries(self):
+        def run(p95, queries):
+            return {'sizes': {'small': {'endpoints': {'feed': {'p95_ms': p95, 'queries': queries}}}}}
+
+        self.assertEqual(benchmarks.compare(run(10.0, 3), run(11.5, 3)), [])
+        self.assertEqual(benchmarks.compare(run(0.2, 3), run(0.5, 3)), [])
+        metrics = [item['metric'] for item in benchmarks.compare(run(10.0, 3), run(15.0, 4))]
+        self.assertEqual(metrics, ['p95_ms', 'queries'])
+
+    def test_unknown_size_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_endpoints', sizes='huge', stdout=StringIO())
+
+
+# ---------- LOAD GENERATOR ----------
+from collections import Counter
+from django.test import TransactionTestCase
+from blog import loadgen
+
+
+class LoadGeneratorTest(TransactionTestCase):
+    # Committed rows, so the worker threads' connections see them
+
+    def setUp(self):
+        call_command('seed', users=10, categories=2, blogs=15, comments=40, likes=30, end='2026-01-31',
+                     stdout=StringIO())
+
+    def test_mix_run_reports_per_endpoint(self):
+        # SQLite locks the table for a write, so the view counter's flush would fail concurrent reads
+        concurrency = 1 if connection.vendor == 'sqlite' else 3
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('loadtest', mix='feed=1,detail=1', requests=30, concurrency=concurrency, accounts=2,
+                         output=output.name, stdout=StringIO())
+            results = json.load(open(output.name))
+        self.assertEqual(results['total']['requests'], 30)
+        self.assertEqual(set(results['endpoints']), {'feed', 'detail'})
+        for result in results['endpoints'].values():
+            self.assertEqual(result['errors'], 0)
+            self.assertEqual(sum(result['histogram'].values()), result['requests'])
+
+    def test_replay_rebuilds_writes_and_skips_the_rest(self):
+        # Neither replaying account wrote it, so the like toggle is allowed
+        blog = Blog.objects.filter(is_published=True).exclude(
+            author__username__in=['seed_user0', 'seed_user1']).first()
+        lines = [
+            f'127.0.0.1 - - [31/Jan/2026:10:00:00 +0000] "GET /api/blogs/{blog.pk}/ HTTP/1.1" 200 10 "-" "-"',
+            f'127.0.0.1 - - [31/Jan/2026:10:00:00 +0000] "POST /api/blogs/{blog.pk}/like-toggle/ HTTP/1.1" 200 5',
+            f'[31/Jan/2026 10:00:00] "POST /api/blogs/{blog.pk}/comments/ HTTP/1.1" 201 5',
+            '127.0.0.1 - - [31/Jan/2026:10:00:00 +0000] "DELETE /api/comments/1/ HTTP/1.1" 204 0',
+            'not a log line',
+        ]
+        client = loadgen.InProcess()
+        targets = loadgen.Targets(client, 'seed', 'seed-pass-123', accounts=2)
+        skipped = Counter()
+        requests = loadgen.replay(lines, targets, speed=0, skipped=skipped)
+        results = loadgen.run(client, requests, targets, concurrency=1)
+        statuses = {name: result['statuses'] for name, result in results['endpoints'].items()}
+        self.assertEqual(statuses, {'blog-detail': {'200': 1}, 'blog-like-toggle': {'200': 1},
+                                    'comment-list-create': {'201': 1}})
+        self.assertEqual(skipped, {'DELETE comment-delete': 1, 'unparsed': 1})
+
+    def test_invalid_mix_and_missing_accounts(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', mix='feed=1,scrape=2', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('loadtest', prefix='nobody', stdout=StringIO())
+
+
+# ---------- SERVER TIMING ----------
+from django.db.backends.signals import connection_created
+from blog import timing
+
+
+@override_settings(BLOG_SERVER_TIMING={'ENABLED': True})
+class ServerTimingTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="timed", email="timed@example.com", password="pass123")
+        self.blog = Blog.objects.create(title="Timed blog", content="Body", author=self.user, is_published=True)
+        Comment.objects.create(blog=self.blog, author=self.user, content="A comment")
+
+    def metrics(self, response):
+        return {part.split(';')[0]: part for part in response['Server-Timing'].split(', ')}
+
+    def test_header_breaks_down_the_request(self):
+        metrics = self.metrics(self.client.get('/api/blogs/'))
+        self.assertEqual(list(metrics), ['db', 'blog-serializer', 'render', 'total'])
+        self.assertRegex(metrics['db'], r'^db;dur=[\d.]+;desc="\d+ queries"$')
+
+        self.client.force_authenticate(self.user)
+        metrics = self.metrics(self.client.get(f'/api/blogs/{self.blog.pk}/comments/'))
+        self.assertIn('comment-serializer', metrics)
+        self.assertNotIn('blog-serializer', metrics)
+
+    def test_nested_comments_count_toward_the_blog(self):
+        self.client.force_authenticate(self.user)
+        metrics = self.metrics(self.client.get(f'/api/blogs/{self.blog.pk}/'))
+        self.assertIn('blog-serializer', metrics)
+        self.assertNotIn('comment-serializer', metrics)
+
+    def test_log_line(self):
+        with self.assertLogs('blog.timing', 'INFO') as logs:
+            self.client.get('/api/blogs/')
+        record = logs.records[0]
+        self.assertTrue(record.getMessage().startswith('method=GET path=/api/blogs/ status=200 '))
+        self.assertGreater(record.server_timing['db_queries'], 0)
+        self.assertIn('total_ms', record.server_timing)
+
+    def test_unsampled_and_disabled(self):
+        with self.settings(BLOG_SERVER_TIMING={'ENABLED': True, 'SAMPLE_RATE': 0.0}):
+            self.client = self.client_class()
+            self.assertNotIn('Server-Timing', self.client.get('/api/blogs/'))
+        with self.settings(BLOG_SERVER_TIMING={'ENABLED': False}):
+            self.client = self.client_class()
+            self.assertNotIn('Server-Timing', self.client.get('/api/blogs/'))
+        # Outside a measured request the hooks do nothing
+        self.assertIsNone(timing.current.get())
+        with timing.span('render'):
+            pass
+
+    def test_turning_off_unwraps_connections(self):
+        self.client.get('/api/blogs/')
+        self.assertIn(timing.record_query, connection.execute_wrappers)
+        with self.settings(BLOG_SERVER_TIMING={'ENABLED': False}):
+            self.assertNotIn(timing.record_query, connection.execute_wrappers)
+            self.assertFalse(connection_created.disconnect(dispatch_uid=timing.DISPATCH_UID))
+
+
+# ---------- PROMETHEUS METRICS ----------
+import subprocess
+from blog import metrics
+
+
+@override_settings(BLOG_METRICS={'ENABLED': True})
+class MetricsEndpointTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+        responsecache.reset_counters()
+        self.admin = User.objects.create_user(username="ops", email="ops@example.com", password="pass123",
+                                              is_staff=True)
+        self.user = User.objects.create_user(username="reader", email="reader@example.com", password="pass123")
+        Blog.objects.create(title="Measured", content="Body", author=self.user, is_published=True)
+
+    def scrape(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_requests_queries_and_cache(self):
+        self.client.get('/api/blogs/')
+        self.client.get('/api/blogs/')
+        self.client.get('/api/blogs/999/')
+        text = self.scrape()
+        self.assertIn('blog_http_requests_total{view="blog-list-create",method="GET",status="200"} 2', text)
+        self.assertIn('blog_http_requests_total{view="blog-detail",method="GET",status="401"} 1', text)
+        self.assertIn('blog_http_request_duration_seconds_count{view="blog-list-create",method="GET"} 2', text)
+        self.assertIn('blog_db_queries_per_request_bucket{view="blog-list-create",le="+Inf"} 2', text)
+        self.assertIn('blog_response_cache_hit_ratio{endpoint="blog-list-create"} 0.5', text)
+        self.assertIn('blog_outbox_pending 0', text)
+        self.assertIn('# TYPE blog_http_request_duration_seconds histogram', text)
+
+    def test_off_by_default(self):
+        with self.settings(BLOG_METRICS={}):
+            self.client = self.client_class()
+            self.client.get('/api/blogs/')
+            self.assertNotIn('blog_http_requests_total{', self.scrape())
+
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_worker_files_are_summed(self):
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        other = {
+            'pid': exited.pid,
+            'counters': [['blog_http_requests_total', [['view', 'blog-list-create'], ['method', 'GET'],
+                                                       ['status', '200']], 5]],
+            'histograms': [],
+            'gauges': [['blog_view_counter_pending', [], 7]],
+        }
+        with tempfile.TemporaryDirectory() as directory, self.settings(BLOG_METRICS={'ENABLED': True, 'DIR': directory}):
+            with open(os.path.join(directory, f'{exited.pid}.json'), 'w') as file:
+                json.dump(other, file)
+            self.client = self.client_class()
+            self.client.get('/api/blogs/')
+            text = self.scrape()
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+        self.assertIn('blog_http_requests_total{view="blog-list-create",method="GET",status="200"} 6', text)
+        # Gauges of exited processes are dropped
+        self.assertIn(f'blog_view_counter_pending {view_counter.pending_total()}\n', text)
@@ -0,0 +1,223 @@
+import logging
+import random
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 1.0,   # share of requests measured
+    'HEADER': True,       # send a Server-Timing header with the measurements
+    'LOG': True,          # log one line per measured request
+}
+
+# The Timing of the request being measured, if any; asgiref carries it into sync_to_async threads
+current = ContextVar('blog_timing', default=None)
+
+
+# ------------------- Per-request timing -------------------
+# A sampled request gets a Timing that collects SQL query count and time (an
+# execute wrapper on every connection), BlogSerializer/BlogListSerializer and
+# CommentSerializer time (outermost call only, so nested comments count once)
+# and response rendering time. The totals go out as a Server-Timing header and
+# a log line. Disabled, the middleware drops out of the stack and the hooks
+# cost one context variable lookup, unless blog.metrics is enabled: it
+# measures every request the same way. When a settings change turns both
+# off, disable() takes the execute wrapper back off every connection.
+def config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_SERVER_TIMING', {})}
+
+
+class Timing:
+    __slots__ = ('durations', 'queries', 'serializing')
+
+    def __init__(self):
+        self.durations = {}
+        self.queries = 0
+        self.serializing = False
+
+    def add(self, metric, seconds):
+        self.durations[metric] = self.durations.get(metric, 0.0) + seconds
+
+    def header(self):
+        parts = []
+        for metric, seconds in self.durations.items():
+            part = f'{metric};dur={seconds * 1000:.1f}'
+            if metric == 'db':
+                part += f';desc="{self.queries} queries"'
+            parts.append(part)
+        return ', '.join(parts)
+
+    def fields(self):
+        fields = {f"{metric.replace('-', '_')}_ms": round(seconds * 1000, 2)
+                  for metric, seconds in self.durations.items()}
+        fields['db_queries'] = self.queries
+        return fields
+
+
+@contextmanager
+def span(metric):
+    timing = current.get()
+    if timing is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(metric, perf_counter() - start)
+
+
+def timed(metric):
+    """Decorates a serializer's to_representation; only the outermost serializer call is counted."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, instance):
+            timing = current.get()
+            if timing is None or timing.serializing:
+                return method(self, instance)
+            timing.serializing = True
+            start = perf_counter()
+            try:
+                return method(self, instance)
+            finally:
+                timing.serializing = False
+                timing.add(metric, perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_query(execute, sql, params, many, context):
+    timing = current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.queries += 1
+        timing.add('db', perf_counter() - start)
+
+
+# Connections carrying record_query, from any thread, so disable() can unwrap them
+_installed = weakref.WeakSet()
+_installed_lock = threading.Lock()
+DISPATCH_UID = 'blog-server-timing'
+
+
+def install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+        with _installed_lock:
+            _installed.add(connection)
+
+
+def enable():
+    # Connections opened from now on, in any thread; those already open are covered by measure()
+    connection_created.connect(install, dispatch_uid=DISPATCH_UID)
+
+
+def disable():
+    connection_created.disconnect(dispatch_uid=DISPATCH_UID)
+    with _installed_lock:
+        wrapped = list(_installed)
+        _installed.clear()
+    for connection in wrapped:
+        if record_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(record_query)
+
+
+def wanted():
+    """Whether a middleware that measures requests is installed and enabled."""
+    from . import metrics
+    middleware = settings.MIDDLEWARE
+    return (config()['ENABLED'] and f'{__name__}.ServerTimingMiddleware' in middleware) or \
+        (metrics.config()['ENABLED'] and f'{metrics.__name__}.MetricsMiddleware' in middleware)
+
+
+def settings_changed(setting, **kwargs):
+    if setting in ('BLOG_SERVER_TIMING', 'BLOG_METRICS', 'MIDDLEWARE') and not wanted():
+        disable()
+
+
+setting_changed.connect(settings_changed, dispatch_uid=f'{DISPATCH_UID}-settings')
+
+
+def measure():
+    """Start a Timing for the current request; returns it and the token that resets `current`."""
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    timing = Timing()
+    return timing, current.set(timing)
+
+
+# ---------------- Middleware ----------------
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = config()
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = options['SAMPLE_RATE']
+        self.send_header = options['HEADER']
+        self.log = options['LOG']
+        enable()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timing, token = measure()
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, timing, start)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        timing, token = measure()
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, timing, start)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; async views render their own (blog.async_views)
+        timing = current.get()
+        if timing is not None and not response.is_rendered:
+            start = perf_counter()
+            response.add_post_render_callback(lambda rendered: timing.add('render', perf_counter() - start))
+        return response
+
+    def finish(self, request, response, timing, start):
+        timing.add('total', perf_counter() - start)
+        if self.send_header:
+            response['Server-Timing'] = timing.header()
+        if self.log:
+            fields = {'method': request.method, 'path': request.path, 'status': response.status_code,
+                      **timing.fields()}
+            logger.info(' '.join(f'{name}={value}' for name, value in fields.items()),
+                        extra={'server_timing': fields})
+        return response
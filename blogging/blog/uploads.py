@@ -0,0 +1,222 @@
+import os
+import re
+import tempfile
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.exceptions import APIException, NotFound, ParseError, UnsupportedMediaType
+from .models import Blog, UploadSession, User
+from . import images
+
+DEFAULTS = {
+    'TEMP_DIR': None,                 # partial files; defaults to <tmp>/blog-uploads
+    'MAX_SIZE': 5 * 1024 * 1024,      # same limit as validate_image
+    'MAX_CHUNK': 1024 * 1024,
+    'EXPIRY': 24 * 60 * 60,           # seconds an unattached session is kept
+}
+
+READ_BLOCK = 64 * 1024
+ALLOWED_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n')
+HEAD_SIZE = max(len(signature) for signature in SIGNATURES)
+UPLOAD_TO = {
+    UploadSession.BLOG_IMAGE: Blog._meta.get_field('image').upload_to,
+    UploadSession.PROFILE_PICTURE: User._meta.get_field('profile_picture').upload_to,
+}
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadConflict(APIException):
+    status_code = 409
+    default_detail = 'Upload is not in a state that accepts this request.'
+    default_code = 'conflict'
+
+
+# ------------------- Resumable uploads -------------------
+# A client creates a session (name, size, kind), PUTs byte ranges with a
+# Content-Range header and finalizes it. Chunks are streamed from the request
+# straight into a partial file, so a dropped connection only loses the chunk
+# in flight: GET the session for its offset and carry on from there. Size and
+# extension are checked at creation and the file signature on the first chunk.
+def config():
+    options = {**DEFAULTS, **getattr(settings, 'BLOG_UPLOADS', {})}
+    options['TEMP_DIR'] = options['TEMP_DIR'] or os.path.join(tempfile.gettempdir(), 'blog-uploads')
+    return options
+
+
+def partial_path(session):
+    return os.path.join(config()['TEMP_DIR'], f'{session.pk}.part')
+
+
+def discard_partial(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def create(owner, kind, filename, size):
+    session = UploadSession.objects.create(
+        owner=owner, kind=kind, filename=filename, size=size,
+        expires_at=timezone.now() + timezone.timedelta(seconds=config()['EXPIRY']),
+    )
+    os.makedirs(config()['TEMP_DIR'], exist_ok=True)
+    open(partial_path(session), 'wb').close()
+    return session
+
+
+def get(session_id, owner):
+    try:
+        return UploadSession.objects.get(pk=session_id, owner=owner)
+    except UploadSession.DoesNotExist:
+        raise NotFound('Upload not found')
+
+
+def locked(session_id, owner):
+    try:
+        return UploadSession.objects.select_for_update().get(pk=session_id, owner=owner)
+    except UploadSession.DoesNotExist:
+        raise NotFound('Upload not found')
+
+
+def parse_content_range(header, length):
+    match = CONTENT_RANGE.match(header or '')
+    if not match:
+        raise ParseError('Content-Range must be "bytes <start>-<end>/<size>"')
+    start, end, total = (int(value) for value in match.groups())
+    if end < start or end - start + 1 != length:
+        raise ParseError('Content-Range does not match the request body length')
+    return start, end, total
+
+
+def write_chunk(session_id, owner, stream, content_range, length):
+    """Append one byte range to the session's partial file; returns the updated session."""
+    if length > config()['MAX_CHUNK']:
+        raise ParseError(f"Chunks may not exceed {config()['MAX_CHUNK']} bytes")
+    start, end, total = parse_content_range(content_range, length)
+
+    # Checked without a lock, and the body is read from the client outside any
+    # transaction; the conditional UPDATE then only commits the range if no
+    # other PUT has moved the offset meanwhile
+    session = get(session_id, owner)
+    if session.status != UploadSession.OPEN:
+        raise UploadConflict('Upload is already finished')
+    if total != session.size or end >= session.size:
+        raise ParseError('Content-Range is outside the declared upload size')
+    if end < session.received:
+        # A retried chunk that already landed
+        return session
+    if start > session.received:
+        raise UploadConflict(f'Expected a chunk starting at byte {session.received}')
+    if session.received == 0 and length < min(HEAD_SIZE, session.size):
+        raise ParseError(f'The first chunk must carry at least {HEAD_SIZE} bytes')
+
+    path = partial_path(session)
+    offset = session.received
+    written, rejected = receive(path, stream, offset, offset - start, length)
+    if rejected:
+        # Wrong type: drop the session instead of receiving the rest
+        UploadSession.objects.filter(pk=session.pk, received=0).delete()
+        discard_partial(path)
+        raise UnsupportedMediaType('application/octet-stream', 'Only JPEG and PNG images are allowed.')
+    # A short body keeps what arrived; the client resumes from `offset`
+    if written and not UploadSession.objects.filter(
+            pk=session.pk, status=UploadSession.OPEN, received=offset).update(received=offset + written):
+        raise UploadConflict('Another request wrote this range; GET the upload for its offset')
+    session.received = offset + written
+    return session
+
+
+def receive(path, stream, offset, skip, length):
+    """Stream a chunk into the partial file at offset, dropping its first skip bytes (already received).
+
+    Returns (bytes written, whether the first bytes of the file were not an image signature).
+    """
+    written = 0
+    remaining = length
+    with open(path, 'r+b') as partial:
+        partial.seek(offset)
+        while remaining > 0:
+            block = stream.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            if skip:
+                dropped = min(skip, len(block))
+                skip, block = skip - dropped, block[dropped:]
+                if not block:
+                    continue
+            if offset + written == 0 and not block.startswith(SIGNATURES):
+                return written, True
+            partial.write(block)
+            written += len(block)
+    return written, False
+
+
+def complete(session_id, owner):
+    """Verify the finished upload and move it into media storage."""
+    with transaction.atomic():
+        session = locked(session_id, owner)
+        if session.status != UploadSession.OPEN:
+            raise UploadConflict('Upload is already finished')
+        if session.received != session.size:
+            raise UploadConflict(f'Only {session.received} of {session.size} bytes were received')
+
+        path = partial_path(session)
+        try:
+            with Image.open(path) as image:
+                image.verify()
+            # Stored without EXIF/XMP, like a direct upload (blog.images.strip_upload)
+            data = images.strip_metadata(path)
+        except Exception:
+            session.delete()
+            session.file = None
+        else:
+            session.file = default_storage.save(UPLOAD_TO[session.kind] + session.filename, ContentFile(data))
+            session.status = UploadSession.COMPLETE
+            session.save(update_fields=['file', 'status'])
+    discard_partial(path)
+    if session.file is None:
+        raise serializers.ValidationError({'detail': 'Uploaded file is not a valid image.'})
+    return session
+
+
+def completed(session_id, owner, kind):
+    """The owner's finished, unattached upload of the given kind (raises ValidationError)."""
+    try:
+        session = UploadSession.objects.filter(
+            pk=session_id, owner=owner, kind=kind, status=UploadSession.COMPLETE,
+        ).first()
+    except DjangoValidationError:
+        session = None
+    if session is None:
+        raise serializers.ValidationError('Upload not found or not finished.')
+    return session
+
+
+def attach(session):
+    """Mark a completed upload as used and return its storage name."""
+    # Conditional, so of two concurrent requests attaching one upload only one gets the file
+    if not UploadSession.objects.filter(pk=session.pk, status=UploadSession.COMPLETE).update(
+            status=UploadSession.ATTACHED):
+        raise UploadConflict('Upload is already attached')
+    return session.file
+
+
+def purge(now=None):
+    """Delete expired sessions that were never attached, with their files."""
+    now = now or timezone.now()
+    expired = UploadSession.objects.filter(expires_at__lt=now).exclude(status=UploadSession.ATTACHED)
+    purged = 0
+    for session in expired.iterator():
+        discard_partial(partial_path(session))
+        if session.file:
+            default_storage.delete(session.file)
+        session.delete()
+        purged += 1
+    return purged
@@ -1,34 +1,48 @@
+from django.conf import settings
 from django.urls import path
-from . import views
-from rest_framework_simplejwt.views import TokenRefreshView
+from . import async_views, views
+
+# Under ASGI the hot read endpoints are served by coroutines (blog.async_views)
+reads = async_views if settings.BLOG_ASYNC_VIEWS else views
+
 urlpatterns = [
     # ---------------- AUTH ----------------
     path('auth/register/', views.register, name='auth-register'),
     path('auth/login/', views.MyTokenObtainPairView.as_view(), name='auth-login'),
-    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('auth/token/refresh/', views.MyTokenRefreshView.as_view(), name='token-refresh'),
     path('auth/logout/', views.logout, name='auth-logout'),
     path('auth/me/', views.me, name='auth-me'),
     path('auth/me/update-profile-picture/', views.update_profile_picture),  
 
+    # ------------- UPLOADS ----------------
+    path('uploads/', views.upload_session_create, name='upload-create'),
+    path('uploads/<uuid:pk>/', views.upload_session_detail, name='upload-detail'),
+    path('uploads/<uuid:pk>/complete/', views.upload_session_complete, name='upload-complete'),
+
     # ------------- PASSWORD RESET -----------
     path('auth/reset-password/', views.password_reset_request, name='password-reset'),
     path('auth/reset-password-confirm/<uidb64>/<token>/', views.password_reset_confirm, name='password-reset-confirm'),
 
     # ------------- CATEGORY ----------------
-    path('categories/', views.category_list_create, name='category-list-create'),
+    path('categories/', reads.category_list_create, name='category-list-create'),
     path('categories/<int:pk>/', views.category_detail, name='category-detail'),
 
     # ------------- BLOG -------------------
-    path('blogs/', views.blog_list_create, name='blog-list-create'),
-    path('blogs/<int:pk>/', views.blog_detail, name='blog-detail'),
+    path('blogs/', reads.blog_list_create, name='blog-list-create'),
+    path('blogs/<int:pk>/', reads.blog_detail, name='blog-detail'),
     path('blogs/my-blogs/', views.my_blogs, name='my_blogs'),
+    path('blogs/bulk/', views.bulk_blogs, name='blog-bulk'),
     path('blogs/title/<str:title>/', views.blog_detail_by_title, name='blog-detail-by-title'),
     path('blogs/<int:pk>/like-toggle/', views.toggle_like_blog, name='blog-like-toggle'),
 
     # ------------- COMMENT ----------------
-    path('blogs/<int:blog_id>/comments/', views.comment_list_create, name='comment-list-create'),
+    path('blogs/<int:blog_id>/comments/', reads.comment_list_create, name='comment-list-create'),
     path('comments/<int:pk>/', views.delete_comment, name='comment-delete'),
+    path('comments/bulk/', views.bulk_comments, name='comment-bulk'),
 
     # ------------- STATS --------------------
     path('stats/', views.stats, name='admin-stats'),
+    path('stats/users/', views.admin_users, name='admin-users'),
+    path('metrics/', views.prometheus_metrics, name='admin-metrics'),
+    path('exports/<str:dataset>/', views.export_dataset, name='admin-export'),
 ]
@@ -0,0 +1,174 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Blog
+from . import rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FLUSH_INTERVAL': 5,      # seconds between flushes
+    'FLUSH_THRESHOLD': 500,   # pending increments that force an early flush
+    'BATCH_SIZE': 500,        # ids per UPDATE statement
+}
+
+
+# ------------------- Write-behind view counter -------------------
+# Blog reads bump an in-process counter instead of writing the row. Pending
+# increments are written with one `views = views + n` UPDATE per distinct n,
+# either when FLUSH_INTERVAL has passed, FLUSH_THRESHOLD is reached, or the
+# worker exits. Readers add pending() so counts stay accurate meanwhile. Once
+# start() is called (the WSGI/ASGI entry points do), a daemon thread in each
+# process also flushes every FLUSH_INTERVAL, so a quiet blog's views are not
+# left waiting for the next read. A flush bumps no response cache scopes:
+# cached feeds and details follow counted() instead (blog.views.live_data), so
+# reads never invalidate cached payloads or change the detail and comment
+# ETags. Views counted by other processes show up in a cached payload when it
+# expires or is next invalidated by a write.
+class ViewCounter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._inflight = Counter()
+        self._counted = Counter()
+        self._last_flush = time.monotonic()
+        self._periodic = False
+        self._thread_pid = None
+        self._stopped = threading.Event()
+
+    @property
+    def config(self):
+        return {**DEFAULTS, **getattr(settings, 'BLOG_VIEW_COUNTER', {})}
+
+    def increment(self, blog_id, count=1):
+        if self.add(blog_id, count):
+            self.flush()
+
+    async def aincrement(self, blog_id, count=1):
+        # The flush writes to the database, so it runs off the event loop
+        if self.add(blog_id, count):
+            await sync_to_async(self.flush)()
+
+    def add(self, blog_id, count):
+        """Buffer an increment; returns whether a flush is due."""
+        config = self.config
+        if self._periodic and self._thread_pid != os.getpid():
+            self._start_thread()
+        with self._lock:
+            self._pending[blog_id] += count
+            self._counted[blog_id] += count
+            return (sum(self._pending.values()) >= config['FLUSH_THRESHOLD']
+                    or time.monotonic() - self._last_flush >= config['FLUSH_INTERVAL'])
+
+    def pending(self, blog_id):
+        with self._lock:
+            return self._pending[blog_id] + self._inflight[blog_id]
+
+    def counted(self, blog_id):
+        """Views this process has counted for a blog since it started; only ever grows."""
+        with self._lock:
+            return self._counted[blog_id]
+
+    def pending_total(self):
+        with self._lock:
+            return sum(self._pending.values()) + sum(self._inflight.values())
+
+    def flush(self):
+        # One flusher at a time; a concurrent caller just leaves it to the running flush.
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+                self._inflight.update(batch)
+                self._last_flush = time.monotonic()
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except DatabaseError:
+                logger.exception("Flushing %d blog view increments failed; will retry", sum(batch.values()))
+                with self._lock:
+                    self._pending.update(batch)
+                return 0
+            finally:
+                with self._lock:
+                    self._inflight.subtract(batch)
+                    self._inflight = +self._inflight
+            return sum(batch.values())
+        finally:
+            self._flush_lock.release()
+
+    def _write(self, batch):
+        by_count = defaultdict(list)
+        for blog_id, count in batch.items():
+            by_count[count].append(blog_id)
+        batch_size = self.config['BATCH_SIZE']
+        with transaction.atomic():
+            for count, ids in by_count.items():
+                for start in range(0, len(ids), batch_size):
+                    Blog.objects.filter(pk__in=ids[start:start + batch_size]).update(views=F('views') + count)
+            rollups.bump('views', timezone.now(), sum(batch.values()))
+
+    def start(self):
+        """Flush every FLUSH_INTERVAL from a daemon thread, in this and any forked process."""
+        self._periodic = True
+        self._start_thread()
+
+    def _start_thread(self):
+        with self._lock:
+            # A forked worker does not inherit the parent's thread
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            stopped = self._stopped = threading.Event()
+        threading.Thread(target=self._run, args=(stopped,), name='blog-view-flush', daemon=True).start()
+
+    def stop(self):
+        self._periodic = False
+        with self._lock:
+            self._thread_pid = None
+            self._stopped.set()
+
+    def _run(self, stopped):
+        while not stopped.wait(self.config['FLUSH_INTERVAL']):
+            if time.monotonic() - self._last_flush < self.config['FLUSH_INTERVAL']:
+                continue
+            # The flush thread holds its own database connection
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Periodic blog view flush failed")
+            finally:
+                close_old_connections()
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._inflight.clear()
+            self._counted.clear()
+            self._last_flush = time.monotonic()
+
+
+view_counter = ViewCounter()
+
+
+def flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception("Final blog view flush failed")
+
+
+atexit.register(flush_on_exit)
@@ -1,27 +1,31 @@
 from django.db.models import Sum
 from rest_framework import status
-from django.db.models import Count
-from django.db.models.functions import TruncDate, TruncMonth
 from datetime import datetime, timedelta
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
-from django.db.models.functions import TruncDay, TruncMonth
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.db import DatabaseError, OperationalError
-from django.db.models import Q, Sum
+from django.db.models import Sum
 from rest_framework.permissions import IsAdminUser
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.conf import settings
-from .models import User, Category, Blog, Comment
-from .serializers import (UserSerializer, CategorySerializer, BlogSerializer, CommentSerializer,
-                          RegisterSerializer, MyTokenObtainPairSerializer,
-                          PasswordResetSerializer, PasswordResetConfirmSerializer)
+from django.utils.dateparse import parse_date
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from .models import User, Category, Blog, Comment, Like, UploadSession
+from .authentication import full_user
+from .blacklist import FilteredRefreshToken
+from .conditional import Validators
+from .pagination import KeysetPagination, SearchPagination, UserPagination
+from . import bulk, exports, metrics, outbox, responsecache, rollups, search, uploads
+from .viewcounter import view_counter
+from .serializers import (UserSerializer, CategorySerializer, BlogSerializer, BlogListSerializer, CommentSerializer,
+                          SearchResultSerializer, RegisterSerializer, requested_fields, MyTokenObtainPairSerializer,
+                          MyTokenRefreshSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer,
+                          UploadSessionSerializer, BlogBulkActionSerializer, CommentBulkActionSerializer)
 
 
 # -------------------- AUTH --------------------
@@ -48,6 +52,10 @@ class MyTokenObtainPairView(TokenObtainPairView):
             return Response({"detail": "Database connection error. Please try again later."},
                             status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
+class MyTokenRefreshView(TokenRefreshView):
+    serializer_class = MyTokenRefreshSerializer
+
+
 # -------------------- LOGOUT--------------------
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -56,7 +64,7 @@ def logout(request):
     if not refresh_token:
         return Response({"detail": "Refresh token required."}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        token = RefreshToken(refresh_token)
+        token = FilteredRefreshToken(refresh_token)
         token.blacklist()
         return Response({"message": "Logged out successfully."}, status=status.HTTP_205_RESET_CONTENT)
     except Exception as e:
@@ -70,7 +78,7 @@ def logout(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def me(request):
-    serializer = UserSerializer(request.user)
+    serializer = UserSerializer(full_user(request.user))
     return Response(serializer.data)
 
 
@@ -81,27 +89,73 @@ def me(request):
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_profile_picture(request):
-    user = request.user
+    # request.user may be built from the token; write through a full row
+    user = User.objects.get(pk=request.user.pk)
 
     if 'profile_picture' in request.FILES:
         user.profile_picture = request.FILES['profile_picture']
-        user.save()
-        return Response({
-            "profile_picture": user.profile_picture.url
-        })
-    return Response({"detail": "No image uploaded"}, status=400)
+    elif 'upload' in request.data:
+        # Finished resumable upload (see upload_session_create)
+        try:
+            session = uploads.completed(request.data['upload'], user, UploadSession.PROFILE_PICTURE)
+        except ValidationError:
+            return Response({"detail": "Upload not found or not finished."}, status=400)
+        user.profile_picture = uploads.attach(session)
+    else:
+        return Response({"detail": "No image uploaded"}, status=400)
+    user.save()
+    return Response({
+        "profile_picture": user.profile_picture.url
+    })
 
 
 
 
+# -------------------- RESUMABLE UPLOADS --------------------
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_session_create(request):
+    serializer = UploadSessionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    session = uploads.create(request.user, **serializer.validated_data)
+    return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT'])
+@parser_classes([])
+@permission_classes([IsAuthenticated])
+def upload_session_detail(request, pk):
+    # GET reports the offset to resume from; PUT appends the byte range in Content-Range
+    if request.method == 'GET':
+        return Response(UploadSessionSerializer(uploads.get(pk, request.user)).data)
+
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    session = uploads.write_chunk(pk, request.user, request.stream, request.META.get('HTTP_CONTENT_RANGE'), length)
+    return Response(UploadSessionSerializer(session).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_session_complete(request, pk):
+    session = uploads.complete(pk, request.user)
+    return Response(UploadSessionSerializer(session).data)
+
+
 # -------------------- CATEGORY--------------------
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])  
 def category_list_create(request):
     if request.method == 'GET':
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        validators = Validators(request, 'category-list-create', ['categories'])
+        not_modified = validators.not_modified(request)
+        if not_modified:
+            return not_modified
+        key = responsecache.make_key('category-list-create', request.query_params, ['categories'])
+        data = responsecache.fetch(key, 'category-list-create')
+        if data is None:
+            data = CategorySerializer(Category.objects.all(), many=True).data
+            responsecache.store(key, data)
+        return validators.apply(Response(data))
 
     if not request.user.is_authenticated or not request.user.is_admin:
         return Response({"detail": "Only admin can create categories"}, status=status.HTTP_403_FORBIDDEN)
@@ -139,67 +193,154 @@ def category_detail(request, pk):
     
     
 # -------------------- BLOG --------------------
+FEED_SCOPES = ['blogs', 'categories', 'users']
+
+
+def feed_query(request):
+    """(queryset, serializer class, paginator, context) of a feed request; nothing is queried yet."""
+    blogs = Blog.objects.filter(is_published=True)
+
+    category_id = request.GET.get('category')
+    if category_id:
+        blogs = blogs.filter(category_id=category_id)
+
+    fields, expand = requested_fields(request)
+    context = {'fields': fields, 'expand': expand}
+    serializer_class, paginator = BlogListSerializer, KeysetPagination()
+
+    search_query = request.GET.get('search')
+    if search_query:
+        blogs = search.search_blogs(blogs, search_query)
+        serializer_class, paginator = SearchResultSerializer, SearchPagination()
+        context['search_terms'] = search.query_terms(search_query)
+
+    return serializer_class.setup_queryset(blogs, fields, expand), serializer_class, paginator, context
+
+
+def wants_liked(context):
+    return not context['fields'] or 'liked_by_me' in context['fields']
+
+
+def feed_data(page, serializer_class, paginator, context):
+    serializer = serializer_class(page, many=True, context=context)
+    return paginator.get_paginated_response(serializer.data).data
+
+
+def blog_feed(request):
+    blogs, serializer_class, paginator, context = feed_query(request)
+    page = paginator.paginate_queryset(blogs, request)
+    if wants_liked(context):
+        context['liked_ids'] = Like.liked_blog_ids(request.user, [blog.pk for blog in page])
+    return feed_data(page, serializer_class, paginator, context)
+
+
+# Cached payloads remember how many views this process had counted when they
+# were rendered, so the served count follows the view counter, across flushes,
+# without invalidating the entry.
+def cache_entry(data, items):
+    return {'data': data, 'counted': {item['id']: view_counter.counted(item['id']) for item in items if 'id' in item}}
+
+
+def live_data(entry, items_of=lambda data: [data]):
+    data = entry['data']
+    counted = entry.get('counted', {})
+    for item in items_of(data):
+        if 'views' in item and item.get('id') in counted:
+            item['views'] += view_counter.counted(item['id']) - counted[item['id']]
+    return data
+
+
 @api_view(['GET', 'POST'])
 @parser_classes([JSONParser, MultiPartParser, FormParser])
 @permission_classes([AllowAny]) 
 def blog_list_create(request):
     if request.method == 'GET':
-        blogs = Blog.objects.filter(is_published=True)
-
-        category_id = request.GET.get('category')
-        if category_id:
-            blogs = blogs.filter(category_id=category_id)
-
-        search_query = request.GET.get('search')
-        if search_query:
-            blogs = blogs.filter(Q(title__icontains=search_query) | Q(content__icontains=search_query))
-
-        serializer = BlogSerializer(blogs, many=True)
-        return Response(serializer.data)
-
+        validators = Validators(request, 'blog-list-create', FEED_SCOPES, vary_user=True)
+        not_modified = validators.not_modified(request)
+        if not_modified:
+            return not_modified
+        # liked_by_me is per user, so only anonymous feeds are shared
+        if request.user.is_authenticated:
+            return validators.apply(Response(blog_feed(request)))
+        key = responsecache.make_key('blog-list-create', request.query_params, FEED_SCOPES, request.get_host())
+        entry = responsecache.fetch(key, 'blog-list-create')
+        if entry is None:
+            data = blog_feed(request)
+            entry = cache_entry(data, data['results'])
+            responsecache.store(key, entry)
+        return validators.apply(Response(live_data(entry, lambda data: data['results'])))
     
     if not request.user.is_authenticated:
         return Response({"detail": "Authentication required to create blog"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    serializer = BlogSerializer(data=request.data)
+    serializer = BlogSerializer(data=request.data, context={'user': request.user})
     if serializer.is_valid():
         serializer.save(author=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def can_view(user, blog):
+    # Allow author/admin to see unpublished blogs
+    return blog.is_published or user.pk == blog.author_id or getattr(user, "is_admin", False)
+
+
+def read_blog(request, pk):
+    scopes = [f'blog:{pk}', 'categories', 'users']
+    validators = Validators(request, 'blog-detail', scopes, vary_user=True)
+    # Only published payloads are cached, and those are visible to every user; anything
+    # else is loaded and checked before a 304 or a view count is given out for it
+    cache_key = responsecache.make_key('blog-detail', {}, scopes)
+    entry = responsecache.fetch(cache_key, 'blog-detail')
+    if entry is None:
+        blog = Blog.objects.for_detail().filter(pk=pk).first()
+        if blog is None:
+            return Response({"detail": "Blog not found"}, status=404)
+        if not can_view(request.user, blog):
+            return Response({"detail": "You are not authorized to view this unpublished blog."}, status=403)
+
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    # A 304 revalidation is not counted as a view
+    view_counter.increment(pk)
+    if entry is not None:
+        data = live_data(entry)
+    else:
+        data = BlogSerializer(blog).data
+        if blog.is_published:
+            responsecache.store(cache_key, cache_entry(data, [data]))
+    data['liked_by_me'] = bool(Like.liked_blog_ids(request.user, [pk]))
+    return validators.apply(Response(data))
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @parser_classes([MultiPartParser, FormParser])
 @permission_classes([IsAuthenticated])
 def blog_detail(request, pk):
+    if request.method == 'GET':
+        return read_blog(request, pk)
+
     try:
-        blog = Blog.objects.get(pk=pk)
+        blog = Blog.objects.for_detail().get(pk=pk)
     except Blog.DoesNotExist:
         return Response({"detail": "Blog not found"}, status=404)
 
-    #  GET request (View blog)
-    if request.method == 'GET':
-        # Allow author/admin to see unpublished blogs
-        if not blog.is_published and request.user != blog.author and not getattr(request.user, "is_admin", False):
-            return Response({"detail": "You are not authorized to view this unpublished blog."}, status=403)
-        blog.views += 1
-        blog.save(update_fields=['views'])
-        serializer = BlogSerializer(blog)
-        return Response(serializer.data)
-
     #  Only author/admin can edit/delete
     if not (request.user == blog.author or getattr(request.user, "is_admin", False)):
         return Response({"detail": "You are not authorized to edit or delete this blog."}, status=403)
 
     if request.method == 'PUT':
-        serializer = BlogSerializer(blog, data=request.data, partial=True)
+        serializer = BlogSerializer(blog, data=request.data, partial=True, context={'user': request.user})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=400)
 
     if request.method == 'DELETE':
-        blog.delete()
+        # Cascaded likes/comments roll up into one stats update per day
+        with rollups.batched():
+            blog.delete()
         return Response(status=204)
     
     
@@ -208,9 +349,15 @@ def blog_detail(request, pk):
 @permission_classes([IsAuthenticated])
 def my_blogs(request):
     user = request.user
-    blogs = Blog.objects.filter(author=user)  
-    serializer = BlogSerializer(blogs, many=True)
-    return Response(serializer.data)
+    fields, expand = requested_fields(request)
+    blogs = BlogListSerializer.setup_queryset(Blog.objects.filter(author=user), fields, expand)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(blogs, request)
+    context = {'fields': fields, 'expand': expand}
+    if not fields or 'liked_by_me' in fields:
+        context['liked_ids'] = Like.liked_blog_ids(user, [blog.pk for blog in page])
+    serializer = BlogListSerializer(page, many=True, context=context)
+    return paginator.get_paginated_response(serializer.data)
 
 
 
@@ -220,12 +367,11 @@ def my_blogs(request):
 @permission_classes([IsAuthenticated])
 def blog_detail_by_title(request, title):
     try:
-        blog = Blog.objects.get(title=title, is_published=True)
+        blog = Blog.objects.for_detail().get(title=title, is_published=True)
     except Blog.DoesNotExist:
         return Response({"detail": "Blog not found or not published"}, status=status.HTTP_404_NOT_FOUND)
-    blog.views += 1
-    blog.save(update_fields=['views'])
-    serializer = BlogSerializer(blog)
+    view_counter.increment(blog.pk)
+    serializer = BlogSerializer(blog, context={'liked_ids': Like.liked_blog_ids(request.user, [blog.pk])})
     return Response(serializer.data)
 
 
@@ -234,22 +380,16 @@ def blog_detail_by_title(request, title):
 @permission_classes([IsAuthenticated])
 def toggle_like_blog(request, pk):
     try:
-        blog = Blog.objects.get(pk=pk, is_published=True)
+        blog = Blog.objects.only('id', 'author_id').get(pk=pk, is_published=True)
     except Blog.DoesNotExist:
         return Response({"detail": "Blog not found or not published"}, status=status.HTTP_404_NOT_FOUND)
 
     user = request.user
-    if user == blog.author:
+    if user.pk == blog.author_id:
         return Response({"detail": "You cannot like your own blog."}, status=status.HTTP_400_BAD_REQUEST)
 
-    if user in blog.likes.all():
-        blog.likes.remove(user)
-        liked = False
-    else:
-        blog.likes.add(user)
-        liked = True
-
-    return Response({"liked": liked, "total_likes": blog.likes.count()})
+    liked, total_likes = blog.toggle_like(user)
+    return Response({"liked": liked, "total_likes": total_likes})
 
 
 # -------------------- COMMENTS --------------------
@@ -262,11 +402,27 @@ def comment_list_create(request, blog_id):
         return Response({"detail": "Blog not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        comments = Comment.objects.filter(blog=blog, deleted_at__isnull=True)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
-
-    serializer = CommentSerializer(data=request.data)
+        validators = Validators(request, 'comment-list-create', [f'blog:{blog_id}', 'users'])
+        not_modified = validators.not_modified(request)
+        if not_modified:
+            return not_modified
+
+        # Top-level thread by default; ?parent=<id> lazily loads one comment's replies
+        comments = Comment.objects.filter(blog=blog, deleted_at__isnull=True).select_related('author')
+        parent = request.query_params.get('parent')
+        if parent:
+            try:
+                comments = comments.filter(parent_id=int(parent))
+            except ValueError:
+                return Response({"detail": "Invalid parent"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            comments = comments.filter(parent__isnull=True)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(comments, request)
+        serializer = CommentSerializer(page, many=True)
+        return validators.apply(paginator.get_paginated_response(serializer.data))
+
+    serializer = CommentSerializer(data=request.data, context={'blog_id': blog.pk})
     if serializer.is_valid():
         serializer.save(blog=blog, author=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -288,6 +444,30 @@ def delete_comment(request, pk):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+# -------------------- BULK MODERATION --------------------
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_blogs(request):
+    if not request.user.is_admin:
+        return Response({"detail": "Only admin can run bulk operations"}, status=status.HTTP_403_FORBIDDEN)
+    serializer = BlogBulkActionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    return Response(bulk.blogs(data['action'], ids=data.get('ids'), filters=data.get('filter'),
+                               category=data.get('category')))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_comments(request):
+    if not request.user.is_admin:
+        return Response({"detail": "Only admin can run bulk operations"}, status=status.HTTP_403_FORBIDDEN)
+    serializer = CommentBulkActionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    return Response(bulk.comments(data['action'], ids=data.get('ids'), filters=data.get('filter')))
+
+
 # -------------------- PASSWORD RESET --------------------
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -306,12 +486,8 @@ def password_reset_request(request):
     token = default_token_generator.make_token(user)
     reset_link = f"http://localhost:3000/reset-password/{uid}/{token}"
 
-    send_mail(
-        subject="Password Reset",
-        message=f"Click this link to reset your password: {reset_link}",
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[email],
-    )
+    # Sent by the send_outbox worker; repeat requests inside the window are dropped
+    outbox.enqueue_password_reset(user, reset_link)
     return Response({"detail": "If email exists, a reset link will be sent."}, status=status.HTTP_200_OK)
 
 # -------------------- PASSWORD CHANGE --------------------
@@ -336,58 +512,73 @@ def password_reset_confirm(request, uidb64, token):
 
 
 # # -------------------- STATS --------------------
+def date_param(request, name):
+    raw = request.GET.get(name)
+    if not raw:
+        return None
+    value = parse_date(raw)
+    if value is None:
+        raise ValueError(name)
+    return value
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def stats(request):
-    total_blogs = Blog.objects.count()
-    total_likes = sum(blog.likes.count() for blog in Blog.objects.all())
-    total_comments = Comment.objects.count()
+    # ?from=YYYY-MM-DD&to=YYYY-MM-DD limits the series; totals are all-time
+    try:
+        range_start = date_param(request, 'from')
+        range_end = date_param(request, 'to')
+    except ValueError:
+        return Response({"detail": "from/to must be dates (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+
+    totals = rollups.totals()
+    daily, monthly = rollups.series(range_start, range_end)
     categories = list(Category.objects.values('id', 'name'))
-    users = list(User.objects.values('id', 'username', 'email', 'is_admin'))
-    blogs = list(Blog.objects.values('id', 'title', 'author_id', 'created_at'))
-
-    # ---- Daily Blogs ----
-    daily_blogs = (
-        Blog.objects.annotate(date=TruncDate('created_at'))
-        .values('date')
-        .annotate(count=Count('id'))
-        .order_by('date')
-    )
-
-    # ---- Monthly Blogs ----
-    monthly_blogs = (
-        Blog.objects.annotate(month=TruncMonth('created_at'))
-        .values('month')
-        .annotate(count=Count('id'))
-        .order_by('month')
-    )
-
-    # ---- Daily Users ----
-    daily_users = (
-        User.objects.annotate(date=TruncDate('date_joined'))
-        .values('date')
-        .annotate(count=Count('id'))
-        .order_by('date')
-    )
-
-    # ---- Monthly Users ----
-    monthly_users = (
-        User.objects.annotate(month=TruncMonth('date_joined'))
-        .values('month')
-        .annotate(count=Count('id'))
-        .order_by('month')
-    )
 
-    return Response({
-        'total_blogs': total_blogs,
-        'total_likes': total_likes,
-        'total_comments': total_comments,
+    data = {
+        'total_blogs': totals['blogs'],
+        'total_likes': totals['likes'],
+        'total_comments': totals['comments'],
+        'total_users': totals['users'],
+        'total_views': totals['views'],
         'total_categories': len(categories),
         'categories': categories,
-        'blogs': blogs,
-        'users': users,
-        'daily_blogs': daily_blogs,
-        'monthly_blogs': monthly_blogs,
-        'daily_users': daily_users,
-        'monthly_users': monthly_users,
-    })
+    }
+    for metric in rollups.METRICS:
+        data[f'daily_{metric}'] = daily[metric]
+        data[f'monthly_{metric}'] = monthly[metric]
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_users(request):
+    # The dashboard's users table, a page at a time instead of the whole user base
+    paginator = UserPagination()
+    page = paginator.paginate_queryset(User.objects.filter(is_admin=False), request)
+    serializer = UserSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def prometheus_metrics(request):
+    # Prometheus text format, summed over every worker process (blog.metrics)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# -------------------- EXPORTS --------------------
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_dataset(request, dataset):
+    # ?output=ndjson (default) or csv; "format" is taken by DRF's renderer override
+    if dataset not in exports.DATASETS:
+        return Response({"detail": "Unknown export"}, status=status.HTTP_404_NOT_FOUND)
+    output = request.GET.get('output', 'ndjson')
+    if output not in exports.CONTENT_TYPES:
+        return Response({"detail": "output must be ndjson or csv"}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(exports.stream(dataset, output), content_type=exports.CONTENT_TYPES[output])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{output}"'
+    return response
@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogging.settings')
+os.environ.setdefault('BLOG_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Buffered blog views are flushed on a timer in every serving process
+from blog.viewcounter import view_counter  # noqa: E402
+
+view_counter.start()
@@ -53,7 +53,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'blog.authentication.CachedJWTAuthentication',
     ),
     
 }
@@ -66,6 +66,9 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 MIDDLEWARE = [
+    # Outermost, so its total covers the rest of the stack; drops out when disabled
+    'blog.timing.ServerTimingMiddleware',
+    'blog.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -141,6 +144,94 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'Blogging Platform <noreply
 
 AUTH_USER_MODEL = 'blog.User'
 
+# Log in with username or email: one lookup, one password hash (blog.backends)
+AUTHENTICATION_BACKENDS = ['blog.backends.UsernameOrEmailBackend']
+
+# Cache (local memory by default; point CACHE_BACKEND at memcached/redis when several worker
+# processes serve requests, otherwise response caching and validators stay off outside DEBUG)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'blogging'),
+    }
+}
+
+# Public read endpoints cache their payloads under versioned keys (blog.responsecache)
+BLOG_RESPONSE_CACHE = {
+    'TIMEOUT': int(os.getenv('BLOG_RESPONSE_CACHE_TIMEOUT', 300)),
+    'SINGLE_PROCESS': os.getenv('CACHE_SINGLE_PROCESS', str(DEBUG)) == 'True',
+}
+
+# Blog views are counted in memory and written back in batches (blog.viewcounter)
+BLOG_VIEW_COUNTER = {
+    'FLUSH_INTERVAL': int(os.getenv('BLOG_VIEW_FLUSH_INTERVAL', 5)),
+    'FLUSH_THRESHOLD': int(os.getenv('BLOG_VIEW_FLUSH_THRESHOLD', 500)),
+}
+
+# Outgoing mail is queued and sent by `manage.py send_outbox` (blog.outbox)
+BLOG_EMAIL_OUTBOX = {
+    'BATCH_SIZE': int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 100)),
+    'MAX_ATTEMPTS': int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)),
+    'RESET_DEDUP_WINDOW': int(os.getenv('PASSWORD_RESET_DEDUP_WINDOW', 900)),
+}
+
+# Uploaded images get thumb/card/full WebP variants built in a thread pool (blog.images)
+BLOG_IMAGE_PIPELINE = {
+    'WORKERS': int(os.getenv('IMAGE_PIPELINE_WORKERS', 2)),
+}
+
+# request.user is built from token claims or a versioned user cache (blog.authentication)
+BLOG_USER_CACHE = {
+    'TIMEOUT': int(os.getenv('USER_CACHE_TIMEOUT', 300)),
+    'MAX_ENTRIES': int(os.getenv('USER_CACHE_MAX_ENTRIES', 1024)),
+}
+
+# Refresh-token blacklist checks go through a Bloom filter (blog.blacklist). Expired token rows are purged
+# daily by the `manage.py publish_scheduled` worker, or by `manage.py compact_tokens` from cron
+BLOG_TOKEN_BLACKLIST = {
+    'ERROR_RATE': float(os.getenv('TOKEN_BLACKLIST_ERROR_RATE', 0.01)),
+    'CHUNK_SIZE': int(os.getenv('TOKEN_COMPACTION_CHUNK_SIZE', 1000)),
+}
+
+# Failed logins are counted in the cache; MAX_FAILURES locks the identifier (blog.lockout)
+BLOG_LOGIN_LOCKOUT = {
+    'MAX_FAILURES': int(os.getenv('LOGIN_MAX_FAILURES', 5)),
+    'LOCKOUT': int(os.getenv('LOGIN_LOCKOUT_SECONDS', 15 * 60)),
+}
+
+# Bulk moderation endpoints work through CHUNK_SIZE rows per transaction (blog.bulk)
+BLOG_BULK = {
+    'CHUNK_SIZE': int(os.getenv('BULK_CHUNK_SIZE', 500)),
+    'MAX_ITEMS': int(os.getenv('BULK_MAX_ITEMS', 5000)),
+}
+
+# Feed, detail, category and comment reads run as coroutines (blog.async_views);
+# asgi.py turns this on, the WSGI entry point keeps the synchronous views
+BLOG_ASYNC_VIEWS = os.getenv('BLOG_ASYNC_VIEWS', 'False') == 'True'
+
+# Sampled requests report SQL, serializer and render time in a Server-Timing header and a log line (blog.timing)
+BLOG_SERVER_TIMING = {
+    'ENABLED': os.getenv('SERVER_TIMING_ENABLED', 'False') == 'True',
+    'SAMPLE_RATE': float(os.getenv('SERVER_TIMING_SAMPLE_RATE', 1.0)),
+    'HEADER': os.getenv('SERVER_TIMING_HEADER', 'True') == 'True',
+}
+
+# Request, query, cache and queue metrics for /api/metrics/ (blog.metrics). With several worker
+# processes, point METRICS_DIR at a directory they share and empty it when the server starts.
+# Enabled, every request is measured with the per-query instrumentation of blog.timing.
+BLOG_METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'False') == 'True',
+    'DIR': os.getenv('METRICS_DIR') or None,
+    'FLUSH_INTERVAL': int(os.getenv('METRICS_FLUSH_INTERVAL', 10)),
+}
+
+# Resumable uploads write chunks here before moving the file into media (blog.uploads);
+# must be shared between web workers when there is more than one node
+BLOG_UPLOADS = {
+    'TEMP_DIR': os.getenv('UPLOAD_TEMP_DIR') or None,
+    'EXPIRY': int(os.getenv('UPLOAD_SESSION_EXPIRY', 24 * 60 * 60)),
+}
+
 
 
 
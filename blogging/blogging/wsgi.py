@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogging.settings')
 
 application = get_wsgi_application()
+
+# Buffered blog views are flushed on a timer in every serving process
+from blog.viewcounter import view_counter  # noqa: E402
+
+view_counter.start()